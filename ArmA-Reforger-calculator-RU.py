@@ -1,6 +1,5 @@
-from database import mortars
-import bisect
-import os
+from ballistics import TABLES, solve
+from render import CLEAR_SCREEN
 import datetime
 from colorama import init, Fore, Back, Style
 
@@ -11,38 +10,6 @@ class MortarCalculator:
     def __init__(self):
         self.history = []
         
-    def find_closest_keys(self, distances, target_dist):
-        """Находит ближайшие ключи расстояний для интерполяции"""
-        sorted_dists = sorted(distances.keys())
-        if not sorted_dists:
-            return None, None, "Нет данных для расчета"
-        
-        # Проверяем границы диапазона
-        if target_dist < sorted_dists[0]:
-            min_dist = sorted_dists[0]
-            return None, None, f"Слишком малая дистанция. Минимальная: {min_dist}м (не хватает {min_dist - target_dist}м)"
-        
-        if target_dist > sorted_dists[-1]:
-            max_dist = sorted_dists[-1]
-            return None, None, f"Слишком большая дистанция. Максимальная: {max_dist}м (превышение на {target_dist - max_dist}м)"
-        
-        index = bisect.bisect_left(sorted_dists, target_dist)
-        
-        if index == 0:
-            return sorted_dists[0], sorted_dists[0], None
-        
-        low = sorted_dists[index - 1]
-        high = sorted_dists[index]
-        
-        return low, high, None
-
-    def interpolate(self, low_dist, high_dist, target_dist, low_value, high_value):
-        """Линейная интерполяция значений"""
-        if low_dist == high_dist:
-            return low_value
-        ratio = (target_dist - low_dist) / (high_dist - low_dist)
-        return low_value + (high_value - low_value) * ratio
-
     def get_input(self, message, input_type=str, min_val=None, max_val=None, default=None):
         """Универсальная функция ввода данных"""
         while True:
@@ -81,7 +48,7 @@ class MortarCalculator:
 
     def clear_screen(self):
         """Очищает экран консоли"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        print(CLEAR_SCREEN, end="", flush=True)
 
     def print_header(self, text):
         """Выводит красивый заголовок"""
@@ -174,58 +141,9 @@ class MortarCalculator:
         azimuth = self.get_input("Введите поправку", input_type=str, default="0")
         return azimuth
 
-    def perform_calculation(self, mortar_data, shell_data, target_dist, mortar_alt, target_alt):
+    def perform_calculation(self, selected_mortar, selected_shell, target_dist, mortar_alt, target_alt):
         """Выполняет расчет и возвращает результаты"""
-        results = []
-        errors = []
-        
-        for ring_amount in shell_data:
-            try:
-                low_dist, high_dist, error_msg = self.find_closest_keys(shell_data[ring_amount]['Dists'], target_dist)
-                
-                if error_msg:
-                    errors.append(f"{ring_amount} колец: {error_msg}")
-                    continue
-                
-                if low_dist is None or high_dist is None:
-                    errors.append(f"{ring_amount} колец: Дистанция вне диапазона")
-                    continue
-                
-                dispersion = shell_data[ring_amount]['Dispersion']
-                
-                low_mils = shell_data[ring_amount]['Dists'][low_dist][0]
-                high_mils = shell_data[ring_amount]['Dists'][high_dist][0]
-                low_time = shell_data[ring_amount]['Dists'][low_dist][1]
-                high_time = shell_data[ring_amount]['Dists'][high_dist][1]
-                low_mils_per_100m = shell_data[ring_amount]['Dists'][low_dist][2]
-                high_mils_per_100m = shell_data[ring_amount]['Dists'][high_dist][2]
-
-                mils = self.interpolate(low_dist, high_dist, target_dist, low_mils, high_mils)
-                time = self.interpolate(low_dist, high_dist, target_dist, low_time, high_time)
-                mils_per_100m = self.interpolate(low_dist, high_dist, target_dist, low_mils_per_100m, high_mils_per_100m)
-                
-                # Поправка на высоту
-                altitude_difference = mortar_alt - target_alt
-                mils_per_1m = mils_per_100m / 100
-                altitude_compensation = altitude_difference * mils_per_1m
-                
-                total_mils = mils + altitude_compensation
-                
-                result = {
-                    'rings': ring_amount,
-                    'elevation': total_mils,
-                    'time': time,
-                    'dispersion': dispersion,
-                    'altitude_comp': altitude_compensation
-                }
-                
-                results.append(result)
-                
-            except Exception as e:
-                errors.append(f"{ring_amount} колец: Ошибка расчета")
-                continue
-        
-        return results, errors
+        return solve(TABLES[selected_mortar][selected_shell], target_dist, mortar_alt, target_alt)
 
     def run_calculation(self, preset_data=None):
         """Основная функция расчета"""
@@ -280,7 +198,7 @@ class MortarCalculator:
                     return True
                 
                 # Выбор миномета
-                mortar_keys = list(mortars.keys())
+                mortar_keys = list(TABLES.keys())
                 self.print_subheader("Доступные минометы:")
                 
                 for i, x in enumerate(mortar_keys):
@@ -290,14 +208,13 @@ class MortarCalculator:
                 mortar_choice = self.get_input("\nВыберите номер миномета", input_type=int, min_val=1, max_val=len(mortar_keys))
                 mortar_choice -= 1
                 selected_mortar = mortar_keys[mortar_choice]
-                mortar_data = mortars[selected_mortar]
                 country = self.get_country(selected_mortar)
                 
                 self.clear_screen()
                 self.print_header(f"ВЫБРАН: {selected_mortar} {country}")
 
                 # Выбор снаряда
-                shell_keys = list(mortar_data.keys())
+                shell_keys = list(TABLES[selected_mortar].keys())
                 self.print_subheader("Доступные снаряды:")
                 
                 for i, x in enumerate(shell_keys):
@@ -305,7 +222,6 @@ class MortarCalculator:
                 
                 shell_choice = self.get_input("\nВыберите номер снаряда", input_type=int, min_val=1, max_val=len(shell_keys)) - 1
                 selected_shell = shell_keys[shell_choice]
-                shell_data = mortar_data[selected_shell]
                 
                 self.clear_screen()
                 self.print_header(f"{selected_mortar} {country} - {selected_shell}")
@@ -321,12 +237,10 @@ class MortarCalculator:
                 preset_azimuth = self.get_azimuth_input()
             else:
                 # Используем preset данные
-                mortar_data = mortars[selected_mortar]
-                shell_data = mortar_data[selected_shell]
                 country = self.get_country(selected_mortar)
             
             # Выполняем расчет
-            results, errors = self.perform_calculation(mortar_data, shell_data, preset_target_dist, preset_mortar_alt, preset_target_alt)
+            results, errors = self.perform_calculation(selected_mortar, selected_shell, preset_target_dist, preset_mortar_alt, preset_target_alt)
             
             # Показываем результаты
             self.clear_screen()
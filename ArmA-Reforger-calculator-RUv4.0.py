@@ -1,85 +1,66 @@
-from database import mortars
-import bisect
-import os
+from ballistics import TABLES, COVERAGE, solve
+from history_store import open_history
+from dense_cache import DenseTables
+from inverse_solver import range_from_elevation
+from batch_solver import solve_all_shells
+from hit_probability import hit_probabilities, recommend_ring
+from sheaf import aim_points, solve_sheaf
+from map_grid import format_azimuth, mils_in_circle, parse_position, range_azimuth
+from heightmap import Heightmap
+from clearance import check_clearance
+import argparse
 import datetime
-import json
-from colorama import init, Fore, Back, Style
+import time
+from colorama import Fore
+from render import Screen
+from solution_cache import SolutionCache, CACHE_SIZE
 
-# Инициализация colorama для цветного вывода
-init(autoreset=True)
+# Размер страницы истории по умолчанию
+HISTORY_PAGE_SIZE = 20
 
 class MortarCalculator:
-    def __init__(self):
-        self.history = []
+    def __init__(self, history_backend='jsonl', history_page_size=HISTORY_PAGE_SIZE, color=True, dense_cache=False,
+                 cache_size=CACHE_SIZE, heightmap=None):
+        self.screen = Screen(color=color)  # Экран собирается в буфер и выводится целиком
+        self.dense = DenseTables.open() if dense_cache else None  # Плотные таблицы с шагом 1 м
+        self.cache = SolutionCache(cache_size)  # Последние решения для повторных расчетов
         self.current_params = {}  # Сохраняем текущие параметры для быстрой смены снарядов
+        self.shell_matrix = None  # Решения всех снарядов миномета для текущих координат
+        self.mortar_position = None  # Последняя введенная позиция миномета (подставляется по умолчанию)
+        self.heightmap = Heightmap.open(heightmap) if heightmap else None  # Высоты по координатам
+        self.history_page_size = history_page_size
+        self.store = open_history(history_backend)
         self.load_history()  # Загружаем историю при запуске
         
     def load_history(self):
-        """Загружает историю расчетов из файла"""
+        """Открывает хранилище истории без загрузки записей в память"""
         try:
-            if os.path.exists('mortar_history.json'):
-                with open('mortar_history.json', 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
+            self.store.load()
         except Exception as e:
-            print(Fore.RED + f"Ошибка загрузки истории: {e}")
-            self.history = []
+            self.screen.line(Fore.RED, f"Ошибка загрузки истории: {e}")
     
-    def save_history(self):
-        """Сохраняет историю расчетов в файл"""
+    def save_history(self, calculation):
+        """Дописывает расчет в хранилище истории"""
         try:
-            with open('mortar_history.json', 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, ensure_ascii=False, indent=2)
+            self.store.append(calculation)
         except Exception as e:
-            print(Fore.RED + f"Ошибка сохранения истории: {e}")
+            self.screen.line(Fore.RED, f"Ошибка сохранения истории: {e}")
 
     def clear_history(self):
         """Очищает историю расчетов"""
         try:
-            confirm = input(Fore.RED + "Вы уверены, что хотите очистить всю историю? (да/нет): ").strip().lower()
+            confirm = self.screen.prompt(Fore.RED, "Вы уверены, что хотите очистить всю историю? (да/нет): ").strip().lower()
             if confirm in ['да', 'yes', 'y', 'д']:
-                self.history = []
-                self.save_history()
-                print(Fore.GREEN + "История успешно очищена!")
+                self.store.clear()
+                self.screen.line(Fore.GREEN, "История успешно очищена!")
                 return True
             else:
-                print(Fore.YELLOW + "Очистка истории отменена")
+                self.screen.line(Fore.YELLOW, "Очистка истории отменена")
                 return False
         except Exception as e:
-            print(Fore.RED + f"Ошибка при очистке истории: {e}")
+            self.screen.line(Fore.RED, f"Ошибка при очистке истории: {e}")
             return False
 
-    def find_closest_keys(self, distances, target_dist):
-        """Находит ближайшие ключи расстояний для интерполяции"""
-        sorted_dists = sorted(distances.keys())
-        if not sorted_dists:
-            return None, None, "Нет данных для расчета"
-        
-        # Проверяем границы диапазона
-        if target_dist < sorted_dists[0]:
-            min_dist = sorted_dists[0]
-            return None, None, f"Слишком малая дистанция. Минимальная: {min_dist}м (не хватает {min_dist - target_dist}м)"
-        
-        if target_dist > sorted_dists[-1]:
-            max_dist = sorted_dists[-1]
-            return None, None, f"Слишком большая дистанция. Максимальная: {max_dist}м (превышение на {target_dist - max_dist}м)"
-        
-        index = bisect.bisect_left(sorted_dists, target_dist)
-        
-        if index == 0:
-            return sorted_dists[0], sorted_dists[0], None
-        
-        low = sorted_dists[index - 1]
-        high = sorted_dists[index]
-        
-        return low, high, None
-
-    def interpolate(self, low_dist, high_dist, target_dist, low_value, high_value):
-        """Линейная интерполяция значений"""
-        if low_dist == high_dist:
-            return low_value
-        ratio = (target_dist - low_dist) / (high_dist - low_dist)
-        return low_value + (high_value - low_value) * ratio
-
     def get_input(self, message, input_type=str, min_val=None, max_val=None, default=None, allow_back=False):
         """Универсальная функция ввода данных с возможностью возврата"""
         while True:
@@ -92,8 +73,7 @@ class MortarCalculator:
                 if allow_back:
                     prompt = prompt.replace("]:", "] или 'назад':")
                 
-                print(Fore.CYAN + prompt, end="")
-                user_input = input().strip()
+                user_input = self.screen.prompt(Fore.CYAN, prompt).strip()
                 
                 # Проверка на команду "назад"
                 if allow_back and user_input.lower() in ['назад', 'back', 'н']:
@@ -109,34 +89,35 @@ class MortarCalculator:
                     value = user_input
                 
                 if min_val is not None and input_type in [int, float] and value < min_val:
-                    print(Fore.RED + f"Значение должно быть не меньше {min_val}")
+                    self.screen.line(Fore.RED, f"Значение должно быть не меньше {min_val}")
                     continue
                 if max_val is not None and input_type in [int, float] and value > max_val:
-                    print(Fore.RED + f"Значение должно быть не больше {max_val}")
+                    self.screen.line(Fore.RED, f"Значение должно быть не больше {max_val}")
                     continue
                     
                 return value
                 
             except ValueError:
-                print(Fore.RED + f"Пожалуйста, введите корректное значение")
+                self.screen.line(Fore.RED, f"Пожалуйста, введите корректное значение")
             except KeyboardInterrupt:
-                print(Fore.YELLOW + "\nПрограмма прервана пользователем")
+                self.screen.line(Fore.YELLOW, "\nПрограмма прервана пользователем")
+                self.screen.flush()
                 exit()
 
     def clear_screen(self):
-        """Очищает экран консоли"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        """Начинает новый экран"""
+        self.screen.clear()
 
     def print_header(self, text):
         """Выводит красивый заголовок"""
-        print(Fore.GREEN + "=" * 60)
-        print(Fore.GREEN + f"{text:^60}")
-        print(Fore.GREEN + "=" * 60)
+        self.screen.line(Fore.GREEN, "=" * 60)
+        self.screen.line(Fore.GREEN, f"{text:^60}")
+        self.screen.line(Fore.GREEN, "=" * 60)
 
     def print_subheader(self, text):
         """Выводит подзаголовок"""
-        print(Fore.YELLOW + f"\n{text}")
-        print(Fore.YELLOW + "-" * 50)
+        self.screen.line(Fore.YELLOW, f"\n{text}")
+        self.screen.line(Fore.YELLOW, "-" * 50)
 
     def get_country(self, mortar_name):
         """Определяет страну по названию миномета"""
@@ -153,55 +134,158 @@ class MortarCalculator:
     def save_to_history(self, calculation):
         """Сохраняет расчет в историю"""
         calculation['timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.history.append(calculation)
         
-        # Сохраняем историю в файл
-        self.save_history()
+        # Дописываем расчет в хранилище
+        self.save_history(calculation)
 
-    def show_history(self):
-        """Показывает историю расчетов с возможностью повторного использования"""
-        if not self.history:
-            print(Fore.YELLOW + "\nИстория расчетов пуста")
-            input(Fore.CYAN + "Нажмите Enter для продолжения...")
-            return None
-            
-        self.clear_screen()
-        self.print_header("ИСТОРИЯ РАСЧЕТОВ")
-        print(Fore.CYAN + "Выберите расчет для повторного использования или 0 для отмены:")
-        
-        for i, calc in enumerate(reversed(self.history), 1):
-            target_name = calc.get('target_name', 'Без названия')
-            print(Fore.WHITE + f"\n{i}. {calc['timestamp']} - {target_name}")
-            print(Fore.CYAN + f"   Миномет: {calc['mortar']} - {calc['shell']}")
-            print(Fore.CYAN + f"   Дистанция: {calc['distance']}м")
-            print(Fore.CYAN + f"   Азимут: {calc.get('azimuth', '0')}")
-            
-            # Показываем результаты расчета
-            if calc.get('results'):
-                result = calc['results'][0]  # Берем первый результат
-                print(Fore.GREEN + f"   Угол: {round(result['elevation'])}мил | Время: {result['time']:.1f}с")
-        
-        print(Fore.RED + f"\n{len(self.history) + 1}. Очистить всю историю")
-        
+    def print_history_item(self, number, calc):
+        """Выводит краткую информацию о расчете из истории"""
+        self.screen.line(Fore.WHITE, f"\n{number}. {calc.timestamp} - {calc.target_name}")
+        self.screen.line(Fore.CYAN, f"   Миномет: {calc.mortar} - {calc.shell}")
+        self.screen.line(Fore.CYAN, f"   Дистанция: {calc.distance}м")
+        self.screen.line(Fore.CYAN, f"   Азимут: {calc.azimuth}")
+
+        # Показываем результаты расчета
+        if calc.results:
+            result = calc.results[0]  # Берем первый результат
+            self.screen.line(Fore.GREEN, f"   Угол: {round(result.elevation)}мил | Время: {result.time:.1f}с")
+
+    def choose_history_item(self, items):
+        """Запрашивает номер расчета из списка"""
         try:
-            choice = int(input(Fore.CYAN + "\nВыберите номер расчета (0 - назад): "))
+            choice = int(self.screen.prompt(Fore.CYAN, "\nВыберите номер расчета (0 - назад): "))
             if choice == 0:
                 return None
-            if 1 <= choice <= len(self.history):
-                return self.history[-choice]  # Берем из конца списка
-            elif choice == len(self.history) + 1:
-                if self.clear_history():
-                    input(Fore.CYAN + "Нажмите Enter для продолжения...")
+            if 1 <= choice <= len(items):
+                return items[choice - 1]
+            self.screen.line(Fore.RED, "Неверный выбор")
+        except ValueError:
+            self.screen.line(Fore.RED, "Введите число")
+        self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+        return None
+
+    def show_history(self):
+        """Постраничный просмотр истории с возможностью повторного использования"""
+        page_number = 0
+        while True:
+            total = self.store.count()
+            if not total:
+                self.screen.line(Fore.YELLOW, "\nИстория расчетов пуста")
+                self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
                 return None
-            else:
-                print(Fore.RED + "Неверный выбор")
-                input(Fore.CYAN + "Нажмите Enter для продолжения...")
+
+            pages = (total + self.history_page_size - 1) // self.history_page_size
+            page_number = max(0, min(page_number, pages - 1))
+            offset = page_number * self.history_page_size
+
+            # С диска читаются только записи текущей страницы
+            page = self.store.get_page(offset, self.history_page_size)
+
+            self.clear_screen()
+            self.print_header("ИСТОРИЯ РАСЧЕТОВ")
+            self.screen.line(Fore.CYAN, f"Страница {page_number + 1} из {pages} (всего расчетов: {total})")
+
+            for i, calc in enumerate(page, offset + 1):
+                self.print_history_item(i, calc)
+
+            self.screen.line(Fore.YELLOW, "\nКоманды: '>' - следующая страница, '<' - предыдущая, 'стр N' - перейти на страницу N,")
+            self.screen.line(Fore.YELLOW, "'размер N' - размер страницы, 'поиск' - поиск по истории")
+            self.screen.line(Fore.RED, "'очистить' - очистить всю историю")
+
+            command = self.screen.prompt(Fore.CYAN, "\nНомер расчета или команда (0 - назад): ").strip().lower()
+            # Команды словами: однобуквенные 'р'/'p' и 'с'/'c' на разных раскладках выглядят одинаково
+            words = command.split()
+            keyword = words[0] if len(words) == 2 else None
+
+            if command in ['0', 'назад', 'back']:
                 return None
-        except ValueError:
-            print(Fore.RED + "Введите число")
-            input(Fore.CYAN + "Нажмите Enter для продолжения...")
+            elif command == '>':
+                page_number += 1
+            elif command == '<':
+                page_number -= 1
+            elif command in ['поиск', 'search']:
+                return self.search_history()
+            elif command in ['очистить', 'clear']:
+                if self.clear_history():
+                    self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+                    return None
+            elif keyword in ['стр', 'page']:
+                try:
+                    page_number = int(words[1]) - 1
+                except ValueError:
+                    self.screen.line(Fore.RED, "Введите номер страницы, например: стр 3")
+                    self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+            elif keyword in ['размер', 'size']:
+                try:
+                    self.history_page_size = max(1, int(words[1]))
+                    page_number = offset // self.history_page_size
+                except ValueError:
+                    self.screen.line(Fore.RED, "Введите размер страницы, например: размер 10")
+                    self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+            else:
+                try:
+                    choice = int(command)
+                except ValueError:
+                    self.screen.line(Fore.RED, "Неизвестная команда")
+                    self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+                    continue
+                if 1 <= choice <= total:
+                    # Номер может быть и с другой страницы
+                    return self.store.get(choice - 1)
+                self.screen.line(Fore.RED, "Неверный выбор")
+                self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+
+    def search_history(self):
+        """Поиск в истории по миномету, снаряду, названию цели, дистанции и дате"""
+        self.clear_screen()
+        self.print_header("ПОИСК ПО ИСТОРИИ")
+        self.screen.line(Fore.WHITE, "Нажмите Enter, чтобы не учитывать параметр при поиске")
+
+        mortar_keys = list(TABLES.keys())
+        self.print_subheader("Минометы:")
+        for i, x in enumerate(mortar_keys):
+            self.screen.line(Fore.WHITE, f'{i+1:2d}. {x} {self.get_country(x)}')
+        mortar_choice = self.get_input("\nНомер миномета (0 - любой)", input_type=int, min_val=0, max_val=len(mortar_keys), default=0)
+        mortar = mortar_keys[mortar_choice - 1] if mortar_choice else None
+
+        shell = None
+        if mortar:
+            shell_keys = list(TABLES[mortar].keys())
+            self.print_subheader("Снаряды:")
+            for i, x in enumerate(shell_keys):
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x}')
+            shell_choice = self.get_input("\nНомер снаряда (0 - любой)", input_type=int, min_val=0, max_val=len(shell_keys), default=0)
+            shell = shell_keys[shell_choice - 1] if shell_choice else None
+
+        name = self.get_input("Часть названия цели", input_type=str, default="")
+        min_dist = self.get_input("Дистанция от (м)", input_type=int, min_val=0, max_val=10000, default=0)
+        max_dist = self.get_input("Дистанция до (м)", input_type=int, min_val=0, max_val=10000, default=10000)
+        date = self.get_input("Дата (ГГГГ-ММ-ДД)", input_type=str, default="")
+
+        started = time.perf_counter()
+        found = self.store.search(
+            mortar=mortar,
+            shell=shell,
+            name=name or None,
+            min_dist=min_dist or None,
+            max_dist=max_dist if max_dist != 10000 else None,
+            date=date or None
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.clear_screen()
+        self.print_header("РЕЗУЛЬТАТЫ ПОИСКА")
+        self.screen.line(Fore.CYAN, f"Найдено: {len(found)} (за {elapsed_ms:.1f} мс)")
+
+        if not found:
+            self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
             return None
 
+        for i, calc in enumerate(found, 1):
+            self.print_history_item(i, calc)
+
+        return self.choose_history_item(found)
+
     def show_help(self):
         """Показывает справку"""
         self.clear_screen()
@@ -214,23 +298,65 @@ class MortarCalculator:
             ("Название цели", "Можно дать название цели для удобства поиска в истории"),
             ("Высоты", "Учитывается разница высот между минометом и целью"),
             ("Навигация", "В любой момент можно ввести 'назад' для возврата"),
+            ("Страницы истории", "'>' и '<' листают историю, 'стр N' - переход на страницу N, 'размер N' - размер страницы"),
+            ("Обратный расчет", "По углу возвышения, кольцам и высотам находит дистанцию падения"),
+            ("Сравнение снарядов", "После расчета все снаряды миномета уже посчитаны - можно сравнить их в одной таблице"),
+            ("Координаты", "Вместо дистанции можно ввести координаты сетки (6/8/10 цифр) или метры миномета и цели - дистанция и азимут считаются сами (НАТО 6400, СССР 6000 тысячных)"),
+            ("Карта высот", "С флагом --heightmap высоты миномета и цели по координатам подставляются автоматически, а траектории колец проверяются на закрытие рельефом"),
+            ("Огонь по площади", "Линейный, круговой или прямоугольный веер: огневой список с азимутом, углом и временем на каждый выстрел"),
+            ("Вероятность попадания", "По разбросу колец и ошибкам дистанции/высоты оценивает шанс попасть и советует кольца"),
+            ("Кэш решений", "Повторные расчеты той же цели берутся из кэша, статистика - пункт 6 главного меню"),
+            ("Поиск", "В истории можно искать по миномету, снаряду, названию цели, дистанции и дате"),
             ("Очистка истории", "Можно очистить всю историю расчетов через меню истории")
         ]
         
         for title, desc in help_text:
-            print(Fore.YELLOW + f"\n{title}:")
-            print(Fore.WHITE + f"  {desc}")
+            self.screen.line(Fore.YELLOW, f"\n{title}:")
+            self.screen.line(Fore.WHITE, f"  {desc}")
             
-        input(Fore.CYAN + "\nНажмите Enter для возврата...")
+        self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
 
     def get_azimuth_input(self):
         """Запрос поправки по азимуту с возможностью возврата"""
-        print(Fore.WHITE + "\nПоправка по азимуту (например: '2-0' или '1 5' или '0'):")
+        self.screen.line(Fore.WHITE, "\nПоправка по азимуту (например: '2-0' или '1 5' или '0'):")
         azimuth = self.get_input("Введите поправку", input_type=str, default="0", allow_back=True)
         if azimuth == 'back':
             return 'back'
         return azimuth
 
+    def get_coordinates_input(self, selected_mortar):
+        """Ввод координат миномета и цели.
+
+        Возвращает (дистанция, азимут в тысячных, высота миномета, высота цели,
+        позиции) или 'back'; высоты - по карте высот, None без карты или вне ее,
+        позиции - ((восток, север) миномета, (восток, север) цели) в метрах.
+        """
+        self.screen.line(Fore.WHITE, "\nКоординаты сетки (6/8/10 цифр, например '047123' или '0471 1234')")
+        self.screen.line(Fore.WHITE, "или метры с суффиксом м (например '4712 1234м'):")
+        while True:
+            mortar_position = self.get_input("Позиция миномета", input_type=str, default=self.mortar_position, allow_back=True)
+            if mortar_position == 'back':
+                return 'back'
+            target_position = self.get_input("Позиция цели", input_type=str, allow_back=True)
+            if target_position == 'back':
+                return 'back'
+            try:
+                mortar_east, mortar_north = parse_position(mortar_position)
+                target_east, target_north = parse_position(target_position)
+            except ValueError as e:
+                self.screen.line(Fore.RED, str(e))
+                continue
+            self.mortar_position = mortar_position
+
+            dist, azimuth = range_azimuth(mortar_east, mortar_north, target_east, target_north,
+                                          mils_in_circle(selected_mortar))
+            mortar_alt = target_alt = None
+            if self.heightmap is not None:
+                mortar_alt = self.heightmap.altitude_at(mortar_east, mortar_north)
+                target_alt = self.heightmap.altitude_at(target_east, target_north)
+            positions = ((mortar_east, mortar_north), (target_east, target_north))
+            return round(float(dist)), float(azimuth), mortar_alt, target_alt, positions
+
     def get_target_name(self):
         """Запрос названия цели"""
         target_name = self.get_input("Название цели (для истории)", input_type=str, default="Без названия", allow_back=True)
@@ -238,95 +364,246 @@ class MortarCalculator:
             return 'back'
         return target_name
 
-    def perform_calculation(self, mortar_data, shell_data, target_dist, mortar_alt, target_alt):
+    def perform_calculation(self, selected_mortar, selected_shell, target_dist, mortar_alt, target_alt):
         """Выполняет расчет и возвращает результаты"""
-        results = []
-        errors = []
-        
-        for ring_amount in shell_data:
-            try:
-                low_dist, high_dist, error_msg = self.find_closest_keys(shell_data[ring_amount]['Dists'], target_dist)
-                
-                if error_msg:
-                    errors.append(f"{ring_amount} колец: {error_msg}")
-                    continue
-                
-                if low_dist is None or high_dist is None:
-                    errors.append(f"{ring_amount} колец: Дистанция вне диапазона")
-                    continue
-                
-                dispersion = shell_data[ring_amount]['Dispersion']
-                
-                low_mils = shell_data[ring_amount]['Dists'][low_dist][0]
-                high_mils = shell_data[ring_amount]['Dists'][high_dist][0]
-                low_time = shell_data[ring_amount]['Dists'][low_dist][1]
-                high_time = shell_data[ring_amount]['Dists'][high_dist][1]
-                low_mils_per_100m = shell_data[ring_amount]['Dists'][low_dist][2]
-                high_mils_per_100m = shell_data[ring_amount]['Dists'][high_dist][2]
+        self.cache.bind(self.dense if self.dense is not None else TABLES)
+        key = (selected_mortar, selected_shell, target_dist, mortar_alt - target_alt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
 
-                mils = self.interpolate(low_dist, high_dist, target_dist, low_mils, high_mils)
-                time = self.interpolate(low_dist, high_dist, target_dist, low_time, high_time)
-                mils_per_100m = self.interpolate(low_dist, high_dist, target_dist, low_mils_per_100m, high_mils_per_100m)
-                
-                # Поправка на высоту
-                altitude_difference = mortar_alt - target_alt
-                mils_per_1m = mils_per_100m / 100
-                altitude_compensation = altitude_difference * mils_per_1m
-                
-                total_mils = mils + altitude_compensation
-                
-                result = {
-                    'rings': ring_amount,
-                    'elevation': total_mils,
-                    'time': time,
-                    'dispersion': dispersion,
-                    'altitude_comp': altitude_compensation
-                }
-                
-                results.append(result)
-                
-            except Exception as e:
-                errors.append(f"{ring_amount} колец: Ошибка расчета")
+        if self.dense is not None:
+            solution = self.dense.solve(selected_mortar, selected_shell, target_dist, mortar_alt, target_alt)
+        else:
+            solution = solve(TABLES[selected_mortar][selected_shell], target_dist, mortar_alt, target_alt)
+        self.cache.put(key, solution)
+        return solution
+
+    def solve_all_shells(self, selected_mortar, target_dist, mortar_alt, target_alt):
+        """Решения всех снарядов миномета для текущих координат.
+
+        Сначала ищет их в кэше решений, затем в последней матрице; если
+        нет - считает все снаряды разом (матрицей по таблицам или по плотным таблицам при
+        --dense-cache) и кладет каждое решение в кэш.
+        """
+        self.cache.bind(self.dense if self.dense is not None else TABLES)
+        key = (selected_mortar, target_dist, mortar_alt - target_alt)
+        shells = list(TABLES[selected_mortar])
+        solutions = {}
+        for shell in shells:
+            cached = self.cache.get((selected_mortar, shell, target_dist, mortar_alt - target_alt))
+            if cached is None:
+                break
+            solutions[shell] = cached
+        else:
+            return solutions
+
+        # Кэш выключен или вытеснен - последняя матрица для тех же координат
+        if self.shell_matrix is not None and self.shell_matrix[0] == key:
+            return self.shell_matrix[1]
+
+        if self.dense is not None:
+            solutions = {shell: self.dense.solve(selected_mortar, shell, target_dist, mortar_alt, target_alt)
+                         for shell in shells}
+        else:
+            solutions = solve_all_shells(selected_mortar, target_dist, mortar_alt, target_alt)
+        for shell, solution in solutions.items():
+            self.cache.put((selected_mortar, shell, target_dist, mortar_alt - target_alt), solution)
+        self.shell_matrix = (key, solutions)
+        return solutions
+
+    def shell_solution(self, selected_mortar, selected_shell, target_dist, mortar_alt, target_alt):
+        """Решение для снаряда из решений всех снарядов текущих координат без пересчета"""
+        results, errors = self.solve_all_shells(selected_mortar, target_dist, mortar_alt, target_alt)[selected_shell]
+        return [dict(result) for result in results], list(errors)
+
+    def compare_shells(self, current_params):
+        """Сравнение всех снарядов миномета для текущих координат, возвращает следующий шаг"""
+        try:
+            mortar = current_params['mortar']
+            solutions = self.solve_all_shells(mortar, current_params['distance'],
+                                              current_params['mortar_alt'], current_params['target_alt'])
+
+            self.clear_screen()
+            self.print_header("СРАВНЕНИЕ СНАРЯДОВ")
+            self.screen.line(Fore.WHITE, f"Цель: {current_params.get('target_name', 'Без названия')}")
+            self.screen.line(Fore.WHITE, f"Миномет: {mortar} {self.get_country(mortar)}")
+            self.screen.line(Fore.WHITE, f"Дистанция: {current_params['distance']}м | "
+                                         f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м")
+            self.screen.line(Fore.YELLOW, "\nВ ячейках: угол (милы) / время полета (сек), '-' - не достает")
+            self.screen.line(Fore.YELLOW, "=" * 60)
+
+            shells = list(solutions)
+            width = 14
+            self.screen.line(Fore.CYAN, "Колец " + "".join(f"{shell[:width - 1]:<{width}}" for shell in shells))
+
+            by_rings = {
+                shell: {result['rings']: result for result in solutions[shell][0]}
+                for shell in shells
+            }
+            all_rings = sorted({table.rings for shell in shells for table in TABLES[mortar][shell].values()})
+            for rings in all_rings:
+                cells = []
+                for shell in shells:
+                    result = by_rings[shell].get(rings)
+                    cell = f"{round(result['elevation'])}/{result['time']:.1f}" if result else "-"
+                    cells.append(f"{cell:<{width}}")
+                self.screen.line(Fore.WHITE, f"{rings:^5} " + "".join(cells))
+
+            self.screen.line(Fore.GREEN, "\n" + "=" * 60)
+            self.screen.line(Fore.CYAN, "Выберите действие:")
+            self.screen.line(Fore.WHITE, " 1. Сменить снаряд (те же координаты)")
+            self.screen.line(Fore.WHITE, " 2. Новый расчет")
+            self.screen.line(Fore.RED, " 0. Выход")
+
+            next_action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=2)
+            if next_action == 0:
+                return None
+            elif next_action == 1:
+                return self.change_shell, current_params
+            return self.run_calculation, None
+
+        except Exception as e:
+            self.screen.line(Fore.RED, f"\nОшибка сравнения снарядов: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
+
+    def hit_probability(self, current_params):
+        """Вероятность попадания по кольцам и рекомендация, возвращает следующий шаг"""
+        try:
+            self.clear_screen()
+            self.print_header("ВЕРОЯТНОСТЬ ПОПАДАНИЯ")
+
+            radius = self.get_input("Радиус цели (м)", input_type=float, default=10, min_val=0.5, max_val=500, allow_back=True)
+            if radius == 'back':
+                return self.run_calculation, None
+            rounds = self.get_input("Выстрелов в серии", input_type=int, default=3, min_val=1, max_val=100, allow_back=True)
+            if rounds == 'back':
+                return self.run_calculation, None
+            probability = self.get_input("Нужная вероятность попадания (%)", input_type=float, default=90, min_val=1, max_val=99.9, allow_back=True)
+            if probability == 'back':
+                return self.run_calculation, None
+            dist_error = self.get_input("Ошибка определения дистанции (м)", input_type=float, default=10, min_val=0, max_val=1000, allow_back=True)
+            if dist_error == 'back':
+                return self.run_calculation, None
+            alt_error = self.get_input("Ошибка определения высоты (м)", input_type=float, default=5, min_val=0, max_val=1000, allow_back=True)
+            if alt_error == 'back':
+                return self.run_calculation, None
+
+            estimates = hit_probabilities(
+                current_params['mortar'], current_params['shell'], current_params['distance'],
+                current_params['mortar_alt'], current_params['target_alt'], radius, rounds,
+                probability / 100, dist_error, alt_error)
+            best = recommend_ring(estimates)
+
+            self.clear_screen()
+            self.print_header("ВЕРОЯТНОСТЬ ПОПАДАНИЯ")
+            self.screen.line(Fore.WHITE, f"Миномет: {current_params['mortar']} - {current_params['shell']}")
+            self.screen.line(Fore.WHITE, f"Дистанция: {current_params['distance']}м (±{dist_error:g}м) | "
+                                         f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м (±{alt_error:g}м)")
+            self.screen.line(Fore.WHITE, f"Радиус цели: {radius:g}м")
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
+
+            if not estimates:
+                self.screen.line(Fore.RED, "\nНи одно кольцо не достает до цели")
+            for estimate in estimates:
+                needed = estimate['rounds_needed']
+                needed_text = f"{needed}" if needed is not None else "больше 20"
+                color = Fore.GREEN if estimate is best else Fore.WHITE
+                self.screen.line(color, f"\nКолец: {estimate['rings']} (разброс {estimate['dispersion']}м)")
+                self.screen.line(color, f"   1 выстрел: {estimate['single'] * 100:.0f}% | "
+                                        f"{rounds} выстр.: {estimate['hit'] * 100:.0f}% | "
+                                        f"для {probability:g}%: {needed_text} выстр.")
+                if estimate['out_of_table']:
+                    self.screen.line(Fore.YELLOW, f"   Снаряд уходит за пределы таблицы в {estimate['out_of_table'] * 100:.0f}% выборок "
+                                                  f"- они считаются промахом")
+                if estimate['ambiguous']:
+                    self.screen.line(Fore.YELLOW, f"   Точка падения неоднозначна для {estimate['ambiguous'] * 100:.0f}% выборок "
+                                                  f"(угол встречается на нескольких дистанциях) - они не учтены")
+
+            if best is not None:
+                self.screen.line(Fore.GREEN, f"\nРекомендация: {best['rings']} колец, {best['rounds_needed']} выстр.")
+            elif estimates:
+                self.screen.line(Fore.RED, f"\nНи одно кольцо не дает {probability:g}% за 20 выстрелов")
+
+            self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
+            return self.run_calculation, None
+
+        except Exception as e:
+            self.screen.line(Fore.RED, f"\nОшибка расчета вероятности: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
+
+    def print_clearance(self, current_params, results):
+        """Проверка траекторий колец над рельефом (нужны карта высот и координаты)"""
+        positions = current_params.get('positions')
+        if self.heightmap is None or not positions or not results:
+            return
+        checks = check_clearance(self.heightmap, positions[0], positions[1],
+                                 current_params['mortar_alt'], current_params['target_alt'],
+                                 results, mils_in_circle(current_params['mortar']))
+        self.print_subheader("Проверка рельефа:")
+        for check in checks:
+            if check['clearance'] is None:
+                self.screen.line(Fore.YELLOW, f"Колец {check['rings']}: не проверено - линия стрельбы вне карты высот")
                 continue
-        
-        return results, errors
+            partial = " (часть линии вне карты высот)" if check['off_map'] else ""
+            if check['masked']:
+                self.screen.line(Fore.RED, f"Колец {check['rings']}: ЗАКРЫТО рельефом в {round(check['obstacle'])}м от миномета "
+                                           f"(запас {round(check['clearance'])}м){partial}")
+            else:
+                self.screen.line(Fore.GREEN, f"Колец {check['rings']}: чисто, запас {round(check['clearance'])}м | "
+                                             f"вершина {round(check['apex'])}м | падение {round(check['descent'])}°{partial}")
+
+    def show_cache_stats(self):
+        """Показывает статистику кэша решений"""
+        self.clear_screen()
+        self.print_header("СТАТИСТИКА КЭША РЕШЕНИЙ")
+
+        stats = self.cache.stats()
+        self.screen.line(Fore.WHITE, f"Решений в кэше: {stats['size']} из {stats['maxsize']}")
+        self.screen.line(Fore.GREEN, f"Попаданий: {stats['hits']}")
+        self.screen.line(Fore.YELLOW, f"Промахов: {stats['misses']}")
+        self.screen.line(Fore.MAGENTA, f"Вытеснений: {stats['evictions']}")
+        self.screen.line(Fore.CYAN, f"Доля попаданий: {stats['hit_rate'] * 100:.1f}%")
+
+        self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
 
     def change_shell(self, current_params):
-        """Быстрая смена снаряда без изменения координат"""
+        """Быстрая смена снаряда без изменения координат, возвращает следующий шаг"""
         try:
             self.clear_screen()
             self.print_header("БЫСТРАЯ СМЕНА СНАРЯДА")
             
-            print(Fore.WHITE + f"Текущие параметры:")
-            print(Fore.CYAN + f"Цель: {current_params.get('target_name', 'Без названия')}")
-            print(Fore.CYAN + f"Миномет: {current_params['mortar']}")
-            print(Fore.CYAN + f"Дистанция: {current_params['distance']}м")
-            print(Fore.CYAN + f"Высота миномета: {current_params['mortar_alt']}м")
-            print(Fore.CYAN + f"Высота цели: {current_params['target_alt']}м")
-            print(Fore.CYAN + f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м")
-            print(Fore.CYAN + f"Азимут: {current_params.get('azimuth', '0')}")
+            self.screen.line(Fore.WHITE, f"Текущие параметры:")
+            self.screen.line(Fore.CYAN, f"Цель: {current_params.get('target_name', 'Без названия')}")
+            self.screen.line(Fore.CYAN, f"Миномет: {current_params['mortar']}")
+            self.screen.line(Fore.CYAN, f"Дистанция: {current_params['distance']}м")
+            self.screen.line(Fore.CYAN, f"Высота миномета: {current_params['mortar_alt']}м")
+            self.screen.line(Fore.CYAN, f"Высота цели: {current_params['target_alt']}м")
+            self.screen.line(Fore.CYAN, f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м")
+            self.screen.line(Fore.CYAN, f"Азимут: {current_params.get('azimuth', '0')}")
             
             # Получаем доступные снаряды для этого миномета
-            mortar_data = mortars[current_params['mortar']]
-            shell_keys = list(mortar_data.keys())
+            shell_keys = list(TABLES[current_params['mortar']].keys())
             
             self.print_subheader("Доступные снаряды:")
             for i, x in enumerate(shell_keys):
-                print(Fore.WHITE + f'{i+1:2d}. {x}')
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x}')
             
-            print(Fore.RED + f'\n 0. Назад')
+            self.screen.line(Fore.RED, f'\n 0. Назад')
             
             shell_choice = self.get_input("\nВыберите новый снаряд", input_type=int, min_val=0, max_val=len(shell_keys))
             
             if shell_choice == 0:
-                return True  # Возвращаемся назад
+                return self.run_calculation, None  # Возвращаемся в главное меню
             
             shell_choice -= 1
             selected_shell = shell_keys[shell_choice]
             
-            # Выполняем расчет с новым снарядом
-            results, errors = self.perform_calculation(
-                mortar_data, mortar_data[selected_shell], 
+            # Берем решение для нового снаряда из уже посчитанной матрицы
+            results, errors = self.shell_solution(
+                current_params['mortar'], selected_shell,
                 current_params['distance'], 
                 current_params['mortar_alt'], 
                 current_params['target_alt']
@@ -336,39 +613,41 @@ class MortarCalculator:
             self.clear_screen()
             self.print_header("РЕЗУЛЬТАТЫ С НОВЫМ СНАРЯДОМ")
             
-            print(Fore.WHITE + f"Цель: {current_params.get('target_name', 'Без названия')}")
-            print(Fore.WHITE + f"Миномет: {current_params['mortar']}")
-            print(Fore.WHITE + f"Снаряд: {selected_shell}")
-            print(Fore.WHITE + f"Дистанция: {current_params['distance']}м")
-            print(Fore.WHITE + f"Высота миномета: {current_params['mortar_alt']}м")
-            print(Fore.WHITE + f"Высота цели: {current_params['target_alt']}м")
-            print(Fore.WHITE + f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м")
+            self.screen.line(Fore.WHITE, f"Цель: {current_params.get('target_name', 'Без названия')}")
+            self.screen.line(Fore.WHITE, f"Миномет: {current_params['mortar']}")
+            self.screen.line(Fore.WHITE, f"Снаряд: {selected_shell}")
+            self.screen.line(Fore.WHITE, f"Дистанция: {current_params['distance']}м")
+            self.screen.line(Fore.WHITE, f"Высота миномета: {current_params['mortar_alt']}м")
+            self.screen.line(Fore.WHITE, f"Высота цели: {current_params['target_alt']}м")
+            self.screen.line(Fore.WHITE, f"Разница высот: {current_params['mortar_alt'] - current_params['target_alt']}м")
             
             if current_params.get('azimuth', '0') != "0":
-                print(Fore.WHITE + f"Азимут: {current_params['azimuth']}")
+                self.screen.line(Fore.WHITE, f"Азимут: {current_params['azimuth']}")
             
-            print(Fore.YELLOW + "\n" + "=" * 60)
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
             
             # Показываем ошибки если есть
             if errors:
-                print(Fore.RED + "\nПроблемы с расчетом:")
+                self.screen.line(Fore.RED, "\nПроблемы с расчетом:")
                 for error in errors:
-                    print(Fore.RED + f"   {error}")
-                print()
+                    self.screen.line(Fore.RED, f"   {error}")
+                self.screen.line()
             
             if not results:
-                print(Fore.RED + "Не удалось рассчитать ни одного варианта")
-                print(Fore.YELLOW + "Попробуйте другую дистанцию или снаряд")
+                self.screen.line(Fore.RED, "Не удалось рассчитать ни одного варианта")
+                self.screen.line(Fore.YELLOW, "Попробуйте другую дистанцию или снаряд")
             else:
                 # Сортируем результаты по количеству колец
                 results.sort(key=lambda x: x['rings'])
                 
                 for result in results:
-                    print(Fore.GREEN + f"\nКолец: {result['rings']}")
-                    print(Fore.WHITE + f"   Разброс: {result['dispersion']}м")
-                    print(Fore.CYAN + f"   Угол возвышения: {round(result['elevation'])} милов")
-                    print(Fore.YELLOW + f"   Время полета: {round(result['time'], 2)} сек")
-                    print(Fore.MAGENTA + f"   Поправка высоты: {round(result['altitude_comp'], 1)} милов")
+                    self.screen.line(Fore.GREEN, f"\nКолец: {result['rings']}")
+                    self.screen.line(Fore.WHITE, f"   Разброс: {result['dispersion']}м")
+                    self.screen.line(Fore.CYAN, f"   Угол возвышения: {round(result['elevation'])} милов")
+                    self.screen.line(Fore.YELLOW, f"   Время полета: {round(result['time'], 2)} сек")
+                    self.screen.line(Fore.MAGENTA, f"   Поправка высоты: {round(result['altitude_comp'], 1)} милов")
+
+                self.print_clearance(current_params, results)
             
             # Сохраняем в историю
             calculation_data = {
@@ -383,62 +662,308 @@ class MortarCalculator:
             }
             self.save_to_history(calculation_data)
             
-            # Обновляем текущие параметры
-            self.current_params = calculation_data
+            # Обновляем текущие параметры (координаты в историю не пишутся, но нужны для проверки рельефа)
+            self.current_params = {**calculation_data, 'positions': current_params.get('positions')}
             
             # Спрашиваем дальнейшие действия
-            print(Fore.GREEN + "\n" + "=" * 60)
-            print(Fore.CYAN + "Выберите действие:")
-            print(Fore.WHITE + " 1. Сменить еще один снаряд")
-            print(Fore.WHITE + " 2. Новый расчет")
-            print(Fore.RED + " 0. Выход")
+            self.screen.line(Fore.GREEN, "\n" + "=" * 60)
+            self.screen.line(Fore.CYAN, "Выберите действие:")
+            self.screen.line(Fore.WHITE, " 1. Сменить еще один снаряд")
+            self.screen.line(Fore.WHITE, " 2. Новый расчет")
+            self.screen.line(Fore.WHITE, " 3. Сравнить все снаряды")
+            self.screen.line(Fore.WHITE, " 4. Вероятность попадания и выбор колец")
+            self.screen.line(Fore.RED, " 0. Выход")
             
-            next_action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=2)
+            next_action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=4)
             
             if next_action == 0:
-                return False
+                return None
             elif next_action == 1:
-                # Рекурсивно вызываем смену снаряда снова
-                return self.change_shell(self.current_params)
+                # Смена еще одного снаряда
+                return self.change_shell, self.current_params
+            elif next_action == 3:
+                return self.compare_shells, self.current_params
+            elif next_action == 4:
+                return self.hit_probability, self.current_params
             else:
-                return True
+                return self.run_calculation, None
                 
         except Exception as e:
-            print(Fore.RED + f"\nОшибка при смене снаряда: {str(e)}")
-            input(Fore.YELLOW + "Нажмите Enter для продолжения...")
-            return True
+            self.screen.line(Fore.RED, f"\nОшибка при смене снаряда: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
+
+    def inverse_calculation(self, data=None):
+        """Обратный расчет: по углу возвышения и кольцам находит дистанцию"""
+        try:
+            self.clear_screen()
+            self.print_header("ОБРАТНЫЙ РАСЧЕТ")
+
+            mortar_keys = list(TABLES.keys())
+            self.print_subheader("Доступные минометы:")
+            for i, x in enumerate(mortar_keys):
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x} {self.get_country(x)}')
+            self.screen.line(Fore.RED, f'\n 0. Назад')
+            mortar_choice = self.get_input("\nВыберите номер миномета", input_type=int, min_val=0, max_val=len(mortar_keys))
+            if mortar_choice == 0:
+                return self.run_calculation, None
+            selected_mortar = mortar_keys[mortar_choice - 1]
+
+            shell_keys = list(TABLES[selected_mortar].keys())
+            self.print_subheader("Доступные снаряды:")
+            for i, x in enumerate(shell_keys):
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x}')
+            self.screen.line(Fore.RED, f'\n 0. Назад')
+            shell_choice = self.get_input("\nВыберите номер снаряда", input_type=int, min_val=0, max_val=len(shell_keys))
+            if shell_choice == 0:
+                return self.run_calculation, None
+            selected_shell = shell_keys[shell_choice - 1]
+            shell_tables = TABLES[selected_mortar][selected_shell]
+
+            rings = self.get_input(f"Количество колец ({', '.join(str(r) for r in shell_tables)})", input_type=int,
+                                   min_val=min(shell_tables), max_val=max(shell_tables), allow_back=True)
+            if rings == 'back':
+                return self.run_calculation, None
+            if rings not in shell_tables:
+                self.screen.line(Fore.RED, "Для этого снаряда нет таблицы с таким количеством колец")
+                self.screen.prompt(Fore.CYAN, "Нажмите Enter для продолжения...")
+                return self.inverse_calculation, None
+
+            elevation = self.get_input("Угол возвышения (милы)", input_type=float, min_val=0, max_val=10000, allow_back=True)
+            if elevation == 'back':
+                return self.run_calculation, None
+            mortar_alt = self.get_input("Высота миномета (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if mortar_alt == 'back':
+                return self.run_calculation, None
+            target_alt = self.get_input("Высота точки падения (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if target_alt == 'back':
+                return self.run_calculation, None
+
+            distance = float(range_from_elevation(selected_mortar, selected_shell, rings, elevation, mortar_alt, target_alt))
+
+            self.clear_screen()
+            self.print_header("РЕЗУЛЬТАТ ОБРАТНОГО РАСЧЕТА")
+            self.screen.line(Fore.WHITE, f"Миномет: {selected_mortar} {self.get_country(selected_mortar)}")
+            self.screen.line(Fore.WHITE, f"Снаряд: {selected_shell}")
+            self.screen.line(Fore.WHITE, f"Колец: {rings}")
+            self.screen.line(Fore.WHITE, f"Угол возвышения: {elevation} милов")
+            self.screen.line(Fore.WHITE, f"Разница высот: {mortar_alt - target_alt}м")
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
+
+            if distance != distance:  # NaN
+                self.screen.line(Fore.RED, "\nУгол вне таблицы для этого количества колец и разницы высот")
+            else:
+                results, _ = self.perform_calculation(selected_mortar, selected_shell, distance, mortar_alt, target_alt)
+                time_of_flight = next(r['time'] for r in results if r['rings'] == rings)
+                self.screen.line(Fore.GREEN, f"\nДистанция: {round(distance)}м")
+                self.screen.line(Fore.YELLOW, f"Время полета: {round(time_of_flight, 2)} сек")
+
+            self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
+            return self.run_calculation, None
+
+        except Exception as e:
+            self.screen.line(Fore.RED, f"\nОшибка обратного расчета: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
+
+    def reachable_combinations(self, data=None):
+        """Все минометы, снаряды и кольца, достающие до дистанции, по времени полета или разбросу"""
+        try:
+            self.clear_screen()
+            self.print_header("ПОДБОР ПО ДИСТАНЦИИ")
+
+            target_dist = self.get_input("Дистанция до цели (м)", input_type=int, min_val=1, max_val=10000, allow_back=True)
+            if target_dist == 'back':
+                return self.run_calculation, None
+            mortar_alt = self.get_input("Высота миномета (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if mortar_alt == 'back':
+                return self.run_calculation, None
+            target_alt = self.get_input("Высота цели (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if target_alt == 'back':
+                return self.run_calculation, None
+
+            self.print_subheader("Сортировка:")
+            self.screen.line(Fore.WHITE, " 1. По времени полета")
+            self.screen.line(Fore.WHITE, " 2. По разбросу")
+            order = self.get_input("\nВаш выбор", input_type=int, default=1, min_val=1, max_val=2)
+            key = 'time' if order == 1 else 'dispersion'
+
+            ranked = COVERAGE.rank(target_dist, mortar_alt, target_alt, key=key)
+
+            self.clear_screen()
+            self.print_header(f"ДОСТАЮТ ДО {target_dist}м")
+            self.screen.line(Fore.WHITE, f"Разница высот: {mortar_alt - target_alt}м")
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
+
+            if not ranked:
+                self.screen.line(Fore.RED, "\nНи один миномет не достает до этой дистанции")
+            for i, result in enumerate(ranked):
+                self.screen.line(Fore.GREEN, f"\n{i+1:2d}. {result['mortar']} {self.get_country(result['mortar'])} - {result['shell']}, {result['rings']} колец")
+                self.screen.line(Fore.WHITE, f"    Угол: {round(result['elevation'], 1)} милов | "
+                                             f"Время: {round(result['time'], 2)} сек | Разброс: {result['dispersion']}м")
+
+            self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
+            return self.run_calculation, None
+
+        except Exception as e:
+            self.screen.line(Fore.RED, f"\nОшибка подбора: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
+
+    def area_fire(self, data=None):
+        """Огонь по площади: точки веера и огневой список по выстрелам"""
+        try:
+            self.clear_screen()
+            self.print_header("ОГОНЬ ПО ПЛОЩАДИ")
+
+            mortar_keys = list(TABLES.keys())
+            self.print_subheader("Доступные минометы:")
+            for i, x in enumerate(mortar_keys):
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x} {self.get_country(x)}')
+            self.screen.line(Fore.RED, f'\n 0. Назад')
+            mortar_choice = self.get_input("\nВыберите номер миномета", input_type=int, min_val=0, max_val=len(mortar_keys))
+            if mortar_choice == 0:
+                return self.run_calculation, None
+            selected_mortar = mortar_keys[mortar_choice - 1]
+
+            shell_keys = list(TABLES[selected_mortar].keys())
+            self.print_subheader("Доступные снаряды:")
+            for i, x in enumerate(shell_keys):
+                self.screen.line(Fore.WHITE, f'{i+1:2d}. {x}')
+            self.screen.line(Fore.RED, f'\n 0. Назад')
+            shell_choice = self.get_input("\nВыберите номер снаряда", input_type=int, min_val=0, max_val=len(shell_keys))
+            if shell_choice == 0:
+                return self.run_calculation, None
+            selected_shell = shell_keys[shell_choice - 1]
+
+            target_dist = self.get_input("Дистанция до центра цели (м)", input_type=int, min_val=1, max_val=10000, allow_back=True)
+            if target_dist == 'back':
+                return self.run_calculation, None
+            circle = mils_in_circle(selected_mortar)
+            azimuth = self.get_input(f"Азимут на центр цели (тысячные, 0-{circle - 1})", input_type=float, default=0,
+                                     min_val=0, max_val=circle - 1, allow_back=True)
+            if azimuth == 'back':
+                return self.run_calculation, None
+            mortar_alt = self.get_input("Высота миномета (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if mortar_alt == 'back':
+                return self.run_calculation, None
+            target_alt = self.get_input("Высота цели (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+            if target_alt == 'back':
+                return self.run_calculation, None
+
+            self.print_subheader("Тип веера:")
+            self.screen.line(Fore.WHITE, " 1. Линейный")
+            self.screen.line(Fore.WHITE, " 2. Круговой")
+            self.screen.line(Fore.WHITE, " 3. Прямоугольный")
+            sheaf_type = ('linear', 'circular', 'rectangular')[self.get_input("\nВаш выбор", input_type=int, default=1, min_val=1, max_val=3) - 1]
+
+            count = self.get_input("Количество выстрелов (точек)", input_type=int, default=6, min_val=1, max_val=100000, allow_back=True)
+            if count == 'back':
+                return self.run_calculation, None
+            length = self.get_input("Диаметр круга (м)" if sheaf_type == 'circular' else "Длина цели (м)",
+                                    input_type=float, default=100, min_val=0, max_val=5000, allow_back=True)
+            if length == 'back':
+                return self.run_calculation, None
+            width = 0
+            attitude = 0
+            if sheaf_type == 'rectangular':
+                width = self.get_input("Ширина цели (м)", input_type=float, default=50, min_val=0, max_val=5000, allow_back=True)
+                if width == 'back':
+                    return self.run_calculation, None
+            if sheaf_type != 'circular':
+                attitude = self.get_input("Направление длинной оси цели (тысячные)", input_type=float, default=0,
+                                          min_val=0, max_val=circle - 1, allow_back=True)
+                if attitude == 'back':
+                    return self.run_calculation, None
+            guns = self.get_input("Количество орудий", input_type=int, default=1, min_val=1, max_val=100, allow_back=True)
+            if guns == 'back':
+                return self.run_calculation, None
+            # 0 колец - настоящий заряд у части снарядов, поэтому "авто" - пустой ввод
+            available = sorted(TABLES[selected_mortar][selected_shell])
+            while True:
+                rings = self.get_input(f"Кольца ({', '.join(map(str, available))})", input_type=int, default='авто',
+                                       min_val=available[0], max_val=available[-1], allow_back=True)
+                if rings in ('back', 'авто') or rings in available:
+                    break
+                self.screen.line(Fore.RED, f"Для {selected_shell} нет таблицы на {rings} колец")
+            if rings == 'back':
+                return self.run_calculation, None
+            if rings == 'авто':
+                rings = None
+
+            east, north = aim_points(sheaf_type, count, length, width, attitude, circle)
+            rings, dispersion, firing_list = solve_sheaf(selected_mortar, selected_shell, target_dist, azimuth, east, north,
+                                                         mortar_alt, target_alt, rings, guns, circle)
+
+            self.clear_screen()
+            self.print_header("ОГНЕВОЙ СПИСОК")
+            self.screen.line(Fore.WHITE, f"Миномет: {selected_mortar} {self.get_country(selected_mortar)} - {selected_shell}")
+            self.screen.line(Fore.WHITE, f"Центр: {target_dist}м, азимут {azimuth:g} | Разница высот: {mortar_alt - target_alt}м")
+            self.screen.line(Fore.WHITE, f"Колец: {rings} (разброс {dispersion}м) | Выстрелов: {count} | Орудий: {guns}")
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
+            self.screen.line(Fore.CYAN, f"{'№':>5} {'Ор.':>4} {'Залп':>5} {'Дист.':>7} {'Азимут':>7} {'Доворот':>8} {'Угол':>7} {'Время':>6}")
+
+            missed = 0
+            for row in firing_list:
+                if row['elevation'] is None:
+                    missed += 1
+                    self.screen.line(Fore.RED, f"{row['round']:>5} {row['gun']:>4} {row['salvo']:>5} {row['distance']:>7.0f} "
+                                               f"{row['azimuth']:>7.0f} {row['deflection']:>+8.0f}   не достает")
+                else:
+                    self.screen.line(Fore.WHITE, f"{row['round']:>5} {row['gun']:>4} {row['salvo']:>5} {row['distance']:>7.0f} "
+                                                 f"{row['azimuth']:>7.0f} {row['deflection']:>+8.0f} {row['elevation']:>7.0f} {row['time']:>6.1f}")
+            if missed:
+                self.screen.line(Fore.RED, f"\n{missed} выстр. вне дальности {rings} колец")
+
+            self.screen.prompt(Fore.CYAN, "\nНажмите Enter для возврата...")
+            return self.run_calculation, None
+
+        except Exception as e:
+            self.screen.line(Fore.RED, f"\nОшибка расчета веера: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
 
     def run_calculation(self, preset_data=None):
-        """Основная функция расчета"""
+        """Основная функция расчета, возвращает следующий шаг или None для выхода"""
         try:
             if not preset_data:
                 self.clear_screen()
                 
                 # Главный заголовок
-                print(Fore.MAGENTA + "=" * 60)
-                print(Fore.CYAN + "          КАЛЬКУЛЯТОР МИНОМЕТА v4.0")
-                print(Fore.YELLOW + "        Артиллерийский помощник ArmaReforger")
-                print(Fore.MAGENTA + "=" * 60)
+                self.screen.line(Fore.MAGENTA, "=" * 60)
+                self.screen.line(Fore.CYAN, "          КАЛЬКУЛЯТОР МИНОМЕТА v4.0")
+                self.screen.line(Fore.YELLOW, "        Артиллерийский помощник ArmaReforger")
+                self.screen.line(Fore.MAGENTA, "=" * 60)
                 
-                print(Fore.CYAN + "\nВыберите действие:")
-                print(Fore.WHITE + " 1. Новый расчет")
-                print(Fore.WHITE + " 2. История расчетов")
-                print(Fore.WHITE + " 3. Справка")
-                print(Fore.RED + " 0. Выход")
+                self.screen.line(Fore.CYAN, "\nВыберите действие:")
+                self.screen.line(Fore.WHITE, " 1. Новый расчет")
+                self.screen.line(Fore.WHITE, " 2. История расчетов")
+                self.screen.line(Fore.WHITE, " 3. Справка")
+                self.screen.line(Fore.WHITE, " 4. Обратный расчет (угол -> дистанция)")
+                self.screen.line(Fore.WHITE, " 5. Подбор миномета и снаряда по дистанции")
+                self.screen.line(Fore.WHITE, " 6. Статистика кэша решений")
+                self.screen.line(Fore.WHITE, " 7. Огонь по площади (веер)")
+                self.screen.line(Fore.RED, " 0. Выход")
                 
-                action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=3)
+                action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=7)
                 
                 if action == 0:
-                    return False
+                    return None
                 elif action == 2:
                     history_item = self.show_history()
-                    if history_item:
-                        return self.run_calculation(history_item)
-                    else:
-                        return True
+                    return self.run_calculation, history_item
                 elif action == 3:
                     self.show_help()
-                    return True
+                    return self.run_calculation, None
+                elif action == 4:
+                    return self.inverse_calculation, None
+                elif action == 5:
+                    return self.reachable_combinations, None
+                elif action == 6:
+                    self.show_cache_stats()
+                    return self.run_calculation, None
+                elif action == 7:
+                    return self.area_fire, None
                 
                 # Ввод названия цели
                 self.clear_screen()
@@ -446,53 +971,51 @@ class MortarCalculator:
                 
                 target_name = self.get_target_name()
                 if target_name == 'back':
-                    return self.run_calculation()
+                    return self.run_calculation, None
                 
                 # Ввод азимута
                 azimuth = self.get_azimuth_input()
                 if azimuth == 'back':
-                    return self.run_calculation()
+                    return self.run_calculation, None
                 
                 # Выбор миномета
-                mortar_keys = list(mortars.keys())
+                mortar_keys = list(TABLES.keys())
                 self.print_subheader("Доступные минометы:")
                 
                 for i, x in enumerate(mortar_keys):
                     country = self.get_country(x)
-                    print(Fore.WHITE + f'{i+1:2d}. {x} {country}')
+                    self.screen.line(Fore.WHITE, f'{i+1:2d}. {x} {country}')
                 
-                print(Fore.RED + f'\n 0. Назад')
+                self.screen.line(Fore.RED, f'\n 0. Назад')
                 
                 mortar_choice = self.get_input("\nВыберите номер миномета", input_type=int, min_val=0, max_val=len(mortar_keys))
                 
                 if mortar_choice == 0:
-                    return self.run_calculation()  # Возвращаемся в главное меню
+                    return self.run_calculation, None  # Возвращаемся в главное меню
                 
                 mortar_choice -= 1
                 selected_mortar = mortar_keys[mortar_choice]
-                mortar_data = mortars[selected_mortar]
                 country = self.get_country(selected_mortar)
                 
                 self.clear_screen()
                 self.print_header(f"ВЫБРАН: {selected_mortar} {country}")
 
                 # Выбор снаряда
-                shell_keys = list(mortar_data.keys())
+                shell_keys = list(TABLES[selected_mortar].keys())
                 self.print_subheader("Доступные снаряды:")
                 
                 for i, x in enumerate(shell_keys):
-                    print(Fore.WHITE + f'{i+1:2d}. {x}')
+                    self.screen.line(Fore.WHITE, f'{i+1:2d}. {x}')
                 
-                print(Fore.RED + f'\n 0. Назад')
+                self.screen.line(Fore.RED, f'\n 0. Назад')
                 
                 shell_choice = self.get_input("\nВыберите номер снаряда", input_type=int, min_val=0, max_val=len(shell_keys))
                 
                 if shell_choice == 0:
-                    return self.run_calculation()  # Возвращаемся к выбору миномета
+                    return self.run_calculation, None  # Возвращаемся в главное меню
                 
                 shell_choice -= 1
                 selected_shell = shell_keys[shell_choice]
-                shell_data = mortar_data[selected_shell]
                 
                 self.clear_screen()
                 self.print_header(f"{selected_mortar} {country} - {selected_shell}")
@@ -500,33 +1023,58 @@ class MortarCalculator:
                 # Ввод параметров стрельбы
                 self.print_subheader("Основные параметры стрельбы")
                 
-                target_dist = self.get_input("Дистанция до цели (м)", input_type=int, min_val=0, max_val=10000, allow_back=True)
-                if target_dist == 'back':
-                    return self.run_calculation()  # Возвращаемся к выбору снаряда
+                self.screen.line(Fore.WHITE, " 1. Ввести дистанцию")
+                self.screen.line(Fore.WHITE, " 2. Ввести координаты миномета и цели")
+                input_mode = self.get_input("\nСпособ ввода цели", input_type=int, default=1, min_val=1, max_val=2)
+
+                map_mortar_alt = map_target_alt = positions = None
+                if input_mode == 2:
+                    coordinates = self.get_coordinates_input(selected_mortar)
+                    if coordinates == 'back':
+                        return self.run_calculation, None
+                    target_dist, target_azimuth, map_mortar_alt, map_target_alt, positions = coordinates
+                    # Азимут по карте в тысячных миномета, поправка - рядом
+                    circle = mils_in_circle(selected_mortar)
+                    bearing = format_azimuth(target_azimuth, circle)
+                    azimuth = bearing if azimuth == "0" else f"{bearing} (поправка {azimuth})"
+                    self.screen.line(Fore.GREEN, f"Дистанция: {target_dist}м | Азимут: {bearing} (из {circle})")
+                    if self.heightmap is not None:
+                        if map_mortar_alt is None or map_target_alt is None:
+                            self.screen.line(Fore.YELLOW, "Позиция вне карты высот - введите высоты вручную")
+                        else:
+                            self.screen.line(Fore.GREEN, f"Высоты по карте: миномет {map_mortar_alt:.1f}м, цель {map_target_alt:.1f}м")
+                else:
+                    target_dist = self.get_input("Дистанция до цели (м)", input_type=int, min_val=0, max_val=10000, allow_back=True)
+                    if target_dist == 'back':
+                        return self.run_calculation, None  # Возвращаемся в главное меню
                 
-                mortar_alt = self.get_input("Высота миномета (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+                # Высоты с карты подставляются по умолчанию - Enter принимает их
+                mortar_alt = self.get_input("Высота миномета (м)", input_type=int,
+                                            default=round(map_mortar_alt) if map_mortar_alt is not None else 0,
+                                            min_val=-1000, max_val=10000, allow_back=True)
                 if mortar_alt == 'back':
-                    return self.run_calculation()
+                    return self.run_calculation, None
                 
-                target_alt = self.get_input("Высота цели (м)", input_type=int, default=0, min_val=-1000, max_val=10000, allow_back=True)
+                target_alt = self.get_input("Высота цели (м)", input_type=int,
+                                            default=round(map_target_alt) if map_target_alt is not None else 0,
+                                            min_val=-1000, max_val=10000, allow_back=True)
                 if target_alt == 'back':
-                    return self.run_calculation()
+                    return self.run_calculation, None
                 
             else:
                 # Используем preset данные
                 target_name = preset_data.get('target_name', 'Без названия')
                 selected_mortar = preset_data['mortar']
                 selected_shell = preset_data['shell']
-                mortar_data = mortars[selected_mortar]
-                shell_data = mortar_data[selected_shell]
                 country = self.get_country(selected_mortar)
                 target_dist = preset_data['distance']
                 mortar_alt = preset_data['mortar_alt']
                 target_alt = preset_data['target_alt']
                 azimuth = preset_data.get('azimuth', '0')
+                positions = None
             
-            # Выполняем расчет
-            results, errors = self.perform_calculation(mortar_data, shell_data, target_dist, mortar_alt, target_alt)
+            # Выполняем расчет сразу для всех снарядов миномета, чтобы смена снаряда не требовала пересчета
+            results, errors = self.shell_solution(selected_mortar, selected_shell, target_dist, mortar_alt, target_alt)
             
             # Сохраняем текущие параметры для возможной смены снаряда
             self.current_params = {
@@ -536,46 +1084,49 @@ class MortarCalculator:
                 'distance': target_dist,
                 'mortar_alt': mortar_alt,
                 'target_alt': target_alt,
-                'azimuth': azimuth
+                'azimuth': azimuth,
+                'positions': positions
             }
             
             # Показываем результаты
             self.clear_screen()
             self.print_header("РЕЗУЛЬТАТЫ РАСЧЕТА")
             
-            print(Fore.WHITE + f"Цель: {target_name}")
-            print(Fore.WHITE + f"Миномет: {selected_mortar} {country}")
-            print(Fore.WHITE + f"Снаряд: {selected_shell}")
-            print(Fore.WHITE + f"Дистанция: {target_dist}м")
-            print(Fore.WHITE + f"Высота миномета: {mortar_alt}м")
-            print(Fore.WHITE + f"Высота цели: {target_alt}м")
-            print(Fore.WHITE + f"Разница высот: {mortar_alt - target_alt}м")
+            self.screen.line(Fore.WHITE, f"Цель: {target_name}")
+            self.screen.line(Fore.WHITE, f"Миномет: {selected_mortar} {country}")
+            self.screen.line(Fore.WHITE, f"Снаряд: {selected_shell}")
+            self.screen.line(Fore.WHITE, f"Дистанция: {target_dist}м")
+            self.screen.line(Fore.WHITE, f"Высота миномета: {mortar_alt}м")
+            self.screen.line(Fore.WHITE, f"Высота цели: {target_alt}м")
+            self.screen.line(Fore.WHITE, f"Разница высот: {mortar_alt - target_alt}м")
             
             if azimuth != "0":
-                print(Fore.WHITE + f"Азимут: {azimuth}")
+                self.screen.line(Fore.WHITE, f"Азимут: {azimuth}")
             
-            print(Fore.YELLOW + "\n" + "=" * 60)
+            self.screen.line(Fore.YELLOW, "\n" + "=" * 60)
             
             # Показываем ошибки если есть
             if errors:
-                print(Fore.RED + "\nПроблемы с расчетом:")
+                self.screen.line(Fore.RED, "\nПроблемы с расчетом:")
                 for error in errors:
-                    print(Fore.RED + f"   {error}")
-                print()
+                    self.screen.line(Fore.RED, f"   {error}")
+                self.screen.line()
             
             if not results:
-                print(Fore.RED + "Не удалось рассчитать ни одного варианта")
-                print(Fore.YELLOW + "Попробуйте другую дистанцию или снаряд")
+                self.screen.line(Fore.RED, "Не удалось рассчитать ни одного варианта")
+                self.screen.line(Fore.YELLOW, "Попробуйте другую дистанцию или снаряд")
             else:
                 # Сортируем результаты по количеству колец
                 results.sort(key=lambda x: x['rings'])
                 
                 for result in results:
-                    print(Fore.GREEN + f"\nКолец: {result['rings']}")
-                    print(Fore.WHITE + f"   Разброс: {result['dispersion']}м")
-                    print(Fore.CYAN + f"   Угол возвышения: {round(result['elevation'])} милов")
-                    print(Fore.YELLOW + f"   Время полета: {round(result['time'], 2)} сек")
-                    print(Fore.MAGENTA + f"   Поправка высоты: {round(result['altitude_comp'], 1)} милов")
+                    self.screen.line(Fore.GREEN, f"\nКолец: {result['rings']}")
+                    self.screen.line(Fore.WHITE, f"   Разброс: {result['dispersion']}м")
+                    self.screen.line(Fore.CYAN, f"   Угол возвышения: {round(result['elevation'])} милов")
+                    self.screen.line(Fore.YELLOW, f"   Время полета: {round(result['time'], 2)} сек")
+                    self.screen.line(Fore.MAGENTA, f"   Поправка высоты: {round(result['altitude_comp'], 1)} милов")
+
+                self.print_clearance(self.current_params, results)
             
             # Сохраняем в историю
             calculation_data = {
@@ -590,40 +1141,62 @@ class MortarCalculator:
             }
             self.save_to_history(calculation_data)
             
-            print(Fore.GREEN + "\n" + "=" * 60)
-            print(Fore.CYAN + "Выберите действие:")
-            print(Fore.WHITE + " 1. Сменить снаряд (те же координаты)")
-            print(Fore.WHITE + " 2. Новый расчет")
-            print(Fore.RED + " 0. Выход")
+            self.screen.line(Fore.GREEN, "\n" + "=" * 60)
+            self.screen.line(Fore.CYAN, "Выберите действие:")
+            self.screen.line(Fore.WHITE, " 1. Сменить снаряд (те же координаты)")
+            self.screen.line(Fore.WHITE, " 2. Новый расчет")
+            self.screen.line(Fore.WHITE, " 3. Сравнить все снаряды")
+            self.screen.line(Fore.WHITE, " 4. Вероятность попадания и выбор колец")
+            self.screen.line(Fore.RED, " 0. Выход")
             
-            next_action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=2)
+            next_action = self.get_input("\nВаш выбор", input_type=int, min_val=0, max_val=4)
             
             if next_action == 0:
-                return False
+                return None
             elif next_action == 1:
                 # Быстрая смена снаряда
-                if self.change_shell(self.current_params):
-                    return True
-                else:
-                    return False
+                return self.change_shell, self.current_params
+            elif next_action == 3:
+                return self.compare_shells, self.current_params
+            elif next_action == 4:
+                return self.hit_probability, self.current_params
             else:
-                return True
+                return self.run_calculation, None
                 
         except Exception as e:
-            print(Fore.RED + f"\nОшибка: {str(e)}")
-            input(Fore.YELLOW + "Нажмите Enter для продолжения...")
-            return True
+            self.screen.line(Fore.RED, f"\nОшибка: {str(e)}")
+            self.screen.prompt(Fore.YELLOW, "Нажмите Enter для продолжения...")
+            return self.run_calculation, None
 
     def main(self):
-        """Главная функция программы"""
-        while True:
-            try:
-                if not self.run_calculation():
-                    print(Fore.YELLOW + "\nДо свидания! Удачной стрельбы!")
+        """Главная функция программы.
+
+        Экраны не вызывают друг друга, а возвращают следующий шаг
+        (метод и его аргумент), поэтому глубина стека не растет.
+        """
+        state = (self.run_calculation, None)
+        try:
+            while True:
+                try:
+                    step, data = state
+                    state = step(data)
+                    if state is None:
+                        self.screen.line(Fore.YELLOW, "\nДо свидания! Удачной стрельбы!")
+                        break
+                except KeyboardInterrupt:
+                    self.screen.line(Fore.YELLOW, "\n\nПрограмма завершена пользователем")
                     break
-            except KeyboardInterrupt:
-                print(Fore.YELLOW + "\n\nПрограмма завершена пользователем")
-                break
+        finally:
+            # История дописывается в фоне - дожидаемся записи на диск при любом выходе
+            self.screen.flush()
+            try:
+                self.store.close()
+            except Exception as e:
+                print(f"Ошибка сохранения истории: {e}")
+            if self.dense is not None:
+                self.dense.close()
+            if self.heightmap is not None:
+                self.heightmap.close()
 
 if __name__ == "__main__":
     # Проверяем зависимости
@@ -633,6 +1206,26 @@ if __name__ == "__main__":
         print("Установите colorama: pip install colorama")
         exit()
     
+    parser = argparse.ArgumentParser(description="Калькулятор миномета для Arma: Reforger")
+    parser.add_argument('--history-backend', choices=['jsonl', 'sqlite'], default='jsonl',
+                        help="Хранилище истории: журнал JSONL или база SQLite с поиском")
+    parser.add_argument('--page-size', type=int, default=HISTORY_PAGE_SIZE,
+                        help="Количество расчетов на странице истории")
+    parser.add_argument('--no-color', action='store_true',
+                        help="Вывод без цвета (быстрее на медленных консолях и по SSH)")
+    parser.add_argument('--dense-cache', action='store_true',
+                        help="Использовать кэш плотных таблиц с шагом 1 м (mortar_tables.cache)")
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        help="Количество решений в LRU кэше (0 - без кэша)")
+    parser.add_argument('--heightmap', metavar='PATH',
+                        help="Карта высот (.npy или сырой 16-битный растр, параметры в PATH.json)")
+    args = parser.parse_args()
+    
     # Запускаем программу
-    calculator = MortarCalculator()
+    calculator = MortarCalculator(history_backend=args.history_backend,
+                                  history_page_size=max(1, args.page_size),
+                                  color=not args.no_color,
+                                  dense_cache=args.dense_cache,
+                                  cache_size=args.cache_size,
+                                  heightmap=args.heightmap)
     calculator.main()
@@ -0,0 +1,194 @@
+"""Скомпилированные баллистические таблицы.
+
+Вложенный словарь mortars из database.py один раз при запуске превращается
+в неизменяемые объекты RingTable (по одному на миномет/снаряд/кольца)
+с заранее отсортированными колонками в компактном хранилище array.
+"""
+from array import array
+import bisect
+
+from database import mortars
+
+
+def interpolate(low_dist, high_dist, target_dist, low_value, high_value):
+    """Линейная интерполяция значений"""
+    if low_dist == high_dist:
+        return low_value
+    ratio = (target_dist - low_dist) / (high_dist - low_dist)
+    return low_value + (high_value - low_value) * ratio
+
+
+class RingTable:
+    """Таблица стрельбы для одного количества колец"""
+
+    __slots__ = ('rings', 'dispersion', 'dists', 'mils', 'times', 'mils_per_100m')
+
+    def __init__(self, rings, ring_data):
+        rows = ring_data['Dists']
+        sorted_dists = sorted(rows)
+        set_field = super().__setattr__
+        set_field('rings', rings)
+        set_field('dispersion', ring_data['Dispersion'])
+        set_field('dists', array('l', sorted_dists))
+        set_field('mils', array('d', (rows[d][0] for d in sorted_dists)))
+        set_field('times', array('d', (rows[d][1] for d in sorted_dists)))
+        set_field('mils_per_100m', array('d', (rows[d][2] for d in sorted_dists)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Баллистическая таблица доступна только для чтения")
+
+    def __repr__(self):
+        return f"RingTable(rings={self.rings}, {self.min_dist}-{self.max_dist}м)"
+
+    @property
+    def min_dist(self):
+        return self.dists[0]
+
+    @property
+    def max_dist(self):
+        return self.dists[-1]
+
+    def find_closest(self, target_dist):
+        """Находит индексы ближайших строк для интерполяции"""
+        dists = self.dists
+        if not dists:
+            return None, None, "Нет данных для расчета"
+
+        # Проверяем границы диапазона
+        if target_dist < dists[0]:
+            min_dist = dists[0]
+            return None, None, f"Слишком малая дистанция. Минимальная: {min_dist}м (не хватает {min_dist - target_dist}м)"
+
+        if target_dist > dists[-1]:
+            max_dist = dists[-1]
+            return None, None, f"Слишком большая дистанция. Максимальная: {max_dist}м (превышение на {target_dist - max_dist}м)"
+
+        index = bisect.bisect_left(dists, target_dist)
+
+        if index == 0:
+            return 0, 0, None
+
+        return index - 1, index, None
+
+    def solve(self, low, high, target_dist, altitude_difference):
+        """Считает угол, время полета и поправку высоты между строками low и high"""
+        low_dist = self.dists[low]
+        high_dist = self.dists[high]
+
+        mils = interpolate(low_dist, high_dist, target_dist, self.mils[low], self.mils[high])
+        time = interpolate(low_dist, high_dist, target_dist, self.times[low], self.times[high])
+        mils_per_100m = interpolate(low_dist, high_dist, target_dist,
+                                    self.mils_per_100m[low], self.mils_per_100m[high])
+
+        # Поправка на высоту
+        altitude_compensation = altitude_difference * (mils_per_100m / 100)
+
+        return {
+            'rings': self.rings,
+            'elevation': mils + altitude_compensation,
+            'time': time,
+            'dispersion': self.dispersion,
+            'altitude_comp': altitude_compensation
+        }
+
+
+def compile_tables(source):
+    """Компилирует словарь в формате database.mortars в таблицы RingTable"""
+    return {
+        mortar_name: {
+            shell_name: {
+                ring_amount: RingTable(ring_amount, ring_data)
+                for ring_amount, ring_data in shell_data.items()
+            }
+            for shell_name, shell_data in mortar_data.items()
+        }
+        for mortar_name, mortar_data in source.items()
+    }
+
+
+def solve(shell_tables, target_dist, mortar_alt, target_alt):
+    """Выполняет расчет по всем кольцам снаряда и возвращает результаты и ошибки"""
+    results = []
+    errors = []
+    altitude_difference = mortar_alt - target_alt
+
+    # COVERAGE здесь не нужен: кольцо вне дальности отсекается двумя сравнениями
+    # в find_closest, а его ошибка все равно выводится пользователю
+    for table in shell_tables.values():
+        low, high, error_msg = table.find_closest(target_dist)
+
+        if error_msg:
+            errors.append(f"{table.rings} колец: {error_msg}")
+            continue
+
+        results.append(table.solve(low, high, target_dist, altitude_difference))
+
+    return results, errors
+
+
+class CoverageIndex:
+    """Интервальный индекс дальностей всех колец базы.
+
+    Границы всех диапазонов [min_dist, max_dist] сортируются, и для каждой
+    границы и каждого промежутка между соседними границами заранее
+    запоминается список колец, которые его покрывают. Запрос "кто достает
+    до X м" - это один двоичный поиск по границам.
+
+    Индекс нужен там, где перебираются кольца всех минометов и снарядов
+    (rank). В расчете одного снаряда (solve) он медленнее прямого перебора:
+    около 8.9 против 7.6 мкс на задачу, т.к. для недостающих колец все
+    равно нужен текст ошибки.
+    """
+
+    def __init__(self, tables):
+        entries = [
+            (mortar, shell, table)
+            for mortar, shells in tables.items()
+            for shell, shell_tables in shells.items()
+            for table in shell_tables.values()
+            if table.dists
+        ]
+        self.bounds = sorted({table.min_dist for _, _, table in entries} |
+                             {table.max_dist for _, _, table in entries})
+
+        # at_bound[i] покрывают точку bounds[i], between[i] - промежуток (bounds[i], bounds[i + 1])
+        self.at_bound = tuple(
+            tuple(entry for entry in entries if entry[2].min_dist <= bound <= entry[2].max_dist)
+            for bound in self.bounds
+        )
+        self.between = tuple(
+            tuple(entry for entry in entries if entry[2].min_dist <= low and high <= entry[2].max_dist)
+            for low, high in zip(self.bounds, self.bounds[1:])
+        )
+
+    def reachable(self, target_dist, mortar=None, shell=None):
+        """Возвращает (миномет, снаряд, RingTable) для всех колец, достающих до дистанции"""
+        index = bisect.bisect_left(self.bounds, target_dist)
+        if index < len(self.bounds) and self.bounds[index] == target_dist:
+            entries = self.at_bound[index]
+        elif 0 < index < len(self.bounds):
+            entries = self.between[index - 1]
+        else:
+            entries = ()
+
+        return [
+            entry for entry in entries
+            if (mortar is None or entry[0] == mortar) and (shell is None or entry[1] == shell)
+        ]
+
+    def rank(self, target_dist, mortar_alt=0, target_alt=0, key='time', mortar=None):
+        """Решения для всех достающих колец, отсортированные по времени полета или разбросу"""
+        altitude_difference = mortar_alt - target_alt
+        results = []
+        for mortar_name, shell_name, table in self.reachable(target_dist, mortar):
+            low, high, _ = table.find_closest(target_dist)
+            result = table.solve(low, high, target_dist, altitude_difference)
+            results.append({'mortar': mortar_name, 'shell': shell_name, **result})
+
+        results.sort(key=lambda x: (x[key], x['dispersion'] if key == 'time' else x['time']))
+        return results
+
+
+# Таблицы и индекс дальностей строятся один раз при импорте модуля
+TABLES = compile_tables(mortars)
+COVERAGE = CoverageIndex(TABLES)
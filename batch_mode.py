@@ -0,0 +1,270 @@
+"""Пакетный режим без интерфейса.
+
+Читает задачи (миномет, снаряд, дистанция, высоты, азимут, название цели)
+из CSV или JSONL - из файла или stdin - и построчно выводит решения по
+каждому кольцу в stdout. Задачи читаются порциями по CHUNK, поэтому
+память не растет с размером входа.
+
+Вместо дистанции можно указать координаты миномета и цели (mortar_pos,
+target_pos - сетка или метры, см. map_grid): дистанция и азимут тогда
+считаются по ним, векторно для всей порции.
+
+С картой высот (--heightmap) по координатам определяются и незаполненные
+высоты; задача с позицией вне карты считается ошибочной.
+
+Пример:
+    python batch_mode.py missions.csv > solutions.jsonl
+    cat missions.jsonl | python batch_mode.py --output csv
+"""
+import argparse
+import csv
+import itertools
+import json
+import math
+import sys
+
+import numpy as np
+
+from ballistics import TABLES, solve
+from heightmap import Heightmap
+from map_grid import format_azimuth, mils_in_circle, parse_position, range_azimuth
+
+# Задач, которые разбираются и пересчитываются по координатам за один проход
+CHUNK = 1024
+
+OUTPUT_FIELDS = ('name', 'mortar', 'shell', 'distance', 'mortar_alt', 'target_alt', 'azimuth',
+                 'rings', 'elevation', 'time', 'dispersion', 'altitude_comp')
+
+
+def detect_format(stream):
+    """Определяет формат входа по первому непустому символу"""
+    head = stream.buffer.peek(64) if hasattr(stream, 'buffer') else b''
+    return 'jsonl' if head.lstrip()[:1] == b'{' else 'csv'
+
+
+def read_missions(stream, input_format):
+    """Потоково перебирает задачи из CSV или JSONL"""
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {'_error': "Некорректная строка JSON"}
+            continue
+        yield row if isinstance(row, dict) else {'_error': "Строка JSON должна быть объектом"}
+
+
+def to_number(value):
+    """Преобразует значение из CSV/JSON в int, а если не получается - в конечный float"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Ожидается число, а не {value!r}")
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, float):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"Некорректное число: {value!r}") from None
+    # float('nan') и float('inf') проходят преобразование, но решения для них бессмысленны
+    if not math.isfinite(value):
+        raise ValueError(f"Некорректное число: {value!r}")
+    return value
+
+
+def text_field(row, field):
+    """Строковое поле задачи без пробелов по краям ('' - не указано)"""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"Поле {field} должно быть строкой, а не {value!r}")
+    return value.strip()
+
+
+def read_fields(row):
+    """Проверяет поля задачи и разбирает координаты.
+
+    Возвращает задачу (дистанция и высоты еще не приведены к числам) и
+    позиции (восток и север миномета, восток и север цели) или None, если
+    координаты не указаны.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Задача должна быть JSON объектом")
+    if '_error' in row:
+        raise ValueError(row['_error'])
+
+    mortar = text_field(row, 'mortar')
+    shell = text_field(row, 'shell')
+    if mortar not in TABLES:
+        raise ValueError(f"Неизвестный миномет: {mortar!r}")
+    if shell not in TABLES[mortar]:
+        raise ValueError(f"Неизвестный снаряд для {mortar}: {shell!r}")
+
+    azimuth = row.get('azimuth') or '0'
+    if isinstance(azimuth, bool) or not isinstance(azimuth, (str, int, float)):
+        raise ValueError(f"Поле azimuth должно быть строкой или числом, а не {azimuth!r}")
+    mission = {
+        'name': text_field(row, 'name'),
+        'mortar': mortar,
+        'shell': shell,
+        'distance': row.get('distance'),
+        'mortar_alt': row.get('mortar_alt'),
+        'target_alt': row.get('target_alt'),
+        'azimuth': str(azimuth),
+    }
+    mortar_pos = text_field(row, 'mortar_pos')
+    target_pos = text_field(row, 'target_pos')
+    if mortar_pos and target_pos:
+        return mission, parse_position(mortar_pos) + parse_position(target_pos)
+    if mission['distance'] in (None, ''):
+        raise ValueError("Не указана дистанция или координаты mortar_pos и target_pos")
+    return mission, None
+
+
+def finish_mission(mission, geometry=None, heightmap=None):
+    """Дополняет задачу дистанцией, азимутом и высотами по координатам и приводит числа.
+
+    geometry - (дистанция, азимут, тысячных в круге, высота миномета,
+    высота цели по карте) для задачи с координатами.
+    """
+    distance, mortar_alt, target_alt = mission['distance'], mission['mortar_alt'], mission['target_alt']
+    azimuth = mission['azimuth']
+    if geometry is not None:
+        dist, bearing, circle, map_mortar_alt, map_target_alt = geometry
+        if heightmap is not None:
+            # Пустые высоты берутся с карты
+            if mortar_alt in (None, ''):
+                mortar_alt = None if math.isnan(map_mortar_alt) else map_mortar_alt
+            if target_alt in (None, ''):
+                target_alt = None if math.isnan(map_target_alt) else map_target_alt
+            if mortar_alt is None or target_alt is None:
+                raise ValueError("позиция вне карты высот")
+        if distance in (None, ''):
+            distance = round(dist)
+            azimuth = format_azimuth(bearing, circle)
+
+    return {
+        **mission,
+        'distance': to_number(distance),
+        'mortar_alt': to_number(mortar_alt or 0),
+        'target_alt': to_number(target_alt or 0),
+        'azimuth': azimuth,
+    }
+
+
+def parse_missions(rows, heightmap=None):
+    """Приводит список строк задач к параметрам расчета.
+
+    Дистанции и азимуты по координатам (и высоты с карты) считаются одним
+    векторным проходом на весь список. Возвращает пары (задача, None) или
+    (None, ошибка) в порядке строк - ошибка одной строки не мешает остальным.
+    """
+    parsed = []
+    for row in rows:
+        try:
+            parsed.append((*read_fields(row), None))
+        except (KeyError, TypeError, ValueError) as e:
+            parsed.append((None, None, e))
+
+    located = [i for i, (_, positions, _) in enumerate(parsed) if positions is not None]
+    geometry = {}
+    if located:
+        mortar_east, mortar_north, target_east, target_north = np.array(
+            [parsed[i][1] for i in located], dtype=np.float64).T
+        circles = np.array([mils_in_circle(parsed[i][0]['mortar']) for i in located])
+        dists, bearings = range_azimuth(mortar_east, mortar_north, target_east, target_north, circles)
+        if heightmap is not None:
+            mortar_alts = heightmap.altitude(mortar_east, mortar_north)
+            target_alts = heightmap.altitude(target_east, target_north)
+        else:
+            mortar_alts = target_alts = np.full(len(located), np.nan)
+        for i, values in zip(located, zip(dists.tolist(), bearings.tolist(), circles.tolist(),
+                                          mortar_alts.tolist(), target_alts.tolist())):
+            geometry[i] = values
+
+    missions = []
+    for i, (mission, _, error) in enumerate(parsed):
+        if error is None:
+            try:
+                missions.append((finish_mission(mission, geometry.get(i), heightmap), None))
+                continue
+            except (KeyError, TypeError, ValueError) as e:
+                error = e
+        missions.append((None, error))
+    return missions
+
+
+def parse_mission(row, heightmap=None):
+    """Приводит строку задачи к параметрам расчета"""
+    mission, error = parse_missions([row], heightmap)[0]
+    if error is not None:
+        raise error
+    return mission
+
+
+def solve_mission(mission):
+    """Решает задачу и возвращает записи по кольцам и ошибки колец"""
+    results, errors = solve(TABLES[mission['mortar']][mission['shell']],
+                            mission['distance'], mission['mortar_alt'], mission['target_alt'])
+    records = [{**mission, **result} for result in sorted(results, key=lambda x: x['rings'])]
+    return records, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный расчет задач без интерфейса")
+    parser.add_argument('input', nargs='?', help="Файл с задачами (по умолчанию stdin)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'],
+                        help="Формат входа (по умолчанию определяется автоматически)")
+    parser.add_argument('--output', choices=['jsonl', 'csv'], default='jsonl', help="Формат вывода")
+    parser.add_argument('--heightmap', metavar='PATH',
+                        help="Карта высот для задач с координатами (.npy или сырой 16-битный растр)")
+    args = parser.parse_args(argv)
+    heightmap = Heightmap.open(args.heightmap) if args.heightmap else None
+
+    if args.output == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=OUTPUT_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    failed = 0
+    stream = open(args.input, 'r', encoding='utf-8', newline='') if args.input else sys.stdin
+    try:
+        input_format = args.input_format or detect_format(stream)
+        rows = read_missions(stream, input_format)
+        number = 0
+        # Порциями: координаты считаются векторно, а память не растет с размером входа
+        for chunk in iter(lambda: list(itertools.islice(rows, CHUNK)), []):
+            for mission, error in parse_missions(chunk, heightmap):
+                number += 1
+                if error is not None:
+                    failed += 1
+                    sys.stderr.write(f"Задача {number}: {error}\n")
+                    continue
+
+                records, errors = solve_mission(mission)
+                for error in errors:
+                    sys.stderr.write(f"Задача {number} ({mission['name']}): {error}\n")
+                for record in records:
+                    write(record)
+    finally:
+        if args.input:
+            stream.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Векторизованный расчет сразу для многих целей.
+
+Для выбранного миномета и снаряда решает массив дистанций и высот по всем
+кольцам: searchsorted вместо bisect и векторная линейная интерполяция по
+колонкам RingTable. Результаты совпадают со скалярным ballistics.solve.
+"""
+import numpy as np
+
+from ballistics import TABLES
+
+
+def table_columns(table):
+    """Возвращает колонки RingTable как массивы NumPy без копирования"""
+    return tuple(
+        np.frombuffer(column, dtype=np.dtype(column.typecode))
+        for column in (table.dists, table.mils, table.times, table.mils_per_100m)
+    )
+
+
+def interpolate_columns(dists, target_dists, *columns):
+    """Векторная интерполяция колонок таблицы по массиву дистанций.
+
+    Возвращает маску попадания в диапазон и интерполированные колонки
+    (вне диапазона - NaN). Для каждого элемента повторяет ballistics.interpolate.
+    """
+    in_range = (target_dists >= dists[0]) & (target_dists <= dists[-1])
+    index = np.searchsorted(dists, target_dists, side='left')
+    high = np.clip(index, 0, len(dists) - 1)
+    low = np.where(index == 0, 0, high - 1)
+
+    low_dist = dists[low].astype(np.float64)
+    high_dist = dists[high].astype(np.float64)
+    same = low_dist == high_dist
+    span = np.where(same, 1.0, high_dist - low_dist)
+    ratio = (target_dists - low_dist) / span
+
+    values = []
+    for column in columns:
+        low_value = column[low]
+        value = np.where(same, low_value, low_value + (column[high] - low_value) * ratio)
+        values.append(np.where(in_range, value, np.nan))
+    return (in_range, *values)
+
+
+def solve_batch(mortar, shell, target_dists, mortar_alts=0, target_alts=0):
+    """Решает массив целей по всем кольцам снаряда.
+
+    Дистанции и высоты приводятся к общей форме (N,). Возвращает словарь
+    с массивами rings и dispersion формы (R,) и elevation, time,
+    altitude_comp, in_range формы (R, N), где R - количество колец.
+    """
+    shell_tables = TABLES[mortar][shell]
+    target_dists, mortar_alts, target_alts = np.broadcast_arrays(
+        np.asarray(target_dists, dtype=np.float64),
+        np.asarray(mortar_alts, dtype=np.float64),
+        np.asarray(target_alts, dtype=np.float64),
+    )
+    target_dists = target_dists.ravel()
+    altitude_difference = (mortar_alts - target_alts).ravel()
+
+    shape = (len(shell_tables), target_dists.size)
+    elevation = np.empty(shape)
+    time = np.empty(shape)
+    altitude_comp = np.empty(shape)
+    in_range = np.empty(shape, dtype=bool)
+
+    for i, table in enumerate(shell_tables.values()):
+        dists, mils, times, mils_per_100m = table_columns(table)
+        mask, ring_mils, ring_time, ring_mils_per_100m = interpolate_columns(
+            dists, target_dists, mils, times, mils_per_100m)
+
+        # Поправка на высоту
+        compensation = altitude_difference * (ring_mils_per_100m / 100)
+
+        elevation[i] = ring_mils + compensation
+        time[i] = ring_time
+        altitude_comp[i] = compensation
+        in_range[i] = mask
+
+    return {
+        'rings': np.array([table.rings for table in shell_tables.values()]),
+        'dispersion': np.array([table.dispersion for table in shell_tables.values()]),
+        'elevation': elevation,
+        'time': time,
+        'altitude_comp': altitude_comp,
+        'in_range': in_range,
+    }
+
+
+# Сдвиг между таблицами в общей колонке дистанций, больше любой дистанции в базе
+STACK_OFFSET = 1_000_000
+
+
+class MortarMatrix:
+    """Все кольца всех снарядов одного миномета в общих колонках.
+
+    Дистанции каждой таблицы сдвинуты на STACK_OFFSET * номер таблицы,
+    поэтому отрезки интерполяции для всех снарядов и колец находятся
+    одним вызовом searchsorted.
+    """
+
+    def __init__(self, mortar):
+        self.mortar = mortar
+        self.tables = [
+            (shell, table)
+            for shell, shell_tables in TABLES[mortar].items()
+            for table in shell_tables.values()
+        ]
+        columns = [table_columns(table) for _, table in self.tables]
+        self.dists = np.concatenate([dists for dists, _, _, _ in columns]).astype(np.float64)
+        self.shifted = np.concatenate([
+            dists + i * STACK_OFFSET for i, (dists, _, _, _) in enumerate(columns)
+        ]).astype(np.float64)
+        self.mils = np.concatenate([mils for _, mils, _, _ in columns])
+        self.times = np.concatenate([times for _, _, times, _ in columns])
+        self.mils_per_100m = np.concatenate([mpm for _, _, _, mpm in columns])
+
+        lengths = np.array([len(dists) for dists, _, _, _ in columns])
+        self.start = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.end = self.start + lengths - 1
+        self.shift = np.arange(len(self.tables)) * STACK_OFFSET
+
+    def solve(self, target_dist, mortar_alt, target_alt):
+        """Решения для всех снарядов: {снаряд: (results, errors)} как у ballistics.solve"""
+        index = np.searchsorted(self.shifted, target_dist + self.shift, side='left')
+        high = np.clip(index, self.start, self.end)
+        low = np.where(index <= self.start, self.start, high - 1)
+        in_range = (target_dist >= self.dists[self.start]) & (target_dist <= self.dists[self.end])
+
+        low_dist = self.dists[low]
+        high_dist = self.dists[high]
+        same = low_dist == high_dist
+        ratio = (target_dist - low_dist) / np.where(same, 1.0, high_dist - low_dist)
+
+        def column(values):
+            low_value = values[low]
+            return np.where(same, low_value, low_value + (values[high] - low_value) * ratio)
+
+        mils = column(self.mils)
+        times = column(self.times)
+        # Поправка на высоту
+        compensation = (mortar_alt - target_alt) * (column(self.mils_per_100m) / 100)
+        elevation = mils + compensation
+
+        solutions = {shell: ([], []) for shell in TABLES[self.mortar]}
+        for i, (shell, table) in enumerate(self.tables):
+            results, errors = solutions[shell]
+            if not in_range[i]:
+                _, _, error_msg = table.find_closest(target_dist)
+                errors.append(f"{table.rings} колец: {error_msg}")
+                continue
+            results.append({
+                'rings': table.rings,
+                'elevation': float(elevation[i]),
+                'time': float(times[i]),
+                'dispersion': table.dispersion,
+                'altitude_comp': float(compensation[i])
+            })
+        return solutions
+
+
+_matrices = {}
+
+
+def solve_all_shells(mortar, target_dist, mortar_alt=0, target_alt=0):
+    """Один векторный проход по всем снарядам и кольцам миномета"""
+    matrix = _matrices.get(mortar)
+    if matrix is None:
+        matrix = _matrices[mortar] = MortarMatrix(mortar)
+    return matrix.solve(target_dist, mortar_alt, target_alt)
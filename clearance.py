@@ -0,0 +1,103 @@
+"""Проверка прохождения траектории над рельефом.
+
+Траектория восстанавливается приближенно по данным таблицы: кубическая
+кривая Эрмита над линией миномет-цель. Начальный наклон - угол возвышения
+из таблицы, наклон при падении - по времени полета (парабола с тем же
+временем полета и разницей высот), так что нисходящая ветвь круче
+восходящей, как у реального снаряда с сопротивлением воздуха.
+
+Высоты рельефа берутся с карты высот в точках вдоль линии миномет-цель;
+все кольца и все точки проверяются одним векторным расчетом.
+"""
+import math
+
+import numpy as np
+
+from map_grid import MILS_NATO
+
+G = 9.81
+
+# Точек рельефа вдоль линии стрельбы (без концов) и запас над рельефом, м
+SAMPLES = 64
+CLEARANCE = 2.0
+
+
+def trajectory_heights(distance, elevation, time, altitude_difference, fractions, circle=MILS_NATO):
+    """Высоты траекторий над огневой позицией в долях дальности fractions.
+
+    elevation (тысячные) и time - массивы по кольцам формы (R,),
+    altitude_difference - высота цели минус высота миномета.
+    Возвращает высоты (R, K), высоту вершины (R,) и угол падения (R,) в градусах.
+    """
+    elevation = np.asarray(elevation, dtype=np.float64)[:, None]
+    time = np.asarray(time, dtype=np.float64)[:, None]
+    u = np.asarray(fractions, dtype=np.float64)[None, :]
+
+    launch_slope = np.tan(elevation / circle * 2 * math.pi)
+    # Парабола через миномет и цель с табличным временем полета
+    horizontal_speed = distance / time
+    vertical_speed = (altitude_difference + G * time ** 2 / 2) / time
+    impact_slope = (vertical_speed - G * time) / horizontal_speed
+
+    def curve(u):
+        # Кубическая кривая Эрмита на отрезке [0, 1]
+        return (distance * launch_slope * (u ** 3 - 2 * u ** 2 + u)
+                + altitude_difference * (3 * u ** 2 - 2 * u ** 3)
+                + distance * impact_slope * (u ** 3 - u ** 2))
+
+    heights = curve(u)
+    # Вершина ищется по плотной сетке
+    apex = curve(np.linspace(0, 1, 257)[None, :]).max(axis=1)
+    descent = np.degrees(np.arctan(-impact_slope[:, 0]))
+    return heights, apex, descent
+
+
+def check_clearance(heightmap, mortar_position, target_position, mortar_alt, target_alt, results,
+                    circle=MILS_NATO, samples=SAMPLES, margin=CLEARANCE):
+    """Проверяет решения колец на закрытие рельефом.
+
+    mortar_position и target_position - (восток, север) в метрах, results -
+    решения колец как у ballistics.solve. Возвращает список словарей по
+    кольцам: rings, apex (высота вершины над уровнем моря), descent (угол
+    падения, градусы), clearance (наименьший запас над рельефом, м),
+    obstacle (дальность от миномета до самого опасного места, м), masked,
+    off_map (доля точек линии вне карты высот). Точки вне карты высот не
+    проверяются; если вне карты вся линия, clearance и obstacle - None.
+    """
+    mortar_east, mortar_north = mortar_position
+    target_east, target_north = target_position
+    distance = math.hypot(target_east - mortar_east, target_north - mortar_north)
+    if not results or distance == 0:
+        return []
+
+    fractions = np.arange(1, samples + 1) / (samples + 1)
+    terrain = heightmap.altitude(mortar_east + (target_east - mortar_east) * fractions,
+                                 mortar_north + (target_north - mortar_north) * fractions)
+
+    heights, apex, descent = trajectory_heights(
+        distance,
+        [result['elevation'] for result in results],
+        [result['time'] for result in results],
+        target_alt - mortar_alt, fractions, circle)
+
+    on_map = ~np.isnan(terrain)
+    off_map = float(1 - on_map.mean())
+    if on_map.any():
+        # Самое опасное место ищется только среди точек на карте
+        gap = mortar_alt + heights[:, on_map] - terrain[on_map]
+        worst = gap.argmin(axis=1)
+        clearance = gap[np.arange(len(results)), worst]
+        obstacle = distance * fractions[on_map][worst]
+
+    return [
+        {
+            'rings': result['rings'],
+            'apex': float(mortar_alt + apex[i]),
+            'descent': float(descent[i]),
+            'clearance': float(clearance[i]) if on_map.any() else None,
+            'obstacle': float(obstacle[i]) if on_map.any() else None,
+            'masked': bool(on_map.any() and clearance[i] < margin),
+            'off_map': off_map,
+        }
+        for i, result in enumerate(results)
+    ]
@@ -0,0 +1,258 @@
+"""Карта досягаемости для огневой позиции.
+
+Для миномета на заданной позиции строит по растру карты, какие клетки
+достает каждая комбинация снаряд/кольца: дистанция в пределах Dists из
+database.py, а с картой высот - еще и угол с поправкой на разницу высот
+в пределах углов таблицы. Карта режется на плитки, плитки считаются
+параллельно в ProcessPoolExecutor, каждый процесс пишет свои плитки прямо
+в выходные .npy (numpy.memmap), так что большие растры не гоняются между
+процессами. По каждому кольцу - отдельный файл: .npy (uint8, 1 - достает,
+строки в том же порядке, что и в карте высот) или PNG в оттенках серого
+(север сверху).
+
+Примеры:
+    python coverage_map.py --mortar M252 --gun "0640 0640" --size 12800 --cell 10
+    python coverage_map.py --mortar 2B14 --shell "HE O-832DU" --gun 064064 --heightmap everon.r16 --format png
+    python coverage_map.py --mortar M252 --gun 064064 --size 12800 --cell 1 --bench 1 2 4 8
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from ballistics import TABLES
+from batch_solver import interpolate_columns, table_columns
+from heightmap import Heightmap
+from map_grid import parse_position
+
+TILE = 512
+
+
+class Raster:
+    """Сетка карты: узлы с шагом cell от юго-западного угла.
+
+    Первая строка - север (north_up) или юг, как в карте высот, чтобы
+    плитки растра совпадали с плитками карты.
+    """
+
+    def __init__(self, rows, columns, cell, origin=(0, 0), north_up=True):
+        self.rows = rows
+        self.columns = columns
+        self.cell = float(cell)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.north_up = north_up
+
+    @classmethod
+    def from_heightmap(cls, heightmap):
+        rows, columns = heightmap.shape
+        return cls(rows, columns, heightmap.cell_size, heightmap.origin, heightmap.north_up)
+
+    def tiles(self, size=TILE):
+        """Плитки (строка, строка, колонка, колонка) с полуоткрытыми границами"""
+        return [(r, min(r + size, self.rows), c, min(c + size, self.columns))
+                for r in range(0, self.rows, size)
+                for c in range(0, self.columns, size)]
+
+    def coordinates(self, r0, r1, c0, c1):
+        """Координаты узлов плитки: восток (колонки,) и север (строки,)"""
+        east = self.origin[0] + np.arange(c0, c1) * self.cell
+        row = np.arange(r0, r1)
+        if self.north_up:
+            row = self.rows - 1 - row
+        north = self.origin[1] + row * self.cell
+        return east, north
+
+
+def combinations(mortar, shell=None):
+    """Список (снаряд, кольца, RingTable) миномета"""
+    shells = [shell] if shell else list(TABLES[mortar])
+    return [(name, table.rings, table) for name in shells for table in TABLES[mortar][name].values()]
+
+
+def output_name(mortar, shell, rings, extension):
+    safe = re.sub(r'[^\w.-]+', '_', f"{mortar}_{shell}").strip('_')
+    return f"coverage_{safe}_{rings}.{extension}"
+
+
+# Состояние процесса-исполнителя: открывается один раз в initializer
+_job = None
+
+
+def _init_worker(job):
+    global _job
+    heightmap = Heightmap.open(job['heightmap'], **job['heightmap_options']) if job['heightmap'] else None
+    outputs = [np.load(path, mmap_mode='r+') for path in job['outputs']]
+    _job = {**job, 'heightmap': heightmap, 'outputs': outputs,
+            'tables': [table for _, _, table in combinations(job['mortar'], job['shell'])]}
+
+
+def _render_tile(bounds):
+    """Считает одну плитку для всех колец и пишет ее в выходные растры"""
+    r0, r1, c0, c1 = bounds
+    raster, gun_east, gun_north = _job['raster'], _job['gun_east'], _job['gun_north']
+    east, north = raster.coordinates(r0, r1, c0, c1)
+    dist = np.hypot(east[None, :] - gun_east, north[:, None] - gun_north)
+
+    # Плитка целиком дальше всех колец - в файле уже нули
+    nearest, farthest = dist.min(), dist.max()
+    if nearest > _job['max_dist']:
+        return 0
+
+    altitude_difference = None
+    heightmap = _job['heightmap']
+    if heightmap is not None:
+        # Растр совпадает с сеткой карты высот - высоты берутся из узлов без интерполяции
+        terrain = heightmap.grid[r0:r1, c0:c1] * heightmap.scale + heightmap.offset
+        altitude_difference = _job['gun_alt'] - terrain
+
+    for table, output in zip(_job['tables'], _job['outputs']):
+        if nearest > table.max_dist or farthest < table.min_dist:
+            continue
+        if altitude_difference is None:
+            reachable = (dist >= table.min_dist) & (dist <= table.max_dist)
+        else:
+            dists, mils, _, mils_per_100m = table_columns(table)
+            in_range, ring_mils, ring_mils_per_100m = interpolate_columns(dists, dist, mils, mils_per_100m)
+            # Угол с поправкой на высоту должен остаться в пределах таблицы
+            elevation = ring_mils + altitude_difference * (ring_mils_per_100m / 100)
+            reachable = in_range & (elevation >= mils.min()) & (elevation <= mils.max())
+        output[r0:r1, c0:c1] = reachable
+    return dist.size
+
+
+def generate(mortar, gun_position, raster, output_dir, shell=None, heightmap=None, heightmap_options=None,
+             gun_alt=None, workers=None, tile=TILE):
+    """Строит растры досягаемости по кольцам, возвращает пути .npy и время расчета, с"""
+    gun_east, gun_north = gun_position
+    heightmap_options = heightmap_options or {}
+    if heightmap is not None and gun_alt is None:
+        gun_alt = Heightmap.open(heightmap, **heightmap_options).altitude_at(gun_east, gun_north)
+        if gun_alt is None:
+            raise ValueError("Огневая позиция вне карты высот - укажите --gun-alt")
+
+    os.makedirs(output_dir, exist_ok=True)
+    combos = combinations(mortar, shell)
+    outputs = []
+    for name, rings, _ in combos:
+        path = os.path.join(output_dir, output_name(mortar, name, rings, 'npy'))
+        # Файл создается разреженным, плитки вне досягаемости не записываются
+        np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(raster.rows, raster.columns))
+        outputs.append(path)
+
+    job = {
+        'mortar': mortar, 'shell': shell, 'raster': raster, 'outputs': outputs,
+        'heightmap': heightmap, 'heightmap_options': heightmap_options,
+        'gun_east': gun_east, 'gun_north': gun_north, 'gun_alt': gun_alt or 0,
+        'max_dist': max(table.max_dist for _, _, table in combos),
+    }
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(job,)) as executor:
+        for _ in executor.map(_render_tile, raster.tiles(tile)):
+            pass
+    return outputs, time.perf_counter() - started
+
+
+def write_png(path, mask, chunk=1024, north_up=True):
+    """Сохраняет маску 0/1 в PNG (8 бит, оттенки серого) без сторонних библиотек.
+
+    Если первая строка маски - юг (north_up=False), строки пишутся
+    в обратном порядке, чтобы север на картинке был сверху.
+    """
+    rows, columns = mask.shape
+
+    def block(kind, data):
+        payload = kind + data
+        return struct.pack('>I', len(data)) + payload + struct.pack('>I', zlib.crc32(payload) & 0xffffffff)
+
+    compressor = zlib.compressobj(6)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(block(b'IHDR', struct.pack('>IIBBBBB', columns, rows, 8, 0, 0, 0, 0)))
+        data = bytearray()
+        # Построчно по частям, чтобы не держать весь растр в памяти
+        for start in range(0, rows, chunk):
+            if north_up:
+                part = np.asarray(mask[start:start + chunk], dtype=np.uint8) * 255
+            else:
+                part = np.asarray(mask[max(rows - start - chunk, 0):rows - start][::-1], dtype=np.uint8) * 255
+            lines = np.zeros((part.shape[0], columns + 1), dtype=np.uint8)  # байт фильтра 0
+            lines[:, 1:] = part
+            data += compressor.compress(lines.tobytes())
+        data += compressor.flush()
+        f.write(block(b'IDAT', bytes(data)))
+        f.write(block(b'IEND', b''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Карта досягаемости огневой позиции по кольцам")
+    parser.add_argument('--mortar', required=True, choices=list(TABLES))
+    parser.add_argument('--shell', help="Снаряд (по умолчанию все снаряды миномета)")
+    parser.add_argument('--gun', required=True, help="Позиция миномета: сетка или метры (см. map_grid)")
+    parser.add_argument('--gun-alt', type=float, help="Высота миномета (по умолчанию с карты высот)")
+    parser.add_argument('--heightmap', metavar='PATH', help="Карта высот - задает сетку растра и поправку на высоту")
+    parser.add_argument('--size', type=float, default=12800, help="Размер квадратной карты без карты высот, м")
+    parser.add_argument('--cell', type=float, default=10, help="Шаг растра без карты высот, м")
+    parser.add_argument('--tile', type=int, default=TILE, help="Размер плитки в клетках")
+    parser.add_argument('--workers', type=int, help="Процессов (по умолчанию по числу ядер)")
+    parser.add_argument('--format', choices=['npy', 'png'], default='npy')
+    parser.add_argument('--output', default='coverage', help="Папка для растров")
+    parser.add_argument('--bench', type=int, nargs='+', metavar='N',
+                        help="Замерить время для указанного числа процессов вместо одного запуска")
+    args = parser.parse_args(argv)
+
+    if args.shell and args.shell not in TABLES[args.mortar]:
+        parser.error(f"Неизвестный снаряд для {args.mortar}: {args.shell!r}")
+    try:
+        gun_position = parse_position(args.gun)
+    except ValueError as e:
+        parser.error(f"--gun: {e}")
+    if args.heightmap:
+        try:
+            with_heights = Heightmap.open(args.heightmap)
+        except (OSError, ValueError) as e:
+            parser.error(f"--heightmap: {e}")
+        raster = Raster.from_heightmap(with_heights)
+        with_heights.close()
+    else:
+        side = int(args.size // args.cell) + 1
+        raster = Raster(side, side, args.cell)
+
+    options = dict(shell=args.shell, heightmap=args.heightmap, gun_alt=args.gun_alt, tile=args.tile)
+    cells = raster.rows * raster.columns
+    if args.bench:
+        print(f"Растр {raster.rows}x{raster.columns}, ядер в системе: {os.cpu_count()}")
+        base = None
+        for workers in args.bench:
+            try:
+                _, elapsed = generate(args.mortar, gun_position, raster, args.output, workers=workers, **options)
+            except ValueError as e:
+                parser.error(str(e))
+            base = base or elapsed
+            print(f"Процессов {workers:3d}: {elapsed:7.2f} с, {cells / elapsed / 1e6:6.1f} млн клеток/с, "
+                  f"ускорение {base / elapsed:4.2f}")
+        return
+
+    try:
+        outputs, elapsed = generate(args.mortar, gun_position, raster, args.output, workers=args.workers, **options)
+    except ValueError as e:
+        # Например, огневая позиция вне карты высот
+        parser.error(str(e))
+    for path in outputs:
+        coverage = np.load(path, mmap_mode='r')
+        if args.format == 'png':
+            png_path = path[:-len('.npy')] + '.png'
+            write_png(png_path, coverage, north_up=raster.north_up)
+            del coverage
+            os.remove(path)
+            path = png_path
+        print(path)
+    print(f"Растр {raster.rows}x{raster.columns}, {len(outputs)} колец: {elapsed:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
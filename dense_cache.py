@@ -0,0 +1,162 @@
+"""Плотные таблицы стрельбы с шагом 1 м в кэше на диске.
+
+Для каждого миномета/снаряда/колец заранее вычисляются угол, время полета
+и поправка на 100 м для каждого метра дистанции. Результат сохраняется
+в двоичный файл, который при запуске отображается в память через mmap,
+так что расчет для целой дистанции - это обращение по индексу.
+
+Кэш привязан к хэшу содержимого database.py и пересобирается
+автоматически, если таблицы изменились. Для загрузки кэша database.py
+не импортируется.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+DATABASE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.py')
+CACHE_FILE = 'mortar_tables.cache'
+
+MAGIC = b'MORTAR-DENSE-1\n'
+HEADER_SIZE = struct.Struct('<Q')
+
+# Колонки плотной таблицы: угол, время полета, поправка на 100 м высоты
+COLUMNS = 3
+
+
+def source_hash(path=DATABASE_FILE):
+    """Хэш содержимого файла с таблицами"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_cache(path=CACHE_FILE, source=DATABASE_FILE):
+    """Разворачивает таблицы в плотные с шагом 1 м и записывает кэш"""
+    from ballistics import TABLES, interpolate
+
+    tables = []
+    data = array('d')
+    for mortar, shells in TABLES.items():
+        for shell, shell_tables in shells.items():
+            for table in shell_tables.values():
+                tables.append({
+                    'mortar': mortar,
+                    'shell': shell,
+                    'rings': table.rings,
+                    'dispersion': table.dispersion,
+                    'min_dist': table.min_dist,
+                    'max_dist': table.max_dist,
+                    'offset': len(data),
+                })
+                for dist in range(table.min_dist, table.max_dist + 1):
+                    low, high, _ = table.find_closest(dist)
+                    low_dist = table.dists[low]
+                    high_dist = table.dists[high]
+                    for column in (table.mils, table.times, table.mils_per_100m):
+                        data.append(interpolate(low_dist, high_dist, dist, column[low], column[high]))
+
+    header = json.dumps({
+        'hash': source_hash(source),
+        'byteorder': sys.byteorder,
+        'tables': tables,
+    }, ensure_ascii=False).encode('utf-8')
+    # Данные выравниваются на 8 байт, чтобы их можно было читать как double
+    padding = -(len(MAGIC) + HEADER_SIZE.size + len(header)) % 8
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER_SIZE.pack(len(header) + padding))
+        f.write(header + b' ' * padding)
+        data.tofile(f)
+    os.replace(tmp_path, path)
+
+
+class DenseTables:
+    """Плотные таблицы, отображенные в память"""
+
+    def __init__(self, path=CACHE_FILE):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError("Неизвестный формат кэша таблиц")
+
+        start = len(MAGIC) + HEADER_SIZE.size
+        header_size, = HEADER_SIZE.unpack_from(self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[start:start + header_size])
+        self.hash = header['hash']
+        self.byteorder = header['byteorder']
+        self._view = memoryview(self._mmap)[start + header_size:]
+        self.data = self._view.cast('d')
+
+        self.tables = {}
+        for table in header['tables']:
+            self.tables.setdefault(table['mortar'], {}).setdefault(table['shell'], []).append(table)
+
+    @classmethod
+    def open(cls, path=CACHE_FILE, source=DATABASE_FILE):
+        """Открывает кэш, при отсутствии или устаревании пересобирает его"""
+        current_hash = source_hash(source)
+        if os.path.exists(path):
+            try:
+                dense = cls(path)
+            except (ValueError, KeyError):
+                dense = None
+            if dense is not None:
+                if dense.hash == current_hash and dense.byteorder == sys.byteorder:
+                    return dense
+                dense.close()
+
+        build_cache(path, source)
+        return cls(path)
+
+    def solve(self, mortar, shell, target_dist, mortar_alt, target_alt):
+        """Выполняет расчет по всем кольцам, как ballistics.solve"""
+        if target_dist != int(target_dist):
+            # Дробная дистанция между узлами плотной таблицы - обычный расчет
+            from ballistics import TABLES, solve
+            return solve(TABLES[mortar][shell], target_dist, mortar_alt, target_alt)
+
+        results = []
+        errors = []
+        altitude_difference = mortar_alt - target_alt
+
+        for table in self.tables[mortar][shell]:
+            min_dist = table['min_dist']
+            max_dist = table['max_dist']
+            if target_dist < min_dist:
+                errors.append(f"{table['rings']} колец: Слишком малая дистанция. Минимальная: {min_dist}м (не хватает {min_dist - target_dist}м)")
+                continue
+            if target_dist > max_dist:
+                errors.append(f"{table['rings']} колец: Слишком большая дистанция. Максимальная: {max_dist}м (превышение на {target_dist - max_dist}м)")
+                continue
+
+            row = table['offset'] + (int(target_dist) - min_dist) * COLUMNS
+            mils, time, mils_per_100m = self.data[row:row + COLUMNS]
+
+            # Поправка на высоту
+            altitude_compensation = altitude_difference * (mils_per_100m / 100)
+
+            results.append({
+                'rings': table['rings'],
+                'elevation': mils + altitude_compensation,
+                'time': time,
+                'dispersion': table['dispersion'],
+                'altitude_comp': altitude_compensation
+            })
+
+        return results, errors
+
+    def close(self):
+        self.data.release()
+        self._view.release()
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    build_cache()
+    print(f"Кэш плотных таблиц записан в {CACHE_FILE}")
@@ -0,0 +1,102 @@
+"""Карта высот местности для автоматического определения высот.
+
+Растр высот (.npy или сырой 16-битный файл) открывается через
+numpy.memmap: при запуске читается только заголовок, а при поиске высот
+с диска подгружаются лишь затронутые страницы. Высота в точке - билинейная
+интерполяция по четырем соседним узлам, векторно для массивов координат.
+
+Параметры растра берутся из аргументов или из файла <растр>.json рядом
+с ним, например для сырого экспорта Эверона:
+    {"cell_size": 2, "shape": [6400, 6400], "scale": 0.0061, "offset": -5}
+    cell_size  - метров между узлами
+    origin     - координаты (восток, север) юго-западного узла, по умолчанию [0, 0]
+    shape      - [строк, колонок] для сырого файла (по умолчанию квадрат по размеру файла)
+    dtype      - тип сырого файла, по умолчанию "<u2" (16 бит без знака)
+    scale, offset - высота = значение * scale + offset
+    north_up   - первая строка растра - северный край (по умолчанию true)
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+RAW_DTYPE = '<u2'
+
+
+class Heightmap:
+    """Растр высот, отображенный в память"""
+
+    def __init__(self, path, cell_size=1.0, origin=(0, 0), shape=None, dtype=RAW_DTYPE,
+                 scale=1.0, offset=0.0, north_up=True):
+        self.path = path
+        if path.endswith('.npy'):
+            self.grid = np.load(path, mmap_mode='r')
+        else:
+            dtype = np.dtype(dtype)
+            if shape is None:
+                side = math.isqrt(os.path.getsize(path) // dtype.itemsize)
+                shape = (side, side)
+            self.grid = np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+        if self.grid.ndim != 2:
+            raise ValueError(f"Карта высот должна быть двумерной, а не {self.grid.shape}")
+
+        self.cell_size = float(cell_size)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.north_up = north_up
+
+    @classmethod
+    def open(cls, path, **options):
+        """Открывает растр, дополняя параметры из <растр>.json"""
+        meta_path = path + '.json'
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                options = {**json.load(f), **options}
+        return cls(path, **options)
+
+    @property
+    def shape(self):
+        return self.grid.shape
+
+    def extent(self):
+        """Границы карты в метрах: (запад, юг, восток, север)"""
+        rows, columns = self.grid.shape
+        west, south = self.origin
+        return west, south, west + (columns - 1) * self.cell_size, south + (rows - 1) * self.cell_size
+
+    def altitude(self, east, north):
+        """Высоты в точках (билинейно), вне карты - NaN"""
+        east = np.asarray(east, dtype=np.float64)
+        north = np.asarray(north, dtype=np.float64)
+        rows, columns = self.grid.shape
+
+        x = (east - self.origin[0]) / self.cell_size
+        y = (north - self.origin[1]) / self.cell_size
+        if self.north_up:
+            y = (rows - 1) - y
+        inside = (x >= 0) & (x <= columns - 1) & (y >= 0) & (y <= rows - 1)
+
+        # Левый верхний узел ячейки; на последнем узле ячейка берется предыдущая
+        x0 = np.clip(np.floor(np.where(inside, x, 0)), 0, max(columns - 2, 0)).astype(np.intp)
+        y0 = np.clip(np.floor(np.where(inside, y, 0)), 0, max(rows - 2, 0)).astype(np.intp)
+        x1 = np.minimum(x0 + 1, columns - 1)
+        y1 = np.minimum(y0 + 1, rows - 1)
+        fx = np.where(inside, x - x0, 0)
+        fy = np.where(inside, y - y0, 0)
+
+        # Выборка по индексам читает с диска только нужные страницы
+        top = self.grid[y0, x0] * (1 - fx) + self.grid[y0, x1] * fx
+        bottom = self.grid[y1, x0] * (1 - fx) + self.grid[y1, x1] * fx
+        heights = (top * (1 - fy) + bottom * fy) * self.scale + self.offset
+        return np.where(inside, heights, np.nan)
+
+    def altitude_at(self, east, north):
+        """Высота одной точки или None вне карты"""
+        height = float(self.altitude(east, north))
+        return None if math.isnan(height) else height
+
+    def close(self):
+        """Освобождает отображение файла (страницы отпускаются вместе с массивом)"""
+        self.grid = None
@@ -0,0 +1,107 @@
+"""Сравнение памяти и времени загрузки записей истории.
+
+Старый формат: строка журнала - JSON объект, запись в памяти - словарь
+со списком словарей результатов. Новый формат: строка - позиционный
+JSON массив, запись - HistoryRecord со __slots__ и кортежем RingResult.
+
+Каждый замер выполняется в отдельном процессе: журнал читается построчно,
+все записи удерживаются в списке, память - прирост RSS процесса
+(Linux, /proc/self/statm; на других системах - tracemalloc).
+
+Пример:
+    python history_bench.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from history_records import dump_record, parse_record
+
+MORTARS = (('M252', ('HE M821', 'Smoke M819', 'Illumination M853A1')),
+           ('2B14', ('HE O-832DU', 'Smoke D-832DU', 'Illumination S-832C')))
+
+
+def sample_record(i, rings):
+    mortar, shells = MORTARS[i % len(MORTARS)]
+    return {
+        'timestamp': f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:{i * 7 % 60:02d}",
+        'target_name': f"Цель {i % 500}",
+        'mortar': mortar,
+        'shell': shells[i % len(shells)],
+        'distance': 100 + i % 3000,
+        'mortar_alt': i % 300,
+        'target_alt': i * 3 % 300,
+        'azimuth': '0',
+        'results': [
+            {'rings': ring, 'elevation': 1400 - ring * 50 - i % 300 / 7, 'time': 30 - ring * 2 + i % 100 / 13,
+             'dispersion': 20 + ring * 8, 'altitude_comp': (i % 300 - i * 3 % 300) / 9}
+            for ring in range(1, rings + 1)
+        ],
+    }
+
+
+def write_journal(path, form, count, rings):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            record = sample_record(i, rings)
+            if form == 'dict':
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                f.write(dump_record(record))
+
+
+def resident_memory():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def load(path, form):
+    """Загружает журнал в список записей, возвращает (секунды, байт памяти)"""
+    use_proc = os.path.exists('/proc/self/statm')
+    if use_proc:
+        before = resident_memory()
+    else:
+        import tracemalloc
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    parse = json.loads if form == 'dict' else parse_record
+    with open(path, 'rb') as f:
+        records = [parse(line) for line in f]
+    elapsed = time.perf_counter() - started
+
+    memory = resident_memory() - before if use_proc else tracemalloc.get_traced_memory()[0]
+    return elapsed, memory, len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Память и время загрузки истории: словари против HistoryRecord")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--rings', type=int, default=3, help="Результатов (колец) в записи")
+    parser.add_argument('--load', nargs=2, metavar=('FORM', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.load:
+        print(json.dumps(load(args.load[1], args.load[0])))
+        return
+
+    print(f"{'Записей':>9} {'Формат':>8} {'Файл, МБ':>9} {'Загрузка, с':>12} {'Память, МБ':>11} {'Байт/запись':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            for form in ('dict', 'compact'):
+                path = os.path.join(directory, f'{form}.jsonl')
+                write_journal(path, form, count, args.rings)
+                output = subprocess.run([sys.executable, __file__, '--load', form, path],
+                                        capture_output=True, text=True, check=True).stdout
+                elapsed, memory, loaded = json.loads(output)
+                print(f"{loaded:>9} {form:>8} {os.path.getsize(path) / 2**20:>9.1f} {elapsed:>12.2f} "
+                      f"{memory / 2**20:>11.1f} {memory / loaded:>12.0f}")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Компактное представление записей истории.
+
+Запись истории - объект HistoryRecord со __slots__ вместо словаря,
+результаты по кольцам - именованные кортежи RingResult. Названия
+минометов и снарядов интернируются, так что тысячи записей ссылаются
+на одни и те же строки.
+
+В журнал запись сохраняется позиционным JSON массивом без имен полей:
+    [время, цель, миномет, снаряд, дистанция, высота миномета,
+     высота цели, азимут, [[кольца, угол, время, разброс, поправка], ...]]
+Если у записи есть дополнительные поля, они идут десятым элементом
+в виде объекта. Старые строки журнала в виде JSON объектов читаются
+как раньше.
+"""
+from collections import namedtuple
+import json
+import sys
+
+RingResult = namedtuple('RingResult', ('rings', 'elevation', 'time', 'dispersion', 'altitude_comp'))
+
+FIELDS = ('timestamp', 'target_name', 'mortar', 'shell', 'distance', 'mortar_alt', 'target_alt', 'azimuth', 'results')
+
+
+def ring_result(data):
+    """RingResult из словаря результата расчета"""
+    if isinstance(data, RingResult):
+        return data
+    return RingResult(data['rings'], data['elevation'], data['time'], data['dispersion'], data.get('altitude_comp', 0))
+
+
+class HistoryRecord:
+    """Запись истории расчетов.
+
+    Поддерживает чтение как словарь (record['mortar'], record.get(...)),
+    чтобы фильтры поиска и повтор расчета из истории работали без изменений.
+    """
+
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, timestamp='', target_name='Без названия', mortar='', shell='', distance=0,
+                 mortar_alt=0, target_alt=0, azimuth='0', results=(), extra=None):
+        self.timestamp = timestamp
+        self.target_name = target_name
+        self.mortar = sys.intern(mortar)
+        self.shell = sys.intern(shell)
+        self.distance = distance
+        self.mortar_alt = mortar_alt
+        self.target_alt = target_alt
+        self.azimuth = azimuth
+        self.results = results
+        self.extra = extra  # Поля, которых нет в FIELDS, или None
+
+    @classmethod
+    def from_dict(cls, data):
+        known = {key: data[key] for key in FIELDS if key in data}
+        known['results'] = tuple(ring_result(result) for result in known.get('results') or ())
+        extra = {key: value for key, value in data.items() if key not in FIELDS} or None
+        return cls(extra=extra, **known)
+
+    @classmethod
+    def from_row(cls, row):
+        # Без вызова __init__: это самый частый путь при чтении журнала
+        record = cls.__new__(cls)
+        (record.timestamp, record.target_name, mortar, shell, record.distance,
+         record.mortar_alt, record.target_alt, record.azimuth, results) = row[:9]
+        record.mortar = sys.intern(mortar)
+        record.shell = sys.intern(shell)
+        record.results = tuple(map(RingResult._make, results))
+        record.extra = row[9] if len(row) > 9 else None
+        return record
+
+    def to_row(self):
+        row = [self.timestamp, self.target_name, self.mortar, self.shell, self.distance,
+               self.mortar_alt, self.target_alt, self.azimuth, [list(result) for result in self.results]]
+        if self.extra:
+            row.append(self.extra)
+        return row
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in FIELDS}
+        data['results'] = [result._asdict() for result in self.results]
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"HistoryRecord({self.timestamp!r}, {self.target_name!r}, {self.mortar}, {self.shell}, {self.distance}м)"
+
+
+def to_record(data):
+    """HistoryRecord из словаря или уже готовой записи"""
+    return data if isinstance(data, HistoryRecord) else HistoryRecord.from_dict(data)
+
+
+def dump_record(record):
+    """Сериализует запись в одну строку журнала (служебные строки - JSON объектом)"""
+    if isinstance(record, dict) and '_op' in record:
+        data = record
+    else:
+        data = to_record(record).to_row()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def parse_record(line):
+    """Разбирает строку журнала в HistoryRecord (новый формат массивом или старый объектом)"""
+    data = json.loads(line)
+    if isinstance(data, list):
+        return HistoryRecord.from_row(data)
+    return HistoryRecord.from_dict(data)
@@ -0,0 +1,782 @@
+"""Хранилище истории расчетов.
+
+Поддерживаются два варианта хранения с одинаковым интерфейсом:
+
+HistoryJournal - журнал mortar_history.jsonl: одна строка JSON на расчет,
+каждое сохранение - дозапись в конец файла. Очистка истории тоже
+дозаписывает служебную строку, а мертвые строки убираются фоновым
+уплотнением, когда их становится больше порога. В памяти держатся только
+смещения строк, сами записи читаются с диска по требованию, а индекс
+смещений строится только при первом обращении к истории.
+Дозапись выполняет фоновый поток: сохранения, пришедшие подряд, пишутся
+одной операцией с fsync, а поток ввода не ждет диск.
+
+Когда журнал становится больше ROTATE_SIZE или его самая старая запись
+старше ROTATE_AGE_DAYS, живые записи переносятся в сжатый архивный
+сегмент mortar_history.jsonl.NNNNN.<записей>.gz, а журнал начинается
+заново. Сегменты открываются только при поиске и листании истории
+дальше журнала, поэтому время запуска и память не растут со временем.
+
+Журнал может одновременно использоваться несколькими процессами
+(по окну калькулятора на каждое орудие). Запись, обновление индекса
+и уплотнение выполняются под рекомендательной блокировкой файла
+mortar_history.jsonl.lock; перед записью процесс дочитывает строки,
+дописанные другими, поэтому чужие расчеты не теряются.
+
+SqliteHistory - база mortar_history.db с индексами по времени,
+миномету/снаряду и дистанции и индексом триграмм FTS5 по названию цели
+(в нижнем регистре) для быстрого поиска подстроки.
+"""
+from array import array
+from collections import deque
+import datetime
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from history_records import dump_record, parse_record
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+JOURNAL_FILE = 'mortar_history.jsonl'
+LEGACY_FILE = 'mortar_history.json'
+SQLITE_FILE = 'mortar_history.db'
+
+# Сколько мертвых строк допускается в журнале до фонового уплотнения
+COMPACT_THRESHOLD = 1000
+
+# Пороги ротации журнала в архивные сегменты: размер в байтах и возраст записей
+ROTATE_SIZE = 1024 * 1024
+ROTATE_AGE_DAYS = 30
+
+# Максимум записей, возвращаемых поиском
+SEARCH_LIMIT = 50
+
+CLEAR_MARKER = {'_op': 'clear'}
+
+
+CLEAR_LINE = dump_record(CLEAR_MARKER).encode('utf-8')
+
+# Служебная строка ротации: {"_op":"rotate","segment":N}
+ROTATE_PREFIX = b'{"_op":"rotate",'
+
+
+def fsync_file(f):
+    """Сбрасывает буферы файла на диск"""
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def matches(record, mortar=None, shell=None, name=None, min_dist=None, max_dist=None, date=None):
+    """Проверяет запись на соответствие фильтрам поиска"""
+    if mortar is not None and record.get('mortar') != mortar:
+        return False
+    if shell is not None and record.get('shell') != shell:
+        return False
+    if name is not None and name.lower() not in record.get('target_name', '').lower():
+        return False
+    distance = record.get('distance', 0)
+    if min_dist is not None and distance < min_dist:
+        return False
+    if max_dist is not None and distance > max_dist:
+        return False
+    if date is not None and not record.get('timestamp', '').startswith(date):
+        return False
+    return True
+
+
+class FileLock:
+    """Межпроцессная рекомендательная блокировка на отдельном файле.
+
+    Повторный вход из того же потока разрешен. Считает количество захватов
+    и суммарное время ожидания для оценки конкуренции.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+        self.acquisitions = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def __enter__(self):
+        if self._depth == 0:
+            if self._file is None:
+                self._file = open(self.path, 'a+b')
+            started = time.perf_counter()
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+            waited = time.perf_counter() - started
+            self.acquisitions += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class HistoryJournal:
+    """Журнал истории с дозаписью и фоновым уплотнением"""
+
+    def __init__(self, path=JOURNAL_FILE, legacy_path=LEGACY_FILE, compact_threshold=COMPACT_THRESHOLD,
+                 background=True, rotate_size=ROTATE_SIZE, rotate_age_days=ROTATE_AGE_DAYS):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_threshold = compact_threshold
+        self.background = background  # Писать в фоновом потоке, а не в вызывающем
+        self.rotate_size = rotate_size
+        self.rotate_age_days = rotate_age_days
+        self.offsets = None  # Смещения живых строк от старых к новым, строятся лениво
+        self.segments = self.list_segments()  # Архивные сегменты (номер, записей, путь), старые первыми
+        self._segment_cache = (None, None)  # Последний прочитанный сегмент
+        self._oldest = (None, None)  # (файл, время самой старой записи) для проверки возраста
+        self.dead_lines = 0
+        self._end = 0  # До какой позиции файл учтен в индексе
+        self._file_id = None  # (устройство, inode) файла, по которому построен индекс
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path + '.lock')
+        self._compactor = None
+
+        # Очередь строк для фоновой записи
+        self._pending = []
+        self._writing = False
+        self._write_error = None
+        self._closed = False
+        self._queue = threading.Condition()
+        self._writer = None
+
+    def migrate_legacy(self):
+        """Переносит старый mortar_history.json в журнал при первом запуске"""
+        if os.path.exists(self.path) or not os.path.exists(self.legacy_path):
+            return False
+
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(dump_record(record))
+            fsync_file(f)
+        os.replace(tmp_path, self.path)
+
+        # Старый файл сохраняем рядом на случай отката
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+        return True
+
+    def list_segments(self):
+        """Находит архивные сегменты журнала, старые первыми"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = os.path.basename(self.path) + '.'
+        segments = []
+        for name in os.listdir(directory):
+            if not (name.startswith(prefix) and name.endswith('.gz')):
+                continue
+            parts = name[len(prefix):-len('.gz')].split('.')
+            if len(parts) == 2 and all(part.isdigit() for part in parts):
+                segments.append((int(parts[0]), int(parts[1]), os.path.join(directory, name)))
+        segments.sort()
+        return segments
+
+    def scan(self, start=0, offsets=None):
+        """Строит индекс смещений живых строк, не разбирая JSON.
+
+        С start и offsets продолжает уже построенный индекс с позиции start.
+        Возвращает (смещения, количество мертвых строк, позиция конца).
+        """
+        offsets = array('q') if offsets is None else offsets
+        archived = None
+        dead_lines = 0
+        if not os.path.exists(self.path):
+            return offsets, dead_lines, 0
+
+        with open(self.path, 'r+b') as f:
+            f.seek(start)
+            position = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Недописанная строка после аварийного завершения
+                    f.truncate(position)
+                    dead_lines += 1
+                    break
+                if line == CLEAR_LINE:
+                    dead_lines += len(offsets) + 1
+                    offsets = array('q')
+                elif line.startswith(ROTATE_PREFIX):
+                    # Строки до отметки ротации уже в архиве, если сегмент успел появиться
+                    if archived is None:
+                        archived = {number for number, _, _ in self.list_segments()}
+                    if json.loads(line)['segment'] in archived:
+                        dead_lines += len(offsets)
+                        offsets = array('q')
+                    dead_lines += 1
+                elif line.strip():
+                    offsets.append(position)
+                position += len(line)
+        return offsets, dead_lines, position
+
+    def has_torn_tail(self):
+        """Проверяет, что журнал не заканчивается недописанной строкой"""
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def load(self):
+        """Открывает журнал, не читая записи"""
+        with self._lock, self._file_lock:
+            self.migrate_legacy()
+            # Недописанную строку нужно отрезать до первой дозаписи
+            if self.has_torn_tail():
+                self._index()
+            self.maybe_rotate()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _index(self):
+        """Возвращает индекс смещений, при первом вызове строит его (под self._lock).
+
+        Строки, дописанные другими процессами, дочитываются в индекс; если
+        журнал был переписан (уплотнен или удален), индекс строится заново.
+        """
+        with self._file_lock:
+            file_id, size = self._stat()
+            if self.offsets is not None and file_id == self._file_id and size == self._end:
+                return self.offsets
+
+            if self.offsets is None or file_id != self._file_id or size < self._end:
+                self.offsets, self.dead_lines, self._end = self.scan()
+                self.segments = self.list_segments()
+            else:
+                self.offsets, dead_lines, self._end = self.scan(self._end, self.offsets)
+                self.dead_lines += dead_lines
+                if dead_lines:
+                    # Другой процесс очистил историю или перенес журнал в архив
+                    self.segments = self.list_segments()
+            self._file_id = self._stat()[0]
+            self.maybe_compact()
+        return self.offsets
+
+    def count(self):
+        self.flush()
+        with self._lock:
+            return len(self._index()) + sum(count for _, count, _ in self.segments)
+
+    def append(self, record):
+        """Дописывает одну запись в конец журнала"""
+        self._submit(dump_record(record).encode('utf-8'))
+
+    def clear(self):
+        """Очищает историю дозаписью служебной строки"""
+        self._submit(CLEAR_LINE)
+
+    def _submit(self, line):
+        """Ставит строку в очередь фоновой записи или пишет ее сразу"""
+        with self._queue:
+            self._raise_write_error()
+            if self.background and not self._closed:
+                self._pending.append(line)
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name='history-writer', daemon=True)
+                    self._writer.start()
+                self._queue.notify_all()
+                return
+        self._write_lines([line])
+
+    def _run_writer(self):
+        """Фоновый поток: забирает все накопившиеся строки и пишет их разом"""
+        while True:
+            with self._queue:
+                while not self._pending and not self._closed:
+                    self._queue.wait()
+                if not self._pending:
+                    return
+                lines, self._pending = self._pending, []
+                self._writing = True
+
+            error = None
+            try:
+                self._write_lines(lines)
+            except Exception as e:
+                # Ошибку получит следующий flush/append/close, а поток продолжает работу
+                error = e
+            finally:
+                with self._queue:
+                    self._writing = False
+                    if error is not None:
+                        self._write_error = error
+                    self._queue.notify_all()
+
+    def _write_lines(self, lines):
+        """Дописывает строки одной операцией с fsync и обновляет индекс"""
+        with self._lock, self._file_lock:
+            if self.offsets is not None:
+                # Сначала учитываем строки, дописанные другими процессами
+                self._index()
+            if CLEAR_LINE in lines:
+                # Очистка истории удаляет и архив
+                for _, _, segment_path in self.list_segments():
+                    os.remove(segment_path)
+                self.segments = []
+                self._segment_cache = (None, None)
+            with open(self.path, 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                f.write(b''.join(lines))
+                fsync_file(f)
+
+            if self.offsets is not None:
+                for line in lines:
+                    if line == CLEAR_LINE:
+                        self.dead_lines += len(self.offsets) + 1
+                        self.offsets = array('q')
+                    else:
+                        self.offsets.append(position)
+                    position += len(line)
+                self._end = position
+                self._file_id = self._stat()[0]
+                self.maybe_compact()
+            self.maybe_rotate()
+
+    def _raise_write_error(self):
+        """Пробрасывает ошибку фоновой записи вызывающему (под self._queue)"""
+        error, self._write_error = self._write_error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """Дожидается, пока все отложенные записи окажутся на диске"""
+        with self._queue:
+            while self._pending or self._writing:
+                self._queue.wait()
+            self._raise_write_error()
+
+    def _read_at(self, f, position):
+        f.seek(position)
+        try:
+            return parse_record(f.readline())
+        except ValueError:
+            return None
+
+    def get_page(self, offset, limit):
+        """Возвращает до limit записей, начиная с offset-й с конца (новые первыми)"""
+        self.flush()
+        with self._lock, self._file_lock:
+            offsets = self._index()
+            total = len(offsets)
+            records = []
+            if offset < total:
+                stop = max(total - offset - limit, 0)
+                with open(self.path, 'rb') as f:
+                    page = (self._read_at(f, offsets[i]) for i in range(total - offset - 1, stop - 1, -1))
+                    records = [record for record in page if record is not None]
+            segments = list(self.segments)
+
+        # Страница уходит дальше журнала - дочитываем архив от новых сегментов к старым
+        skip = max(offset - total, 0)
+        for _, count, segment_path in reversed(segments):
+            need = limit - len(records)
+            if need <= 0:
+                break
+            if skip >= count:
+                skip -= count
+                continue
+            lines = self._segment_lines(segment_path)
+            if lines is None:
+                break
+            end = len(lines) - skip
+            for line in reversed(lines[max(end - need, 0):end]):
+                try:
+                    records.append(parse_record(line))
+                except ValueError:
+                    pass
+            skip = 0
+        return records
+
+    def _segment_lines(self, segment_path):
+        """Строки архивного сегмента от старых к новым (последний сегмент кэшируется).
+
+        JSON разбирается только для строк, попавших на страницу.
+        """
+        cached_path, lines = self._segment_cache
+        if cached_path == segment_path:
+            return lines
+        try:
+            with gzip.open(segment_path, 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            # Другой процесс очистил историю
+            return None
+        self._segment_cache = (segment_path, lines)
+        return lines
+
+    def _iter_segment(self, segment_path):
+        # Сегмент не больше ROTATE_SIZE, читать его целиком быстрее построчного gzip
+        with gzip.open(segment_path, 'rb') as f:
+            lines = f.read().splitlines()
+        for line in lines:
+            try:
+                yield parse_record(line)
+            except ValueError:
+                pass
+
+    def get(self, index):
+        """Возвращает запись по номеру с конца (0 - самая новая)"""
+        page = self.get_page(index, 1)
+        return page[0] if page else None
+
+    def search(self, limit=SEARCH_LIMIT, **filters):
+        """Ищет записи по фильтрам потоковым чтением журнала, новые первыми"""
+        found = deque(maxlen=limit)
+        for record in self.iter_records():
+            if matches(record, **filters):
+                found.append(record)
+        return list(reversed(found))
+
+    def iter_records(self):
+        """Потоково перебирает записи от старых к новым, начиная с архива"""
+        self.flush()
+        with self._lock, self._file_lock:
+            self._index()
+            segments = list(self.segments)
+
+        for _, _, segment_path in segments:
+            try:
+                yield from self._iter_segment(segment_path)
+            except FileNotFoundError:
+                pass
+
+        with self._lock, self._file_lock:
+            offsets = array('q', self._index())
+            if not offsets:
+                return
+            # Файл открывается под блокировкой: даже если другой процесс
+            # уплотнит журнал, открытый файл останется прежним
+            f = open(self.path, 'rb')
+
+        # Читаем файл последовательно, пропуская строки вне индекса
+        live = iter(offsets)
+        next_live = next(live)
+        with f:
+            position = 0
+            for line in f:
+                if position == next_live:
+                    try:
+                        yield parse_record(line)
+                    except ValueError:
+                        pass
+                    next_live = next(live, None)
+                    if next_live is None:
+                        return
+                position += len(line)
+
+    def maybe_compact(self):
+        """Запускает фоновое уплотнение, если мертвых строк больше порога"""
+        if self.dead_lines < self.compact_threshold:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name='history-compactor', daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Переписывает журнал, оставляя только живые записи"""
+        with self._lock, self._file_lock:
+            self._index()
+            offsets = array('q')
+            tmp_path = self.path + '.tmp'
+            with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for position in self.offsets:
+                    src.seek(position)
+                    offsets.append(dst.tell())
+                    dst.write(src.readline())
+                fsync_file(dst)
+                end = dst.tell()
+            try:
+                os.replace(tmp_path, self.path)
+            except OSError:
+                # В Windows журнал нельзя заменить, пока его читает другой процесс
+                os.remove(tmp_path)
+                return
+            self.offsets = offsets
+            self.dead_lines = 0
+            self._end = end
+            self._file_id = self._stat()[0]
+
+    def oldest_timestamp(self):
+        """Время самой старой записи журнала (первая строка файла) или None"""
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.startswith(b'{"_op"'):
+                        return datetime.datetime.strptime(parse_record(line).timestamp, "%Y-%m-%d %H:%M:%S")
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def maybe_rotate(self):
+        """Переносит журнал в архив, если он слишком большой или старый (под блокировками)"""
+        file_id, size = self._stat()
+        if not size:
+            return
+        if size < self.rotate_size:
+            # Первая строка файла не меняется до его замены - время читается один раз на файл
+            if self._oldest[0] != file_id:
+                self._oldest = (file_id, self.oldest_timestamp())
+            oldest = self._oldest[1]
+            if oldest is None or datetime.datetime.now() - oldest < datetime.timedelta(days=self.rotate_age_days):
+                return
+        self._rotate()
+
+    def rotate(self):
+        """Принудительно переносит журнал в архив"""
+        with self._lock, self._file_lock:
+            self._rotate()
+
+    def _rotate(self):
+        """Переносит живые записи журнала в новый сжатый сегмент и начинает журнал заново.
+
+        Порядок шагов такой, что при аварии записи не теряются и не задваиваются:
+        сегмент пишется во временный файл, в журнал дописывается отметка
+        ротации, затем сегмент получает постоянное имя и журнал заменяется
+        пустым. Отметка действует, только если сегмент с ее номером существует.
+        Вызывается под self._lock и блокировкой файла.
+        """
+        offsets = self._index()
+        if not offsets:
+            return
+        number = self.segments[-1][0] + 1 if self.segments else 1
+        segment_path = f"{self.path}.{number:05d}.{len(offsets)}.gz"
+        tmp_path = self.path + '.tmp.gz'
+        with open(self.path, 'rb') as src, open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw) as dst:
+                for position in offsets:
+                    src.seek(position)
+                    dst.write(src.readline())
+            fsync_file(raw)
+
+        with open(self.path, 'ab') as f:
+            f.write(dump_record({'_op': 'rotate', 'segment': number}).encode('utf-8'))
+            fsync_file(f)
+        os.replace(tmp_path, segment_path)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            fsync_file(f)
+        try:
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Журнал открыт другим процессом (Windows): отметка ротации уже скрывает перенесенные строки
+            os.remove(tmp_path)
+
+        self.offsets = None
+        self._index()
+
+    def close(self):
+        """Дописывает отложенные записи и дожидается фоновых потоков"""
+        with self._queue:
+            self._closed = True
+            self._queue.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        if self._compactor is not None:
+            self._compactor.join()
+        self._file_lock.close()
+        with self._queue:
+            self._raise_write_error()
+
+
+class SqliteHistory:
+    """История в SQLite с индексами для поиска"""
+
+    COLUMNS = ('timestamp', 'target_name', 'mortar', 'shell', 'distance', 'mortar_alt', 'target_alt', 'azimuth')
+
+    def __init__(self, path=SQLITE_FILE, journal_path=JOURNAL_FILE, legacy_path=LEGACY_FILE):
+        self.path = path
+        self.journal_path = journal_path
+        self.legacy_path = legacy_path
+        self.conn = None
+        self.names_index = False
+
+    def load(self):
+        """Открывает базу, при первом запуске импортирует журнал"""
+        is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT,
+                target_name TEXT,
+                mortar TEXT,
+                shell TEXT,
+                distance INTEGER,
+                mortar_alt INTEGER,
+                target_alt INTEGER,
+                azimuth TEXT,
+                data TEXT NOT NULL,
+                target_name_lower TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_history_mortar_shell ON history (mortar, shell, distance);
+            CREATE INDEX IF NOT EXISTS idx_history_distance ON history (distance);
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(history)")]
+        if 'target_name_lower' not in columns:
+            # База старой версии: название в нижнем регистре считается в Python,
+            # т.к. lower() в SQLite не понижает регистр кириллицы
+            self.conn.create_function('py_lower', 1, lambda text: (text or '').lower(), deterministic=True)
+            with self.conn:
+                self.conn.execute("ALTER TABLE history ADD COLUMN target_name_lower TEXT")
+                self.conn.execute("UPDATE history SET target_name_lower = py_lower(target_name)")
+        self.names_index = self._create_names_index()
+        if is_new:
+            journal = HistoryJournal(self.journal_path, self.legacy_path)
+            try:
+                journal.load()
+                self.import_records(journal.iter_records())
+            finally:
+                journal.close()
+
+    def _create_names_index(self):
+        """Полнотекстовый индекс триграмм по названию цели для поиска подстроки.
+
+        Возвращает False, если SQLite собран без FTS5 или без токенизатора
+        trigram (до 3.34) - тогда поиск по названию идет перебором.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'history_names'").fetchone() is not None
+        try:
+            with self.conn:
+                self.conn.executescript("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS history_names USING fts5(
+                        target_name_lower, content='history', content_rowid='id', tokenize='trigram');
+                """)
+                if not exists:
+                    # Индекс добавлен к уже заполненной базе
+                    self.conn.execute("INSERT INTO history_names (history_names) VALUES ('rebuild')")
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def _row(self, record):
+        return (tuple(record.get(column) for column in self.COLUMNS)
+                + (dump_record(record).rstrip('\n'), (record.get('target_name') or '').lower()))
+
+    def import_records(self, records):
+        """Массово импортирует записи одной транзакцией"""
+        with self.conn:
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+            self.conn.executemany(
+                f"INSERT INTO history ({', '.join(self.COLUMNS)}, data, target_name_lower) "
+                f"VALUES ({', '.join('?' * (len(self.COLUMNS) + 2))})",
+                (self._row(record) for record in records))
+            if self.names_index:
+                # Одной командой после вставки: триггер на каждую строку в разы медленнее
+                self.conn.execute("INSERT INTO history_names (rowid, target_name_lower) "
+                                  "SELECT id, target_name_lower FROM history WHERE id > ?", (last_id,))
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def append(self, record):
+        self.import_records((record,))
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM history")
+            if self.names_index:
+                self.conn.execute("INSERT INTO history_names (history_names) VALUES ('delete-all')")
+
+    def get_page(self, offset, limit):
+        """Возвращает до limit записей, начиная с offset-й с конца (новые первыми)"""
+        rows = self.conn.execute(
+            "SELECT data FROM history ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [parse_record(data) for data, in rows]
+
+    def get(self, index):
+        """Возвращает запись по номеру с конца (0 - самая новая)"""
+        page = self.get_page(index, 1)
+        return page[0] if page else None
+
+    def search(self, limit=SEARCH_LIMIT, mortar=None, shell=None, name=None, min_dist=None, max_dist=None, date=None):
+        """Ищет записи по фильтрам через индексы, новые первыми"""
+        conditions = []
+        params = []
+        if mortar is not None:
+            conditions.append("mortar = ?")
+            params.append(mortar)
+        if shell is not None:
+            conditions.append("shell = ?")
+            params.append(shell)
+        if name is not None:
+            name = name.lower()
+            if self.names_index and len(name) >= 3:
+                # Триграммы находят подстроку по индексу; фраза в кавычках - без синтаксиса FTS
+                conditions.append("id IN (SELECT rowid FROM history_names WHERE history_names MATCH ?)")
+                params.append('"' + name.replace('"', '""') + '"')
+            else:
+                # Одну-две буквы триграммы не покрывают
+                conditions.append("instr(target_name_lower, ?) > 0")
+                params.append(name)
+        if min_dist is not None:
+            conditions.append("distance >= ?")
+            params.append(min_dist)
+        if max_dist is not None:
+            conditions.append("distance <= ?")
+            params.append(max_dist)
+        if date is not None:
+            # Диапазон по строке времени, чтобы работал индекс по timestamp
+            conditions.append("timestamp >= ? AND timestamp < ?")
+            params.extend((date, date + '\uffff'))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT data FROM history {where} ORDER BY id DESC LIMIT ?", (*params, limit))
+        return [parse_record(data) for data, in rows]
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def open_history(backend='jsonl'):
+    """Создает хранилище истории выбранного типа"""
+    if backend == 'sqlite':
+        return SqliteHistory()
+    return HistoryJournal()
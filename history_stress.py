@@ -0,0 +1,100 @@
+"""Нагрузочная проверка журнала истории несколькими процессами.
+
+Запускает несколько процессов-писателей, которые одновременно дописывают
+расчеты в один журнал (как несколько окон калькулятора в одной папке),
+листают историю и время от времени уплотняют журнал. В конце проверяет,
+что ни одна запись не потеряна и не задвоена, и выводит статистику
+ожидания блокировки файла.
+
+Пример:
+    python history_stress.py --processes 8 --records 500
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from history_store import HistoryJournal
+
+
+def writer(path, worker, records, compact_every, interval, seed, results):
+    """Процесс-писатель: дописывает records расчетов со своим номером"""
+    rng = random.Random(seed)
+    journal = HistoryJournal(path, path + '.legacy')
+    journal.load()
+    started = time.perf_counter()
+    for seq in range(records):
+        journal.append({
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'target_name': f"Орудие {worker} цель {seq}",
+            'mortar': 'M252',
+            'shell': 'HE M821',
+            'distance': rng.randint(100, 3000),
+            'mortar_alt': 0,
+            'target_alt': 0,
+            'azimuth': '0',
+            'worker': worker,
+            'seq': seq,
+        })
+        if rng.random() < 0.05:
+            journal.get_page(0, 20)
+        if compact_every and seq % compact_every == compact_every - 1:
+            journal.compact()
+        if interval:
+            time.sleep(rng.uniform(0, 2 * interval))
+    journal.close()
+    lock = journal._file_lock
+    results.put((worker, time.perf_counter() - started, lock.acquisitions, lock.wait_time, lock.max_wait))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка журнала истории несколькими процессами")
+    parser.add_argument('--processes', type=int, default=8, help="Количество процессов-писателей")
+    parser.add_argument('--records', type=int, default=500, help="Записей на процесс")
+    parser.add_argument('--compact-every', type=int, default=200,
+                        help="Первый процесс уплотняет журнал каждые N записей (0 - никогда)")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="Средняя пауза между сохранениями, с (0 - писать без пауз)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'mortar_history.jsonl')
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=writer, args=(
+                path, worker, args.records, args.compact_every if worker == 0 else 0,
+                args.interval, args.seed + worker, results))
+            for worker in range(args.processes)
+        ]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        stats = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        journal = HistoryJournal(path, path + '.legacy')
+        journal.load()
+        seen = [(record['worker'], record['seq']) for record in journal.iter_records()]
+        journal.close()
+
+    expected = {(worker, seq) for worker in range(args.processes) for seq in range(args.records)}
+    lost = len(expected - set(seen))
+    duplicated = len(seen) - len(set(seen))
+
+    print(f"Процессов: {args.processes}, записей: {len(seen)} из {len(expected)}, "
+          f"потеряно: {lost}, задвоено: {duplicated}")
+    print(f"Время: {elapsed:.2f} с, {len(seen) / elapsed:.0f} записей/с")
+    acquisitions = sum(s[2] for s in stats)
+    wait_time = sum(s[3] for s in stats)
+    print(f"Блокировка: захватов {acquisitions}, среднее ожидание {wait_time / max(acquisitions, 1) * 1000:.3f} мс, "
+          f"максимум {max(s[4] for s in stats) * 1000:.1f} мс")
+    return 1 if lost or duplicated else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""Вероятность попадания по разбросу колец (Монте-Карло на NumPy).
+
+Модель:
+- Разброс кольца (Dispersion из database.py) считается радиусом, в который
+  ложится DISPERSION_COVERAGE снарядов; отклонение каждого выстрела -
+  круговое нормальное с соответствующей сигмой.
+- Ошибки ввода дистанции и высоты общие для всей серии: орудие стреляет
+  с углом, рассчитанным по введенным данным, а точка падения для этого
+  угла при истинных дистанции и разнице высот находится обратным расчетом.
+  Получается систематический промах по дальности.
+- Вероятность хотя бы одного попадания из N выстрелов усредняется по
+  выборкам систематической ошибки: mean(1 - (1 - q)^N), где q - доля
+  попаданий одиночного выстрела при данном промахе.
+- Если при истинной разнице высот угол выходит за пределы таблицы,
+  снаряд ложится вне ее дистанций - такие выборки считаются промахом.
+- Выборки, для которых точку падения не найти однозначно (угол при такой
+  разнице высот встречается на нескольких дистанциях), не учитываются;
+  если других нет совсем, берется точка падения прямого расчета.
+
+Выстрел j серии попадает, когда промах лежит в отрезке вокруг -x_j, поэтому
+q для всех выборок считается двоичным поиском по отсортированным концам
+отрезков, без матрицы выборки x выстрелы (около 2 мс на все кольца снаряда).
+
+Генератор случайных чисел создается с фиксированным зерном, поэтому
+одинаковые входные данные дают одинаковый результат.
+"""
+import math
+
+import numpy as np
+
+from batch_solver import solve_batch
+from inverse_solver import elevation_bounds, range_from_elevation
+
+# Доля снарядов, попадающих в круг радиусом Dispersion
+DISPERSION_COVERAGE = 0.95
+
+# Выборки систематической ошибки ввода и выстрелов на каждую выборку
+BIAS_SAMPLES = 128
+ROUND_SAMPLES = 1024
+
+# Больше выстрелов в рекомендации не рассматривается
+MAX_ROUNDS = 20
+
+SEED = 12345
+
+
+def dispersion_sigma(dispersion):
+    """Сигма кругового нормального распределения по радиусу разброса"""
+    return dispersion / math.sqrt(-2 * math.log(1 - DISPERSION_COVERAGE))
+
+
+def single_shot(miss, radius, sigma, rounds_x, rounds_y):
+    """Доля выстрелов в круге radius для каждого систематического промаха miss.
+
+    Выстрел (x, y) попадает, если (miss + x*sigma)^2 + (y*sigma)^2 <= radius^2,
+    то есть miss лежит в отрезке -x*sigma +- sqrt(radius^2 - (y*sigma)^2).
+    Число отрезков, содержащих miss: (начал <= miss) - (концов < miss).
+    """
+    spread_y = rounds_y * sigma
+    near = np.abs(spread_y) <= radius
+    half = np.sqrt(radius ** 2 - spread_y[near] ** 2)
+    centers = -rounds_x[near] * sigma
+    starts = np.sort(centers - half)
+    ends = np.sort(centers + half)
+    count = np.searchsorted(starts, miss, side='right') - np.searchsorted(ends, miss, side='left')
+    return count / rounds_x.size
+
+
+def hit_probabilities(mortar, shell, target_dist, mortar_alt, target_alt, radius, rounds=1,
+                      probability=0.9, dist_error=0, alt_error=0, max_rounds=MAX_ROUNDS, seed=SEED):
+    """Оценивает вероятность попадания в круг radius по каждому достающему кольцу.
+
+    Возвращает список словарей (по возрастанию колец): rings, dispersion,
+    single (вероятность попадания одним выстрелом), hit (хотя бы одно
+    попадание из rounds выстрелов), rounds_needed (сколько выстрелов нужно
+    для вероятности probability, None - больше max_rounds), out_of_table
+    (доля выборок, где угол вне таблицы - считаются промахом) и ambiguous
+    (доля выборок с неоднозначной точкой падения - не учитываются).
+    """
+    rng = np.random.default_rng(seed)
+    # Общие для всех колец случайные выборки - сравнение колец не зашумлено
+    dist_offsets = rng.standard_normal(BIAS_SAMPLES) * dist_error
+    alt_offsets = rng.standard_normal(BIAS_SAMPLES) * alt_error
+    rounds_x, rounds_y = rng.standard_normal((2, ROUND_SAMPLES))
+
+    solution = solve_batch(mortar, shell, target_dist, mortar_alt, target_alt)
+    true_dists = target_dist + dist_offsets
+    true_mortar_alts = mortar_alt + alt_offsets
+    fired = np.arange(1, max_rounds + 1)
+
+    estimates = []
+    for i, rings in enumerate(solution['rings']):
+        if not solution['in_range'][i, 0]:
+            continue
+        elevation = solution['elevation'][i, 0]
+
+        # Куда ляжет центр серии при истинных дистанции и высоте
+        impact = range_from_elevation(mortar, shell, int(rings), elevation, true_mortar_alts, target_alt)
+        lowest, highest = elevation_bounds(mortar, shell, int(rings), true_mortar_alts, target_alt)
+        out_of_table = (elevation < lowest) | (elevation > highest)
+        ambiguous = np.isnan(impact) & ~out_of_table
+        counted = ~ambiguous
+        if counted.any():
+            # Вне таблицы промах бесконечный - ни один выстрел не попадает
+            miss = np.where(out_of_table, np.inf, impact - true_dists)[counted]
+        else:
+            # Точка падения прямого расчета - промах только из-за ошибки дистанции
+            miss = target_dist - true_dists
+
+        sigma = dispersion_sigma(solution['dispersion'][i])
+        single = single_shot(miss, radius, sigma, rounds_x, rounds_y)
+
+        # Вероятность хотя бы одного попадания для 1..max_rounds выстрелов
+        curve = (1 - (1 - single[:, None]) ** fired).mean(axis=0)
+        enough = np.nonzero(curve >= probability)[0]
+        estimates.append({
+            'rings': int(rings),
+            'dispersion': int(solution['dispersion'][i]),
+            'single': float(curve[0]),
+            'hit': float((1 - (1 - single) ** rounds).mean()),
+            'rounds_needed': int(fired[enough[0]]) if enough.size else None,
+            'out_of_table': float(out_of_table.mean()),
+            'ambiguous': float(ambiguous.mean()),
+        })
+    estimates.sort(key=lambda e: e['rings'])
+    return estimates
+
+
+def recommend_ring(estimates):
+    """Кольцо, которому нужно меньше всего выстрелов (при равенстве - с большей вероятностью)"""
+    candidates = [e for e in estimates if e['rounds_needed'] is not None]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda e: (e['rounds_needed'], -e['single'], e['dispersion']))
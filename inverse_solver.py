@@ -0,0 +1,143 @@
+"""Обратный расчет: от угла возвышения или времени полета к дистанции.
+
+Угол в таблицах убывает с ростом дистанции, а с поправкой на высоту
+остается кусочно-линейной функцией дистанции. Поэтому отрезок таблицы
+находится двоичным поиском (векторно сразу для всего массива запросов),
+а дистанция внутри отрезка - обратной линейной интерполяцией.
+
+При большой разнице высот угол может перестать убывать на части отрезков.
+Тогда для таких запросов отрезок ищется перебором: дистанция находится,
+если угол встречается в таблице только в одном месте, иначе - NaN.
+
+Время полета убывает с дистанцией нестрого: на горизонтальных участках
+таблицы дистанция по времени не определена (NaN).
+"""
+import numpy as np
+
+from ballistics import TABLES
+from batch_solver import table_columns
+
+
+def monotonic_altitude_range(mils, mils_per_100m):
+    """Диапазон разницы высот, при котором угол строго убывает с дистанцией.
+
+    На каждом отрезке изменение угла d_mils + dh * d_mpm / 100 должно быть
+    меньше нуля, что дает ограничение на dh сверху или снизу.
+    """
+    d_mils = np.diff(mils)
+    d_mpm = np.diff(mils_per_100m) / 100
+    limits = -d_mils / np.where(d_mpm == 0, 1, d_mpm)
+    upper = limits[d_mpm > 0]
+    lower = limits[d_mpm < 0]
+    return (lower.max() if lower.size else -np.inf,
+            upper.min() if upper.size else np.inf)
+
+
+def search_descending(dists, node_value, targets):
+    """Векторный двоичный поиск по невозрастающей кусочно-линейной функции.
+
+    node_value(k) возвращает значения в узлах k для каждого запроса.
+    Для значения, совпадающего на горизонтальном отрезке, возвращается
+    ближняя дистанция. Вне диапазона таблицы - NaN.
+    """
+    last = len(dists) - 1
+    first_value = node_value(np.zeros(targets.shape, dtype=np.intp))
+    last_value = node_value(np.full(targets.shape, last, dtype=np.intp))
+    in_range = (targets <= first_value) & (targets >= last_value)
+
+    # Ищем первый узел со значением не больше искомого
+    low = np.zeros(targets.shape, dtype=np.intp)
+    high = np.full(targets.shape, last, dtype=np.intp)
+    while np.any(low < high):
+        middle = (low + high) // 2
+        below = node_value(middle) <= targets
+        high = np.where(below, middle, high)
+        low = np.where(below, low, middle + 1)
+
+    previous = np.maximum(high - 1, 0)
+    high_value = node_value(high)
+    previous_value = node_value(previous)
+    span = np.where(high == 0, 1.0, high_value - previous_value)
+    ratio = np.where(high == 0, 0.0, (targets - previous_value) / span)
+    ranges = dists[previous] + (dists[high] - dists[previous]) * ratio
+    return np.where(in_range, ranges, np.nan)
+
+
+def search_segments(dists, values, targets):
+    """Перебор отрезков для немонотонной кусочно-линейной функции.
+
+    values - значения в узлах формы (запросы, узлы). Возвращает дистанцию,
+    если искомое значение лежит только на одном отрезке (или в общем узле
+    соседних отрезков), иначе NaN.
+    """
+    start, end = values[:, :-1], values[:, 1:]
+    targets = targets[:, None]
+    inside = (np.minimum(start, end) <= targets) & (targets <= np.maximum(start, end))
+    span = np.where(end == start, 1.0, end - start)
+    ratio = np.where(end == start, 0.0, (targets - start) / span)
+    candidates = np.where(inside, dists[:-1] + np.diff(dists) * ratio, np.nan)
+
+    found = inside.any(axis=1)
+    nearest = np.min(np.where(inside, candidates, np.inf), axis=1)
+    farthest = np.max(np.where(inside, candidates, -np.inf), axis=1)
+    return np.where(found & (farthest - nearest < 1e-6), nearest, np.nan)
+
+
+def range_from_elevation(mortar, shell, rings, elevations, mortar_alts=0, target_alts=0):
+    """Дистанции, соответствующие углам возвышения с учетом разницы высот.
+
+    Возвращает массив дистанций (NaN, если угол вне таблицы или при
+    большой разнице высот встречается в таблице на разных дистанциях).
+    """
+    table = TABLES[mortar][shell][rings]
+    dists, mils, _, mils_per_100m = table_columns(table)
+    elevations, mortar_alts, target_alts = np.broadcast_arrays(
+        np.asarray(elevations, dtype=np.float64),
+        np.asarray(mortar_alts, dtype=np.float64),
+        np.asarray(target_alts, dtype=np.float64),
+    )
+    altitude_difference = mortar_alts - target_alts
+
+    def node_value(k):
+        return mils[k] + altitude_difference * (mils_per_100m[k] / 100)
+
+    dists = dists.astype(np.float64)
+    ranges = search_descending(dists, node_value, elevations)
+    lower, upper = monotonic_altitude_range(mils, mils_per_100m)
+    irregular = ~((altitude_difference > lower) & (altitude_difference < upper))
+    if irregular.any():
+        # Угол убывает не на всей таблице - только эти запросы перебором отрезков
+        values = mils + altitude_difference[irregular][:, None] * (mils_per_100m / 100)
+        ranges = np.array(ranges, dtype=np.float64, ndmin=1)
+        ranges[np.atleast_1d(irregular)] = search_segments(dists, values, elevations[irregular])
+        ranges = ranges.reshape(elevations.shape)
+    return ranges
+
+
+def elevation_bounds(mortar, shell, rings, mortar_alts=0, target_alts=0):
+    """Наименьший и наибольший угол таблицы с учетом разницы высот.
+
+    Угол вне этих границ не достигается ни на какой дистанции таблицы,
+    в отличие от угла внутри границ, для которого range_from_elevation
+    может вернуть NaN только из-за неоднозначности.
+    """
+    table = TABLES[mortar][shell][rings]
+    _, mils, _, mils_per_100m = table_columns(table)
+    altitude_difference = np.subtract(mortar_alts, target_alts, dtype=np.float64)
+    values = mils + np.asarray(altitude_difference)[..., None] * (mils_per_100m / 100)
+    return values.min(axis=-1), values.max(axis=-1)
+
+
+def range_from_time(mortar, shell, rings, times):
+    """Дистанции, соответствующие времени полета.
+
+    Время в таблицах округлено до 0.1 с, поэтому на соседних дистанциях
+    оно бывает одинаковым. Для такого времени дистанция не определена -
+    возвращается NaN, как и вне таблицы.
+    """
+    table = TABLES[mortar][shell][rings]
+    dists, _, flight_times, _ = table_columns(table)
+    times = np.asarray(times, dtype=np.float64)
+    ranges = search_descending(dists.astype(np.float64), lambda k: flight_times[k], times)
+    plateaus = flight_times[:-1][flight_times[:-1] == flight_times[1:]]
+    return np.where(np.isin(times, plateaus), np.nan, ranges)
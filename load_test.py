@@ -0,0 +1,101 @@
+"""Нагрузочный тест сервиса расчетов.
+
+Открывает много одновременных соединений (корутин), каждая отправляет
+серию запросов /solve со случайными дистанциями. В конце выводит
+пропускную способность и задержки p50/p95/p99 на стороне клиента
+и статистику сервера из /stats.
+
+Пример:
+    python solver_server.py &
+    python load_test.py --clients 200 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from ballistics import TABLES
+from solver_server import percentile
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    """Отправляет запрос по открытому соединению и возвращает разобранный ответ"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, count, latencies, failures, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    mortar = rng.choice(list(TABLES))
+    shell = rng.choice(list(TABLES[mortar]))
+    try:
+        for _ in range(count):
+            payload = {
+                'mortar': mortar,
+                'shell': shell,
+                'distance': rng.randint(50, 3000),
+                'mortar_alt': rng.randint(0, 300),
+                'target_alt': rng.randint(0, 300),
+            }
+            started = time.perf_counter()
+            status, _ = await request(reader, writer, host, 'POST', '/solve', payload)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, clients, requests_per_client, seed):
+    rng = random.Random(seed)
+    latencies = []
+    failures = []
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, requests_per_client, latencies, failures, random.Random(rng.random()))
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Клиентов: {clients}, запросов: {len(latencies)}, ошибок: {len(failures)}")
+    print(f"Время: {elapsed:.2f} с, пропускная способность: {len(latencies) / elapsed:.0f} запросов/с")
+    print("Задержка клиента, мс: "
+          f"p50={percentile(latencies, 0.50) * 1000:.2f} "
+          f"p95={percentile(latencies, 0.95) * 1000:.2f} "
+          f"p99={percentile(latencies, 0.99) * 1000:.2f} "
+          f"max={latencies[-1] * 1000:.2f}")
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, host, 'GET', '/stats')
+    writer.close()
+    print(f"Сервер: {stats}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса расчетов")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=200, help="Количество одновременных соединений")
+    parser.add_argument('--requests', type=int, default=50, help="Запросов на одно соединение")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host, args.port, args.clients, args.requests, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Координаты на карте: дальность и азимут между огневой позицией и целями.
+
+Позиция задается координатами сетки или метрами:
+    "047123", "047 123"        - 6 знаков, квадрат 100 м
+    "04711234", "0471 1234"    - 8 знаков, 10 м
+    "0471212345"               - 10 знаков, 1 м
+    "4712.5 1234м", "4712 1234m" - метры (восток, север), суффикс м/m обязателен
+Координата сетки указывает на угол квадрата, поэтому берется его центр.
+
+Азимут - в тысячных от севера по часовой стрелке: у минометов НАТО
+6400 в круге, у советских (Варшавский договор) - 6000. range_azimuth
+принимает и массивы координат, так что список целей считается разом.
+"""
+import math
+import re
+
+import numpy as np
+
+MILS_NATO = 6400
+MILS_WARSAW_PACT = 6000
+
+GRID_DIGITS = (6, 8, 10)
+
+_SEPARATORS = re.compile(r'[\s,;/-]+')
+_METRE_SEPARATORS = re.compile(r'[\s;]+')
+
+
+def mils_in_circle(mortar):
+    """Тысячных в круге для миномета: 6000 у советских, 6400 у остальных"""
+    mortar_upper = mortar.upper()
+    if "2B14" in mortar_upper or "2Б14" in mortar_upper or "2B11" in mortar_upper:
+        return MILS_WARSAW_PACT
+    return MILS_NATO
+
+
+def parse_position(text):
+    """Позиция (восток, север) в метрах из координат сетки или метров"""
+    text = text.strip().lower()
+    if text.endswith(('м', 'm')):
+        parts = [part for part in _METRE_SEPARATORS.split(text[:-1]) if part]
+        if len(parts) != 2:
+            raise ValueError(f"Нужно два числа в метрах (восток и север): {text!r}")
+        east, north = (float(part.replace(',', '.')) for part in parts)
+        return east, north
+
+    digits = ''.join(part for part in _SEPARATORS.split(text) if part)
+    if not digits.isdigit() or len(digits) not in GRID_DIGITS:
+        raise ValueError(f"Координаты сетки - 6, 8 или 10 цифр: {text!r}")
+    half = len(digits) // 2
+    # Точность квадрата: 100 м для 6 знаков, 10 м для 8, 1 м для 10
+    square = 10 ** (5 - half)
+    east = int(digits[:half]) * square + square / 2
+    north = int(digits[half:]) * square + square / 2
+    return east, north
+
+
+def range_azimuth(from_east, from_north, to_east, to_north, circle=MILS_NATO):
+    """Дальность (м) и азимут (тысячные, 0..circle) - векторно для массивов"""
+    d_east = np.asarray(to_east, dtype=np.float64) - from_east
+    d_north = np.asarray(to_north, dtype=np.float64) - from_north
+    dists = np.hypot(d_east, d_north)
+    azimuths = np.arctan2(d_east, d_north) / (2 * math.pi) * circle % circle
+    return dists, azimuths
+
+
+def format_azimuth(azimuth, circle=MILS_NATO):
+    """Азимут в тысячных в записи через дефис (1234 -> 12-34)"""
+    whole = round(azimuth) % circle
+    return f"{whole // 100}-{whole % 100:02d}"
+
+
+def format_position(east, north, digits=8):
+    """Координаты сетки для позиции в метрах (квадрат, в который она попадает)"""
+    half = digits // 2
+    square = 10 ** (5 - half)
+    return f"{int(east // square):0{half}d} {int(north // square):0{half}d}"
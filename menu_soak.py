@@ -0,0 +1,133 @@
+"""Долгая проверка навигации по меню калькулятора.
+
+Прогоняет в одном процессе тысячи шагов ввода по кругу: новый расчет,
+смена снаряда, сравнение снарядов, "назад" из нового расчета, справка и
+статистика кэша. Ввод подставляется вместо input(), экраны выводятся в
+os.devnull, история пишется во временную папку. По ходу замеряется
+глубина стека в момент ввода и память (tracemalloc и RSS процесса), в
+конце проверяется, что стек не растет, а память после прогрева остается
+ровной.
+
+Пример:
+    python menu_soak.py --steps 20000
+"""
+import argparse
+import builtins
+import gc
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+CALCULATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ArmA-Reforger-calculator-RUv4.0.py')
+
+
+def load_calculator():
+    """Импортирует модуль калькулятора (имя файла не подходит для import)"""
+    spec = importlib.util.spec_from_file_location('mortar_calculator', CALCULATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def navigation_round(number, rng):
+    """Ввод одного круга по меню, заканчивается в главном меню"""
+    return [
+        '1', f"Цель {number}", '0', '1', '1', '1', str(rng.randint(100, 1500)), '0', '0',
+        '1', '2',        # смена снаряда
+        '3', '2',        # сравнение снарядов и возврат в меню
+        '1', 'назад',    # новый расчет и сразу назад
+        '3', '',         # справка
+        '6', '',         # статистика кэша
+    ]
+
+
+def rss_kb():
+    """Текущий RSS процесса в КБ (Linux), иначе None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def stack_depth():
+    frame, depth = sys._getframe(1), 0
+    while frame is not None:
+        frame, depth = frame.f_back, depth + 1
+    return depth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Долгая проверка навигации по меню калькулятора")
+    parser.add_argument('--steps', type=int, default=20000, help="Шагов ввода")
+    parser.add_argument('--samples', type=int, default=10, help="Замеров памяти за прогон")
+    parser.add_argument('--warmup', type=int, default=2000,
+                        help="Шагов прогрева: за это время заполняется LRU кэш решений")
+    parser.add_argument('--max-growth', type=int, default=256,
+                        help="Допустимый рост памяти Python после прогрева, КБ")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.steps <= args.warmup:
+        parser.error("--steps должно быть больше --warmup")
+
+    calculator_module = load_calculator()
+    rng = random.Random(args.seed)
+    round_length = len(navigation_round(0, rng))
+    rounds = max(2, args.steps // round_length)
+    script = [answer for number in range(rounds) for answer in navigation_round(number, rng)] + ['0']
+
+    every = max(1, len(script) // args.samples)
+    # Глубины стека в первом круге и во всем прогоне должны совпасть
+    first_depths, depths = set(), set()
+    samples = []
+    position = 0
+
+    def scripted_input(prompt=''):
+        nonlocal position
+        depth = stack_depth()
+        depths.add(depth)
+        if position < round_length:
+            first_depths.add(depth)
+        if position % every == 0:
+            gc.collect()
+            samples.append((position, tracemalloc.get_traced_memory()[0] // 1024, rss_kb()))
+        answer = script[position]
+        position += 1
+        return answer
+
+    original_cwd, original_input, original_stdout = os.getcwd(), builtins.input, sys.stdout
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w', encoding='utf-8') as devnull:
+        try:
+            os.chdir(directory)
+            builtins.input = scripted_input
+            sys.stdout = devnull
+            tracemalloc.start()
+            calculator_module.MortarCalculator(color=False).main()
+        finally:
+            tracemalloc.stop()
+            sys.stdout = original_stdout
+            builtins.input = original_input
+            os.chdir(original_cwd)
+        with open(os.path.join(directory, 'mortar_history.jsonl'), 'rb') as f:
+            saved = sum(1 for _ in f)
+
+    print(f"Шагов ввода: {position} из {len(script)}, глубина стека при вводе: {sorted(depths)}")
+    for step, traced, rss in samples:
+        rss_text = f", RSS {rss} КБ" if rss is not None else ""
+        print(f"   шаг {step:6d}: Python {traced} КБ{rss_text}")
+
+    # Память сравнивается с первым замером после прогрева таблиц и кэша решений
+    warm = [sample for sample in samples if sample[0] >= args.warmup] or samples[-1:]
+    growth = warm[-1][1] - warm[0][1]
+    print(f"Сохранено расчетов: {saved} из {2 * rounds}, рост памяти Python после прогрева: {growth} КБ")
+    failed = (position != len(script) or saved != 2 * rounds or depths != first_depths
+              or growth > args.max_growth)
+    print("Провал" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
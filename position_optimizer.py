@@ -0,0 +1,242 @@
+"""Подбор огневой позиции, с которой миномет достает больше всего целей.
+
+Кандидаты - явный список позиций или узлы сетки с шагом --step (по карте
+высот или вокруг целей). Для пачки кандидатов один раз считается матрица
+дистанций кандидат x цель и матрица разниц высот, затем по каждому кольцу
+снаряда векторно проверяется досягаемость: дистанция в пределах Dists
+(database.mortars), угол с поправкой на высоту в пределах углов таблицы.
+Для каждой пары берется кольцо с наименьшей стоимостью:
+    время полета + ALT_WEIGHT * |поправка высоты в тысячных|
+Позиции сравниваются по числу достижимых целей, при равенстве - по сумме
+стоимостей. Пачки кандидатов считаются параллельно в ProcessPoolExecutor.
+Для нескольких орудий позиции выбираются жадно: каждая следующая
+добавляет больше всего еще не накрытых целей.
+
+Цели и кандидаты - CSV как у batch_mode: name, target_pos, target_alt
+(и name, mortar_pos, mortar_alt для кандидатов); высоты можно не
+заполнять, если задана карта высот.
+
+Пример:
+    python position_optimizer.py --mortar M252 --shell "HE M821" targets.csv --heightmap everon.r16 --step 50 --guns 2
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import math
+import time
+
+import numpy as np
+
+from ballistics import TABLES
+from batch_solver import interpolate_columns, table_columns
+from heightmap import Heightmap
+from map_grid import format_position, parse_position
+
+# Секунд времени полета на тысячную поправки высоты
+ALT_WEIGHT = 0.1
+
+CHUNK = 1024
+STEP = 100
+
+
+def evaluate(mortar, shell, candidate_east, candidate_north, candidate_alts,
+             target_east, target_north, target_alts, alt_weight=ALT_WEIGHT):
+    """Стоимость (C, T) лучшего кольца для каждой пары кандидат-цель
+    (inf - не достает) и номера этих колец (-1 - не достает)"""
+    dist = np.hypot(candidate_east[:, None] - target_east[None, :],
+                    candidate_north[:, None] - target_north[None, :])
+    altitude_difference = candidate_alts[:, None] - target_alts[None, :]
+
+    best_cost = np.full(dist.shape, np.inf)
+    best_rings = np.full(dist.shape, -1, dtype=np.int8)
+    for table in TABLES[mortar][shell].values():
+        # Границы дальности кольца отсекают пары до интерполяции
+        near = (dist >= table.min_dist) & (dist <= table.max_dist)
+        if not near.any():
+            continue
+        dists, mils, times, mils_per_100m = table_columns(table)
+        _, ring_mils, ring_time, ring_mils_per_100m = interpolate_columns(
+            dists, dist[near], mils, times, mils_per_100m)
+        compensation = altitude_difference[near] * (ring_mils_per_100m / 100)
+        elevation = ring_mils + compensation
+        valid = (elevation >= mils.min()) & (elevation <= mils.max())
+
+        cost = np.full(dist.shape, np.inf)
+        cost[near] = np.where(valid, ring_time + alt_weight * np.abs(compensation), np.inf)
+        better = cost < best_cost
+        best_cost[better] = cost[better]
+        best_rings[better] = table.rings
+    return best_cost, best_rings
+
+
+# Цели передаются процессам один раз через initializer
+_targets = None
+
+
+def _init_worker(targets):
+    global _targets
+    _targets = targets
+
+
+def _evaluate_chunk(chunk):
+    east, north, alts = chunk
+    mortar, shell, target_east, target_north, target_alts, alt_weight = _targets
+    cost, rings = evaluate(mortar, shell, east, north, alts, target_east, target_north, target_alts, alt_weight)
+    # float32 вдвое уменьшает передачу между процессами и память на больших сетках
+    return cost.astype(np.float32), rings
+
+
+def score_candidates(mortar, shell, candidates, targets, alt_weight=ALT_WEIGHT, workers=None, chunk=CHUNK):
+    """Оценивает всех кандидатов: candidates и targets - тройки массивов
+    (восток, север, высота). Возвращает матрицы стоимости и колец (C, T)"""
+    east, north, alts = candidates
+    chunks = [(east[i:i + chunk], north[i:i + chunk], alts[i:i + chunk]) for i in range(0, east.size, chunk)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=((mortar, shell, *targets, alt_weight),)) as executor:
+        results = list(executor.map(_evaluate_chunk, chunks))
+    if not results:
+        return np.empty((0, targets[0].size)), np.empty((0, targets[0].size), dtype=np.int8)
+    return np.concatenate([cost for cost, _ in results]), np.concatenate([rings for _, rings in results])
+
+
+def rank(cost):
+    """Индексы кандидатов по убыванию числа целей, затем по возрастанию суммы стоимостей"""
+    reached = np.isfinite(cost)
+    counts = reached.sum(axis=1)
+    totals = np.where(reached, cost, 0).sum(axis=1)
+    return np.lexsort((totals, -counts)), counts, totals
+
+
+def choose_positions(cost, guns):
+    """Жадный выбор позиций для нескольких орудий: [(кандидат, новых целей)]"""
+    reached = np.isfinite(cost)
+    totals = np.where(reached, cost, 0).sum(axis=1)
+    covered = np.zeros(cost.shape[1], dtype=bool)
+    chosen = []
+    for _ in range(guns):
+        gains = (reached & ~covered).sum(axis=1)
+        best = np.lexsort((totals, -gains))[0]
+        if gains[best] == 0:
+            break
+        chosen.append((int(best), int(gains[best])))
+        covered |= reached[best]
+    return chosen
+
+
+def grid_candidates(west, south, east, north, step):
+    """Узлы сетки с шагом step в прямоугольнике"""
+    xs = np.arange(west, east + step / 2, step)
+    ys = np.arange(south, north + step / 2, step)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    return grid_x.ravel(), grid_y.ravel()
+
+
+def read_positions(path, position_field, altitude_field):
+    """Читает CSV с позициями: имена, восток, север, высоты (NaN - не указана)"""
+    names, east, north, alts = [], [], [], []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for number, row in enumerate(csv.DictReader(f), 1):
+            try:
+                x, y = parse_position(row[position_field])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}, строка {number}: {e}") from None
+            names.append(row.get('name') or f"#{number}")
+            east.append(x)
+            north.append(y)
+            alt = row.get(altitude_field)
+            alts.append(float(alt) if alt not in (None, '') else math.nan)
+    return names, np.array(east), np.array(north), np.array(alts)
+
+
+def fill_altitudes(alts, east, north, heightmap):
+    """Незаполненные высоты - с карты высот (без карты - 0)"""
+    missing = np.isnan(alts)
+    if missing.any():
+        alts = alts.copy()
+        alts[missing] = heightmap.altitude(east[missing], north[missing]) if heightmap is not None else 0
+    return alts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Подбор огневой позиции по списку целей")
+    parser.add_argument('targets', help="CSV с целями: name, target_pos, target_alt")
+    parser.add_argument('--mortar', required=True, choices=list(TABLES))
+    parser.add_argument('--shell', required=True)
+    parser.add_argument('--candidates', help="CSV с позициями-кандидатами: name, mortar_pos, mortar_alt")
+    parser.add_argument('--heightmap', metavar='PATH', help="Карта высот: высоты и область поиска")
+    parser.add_argument('--step', type=float, default=STEP, help="Шаг сетки кандидатов, м")
+    parser.add_argument('--guns', type=int, default=1, help="Сколько позиций выбрать")
+    parser.add_argument('--top', type=int, default=10, help="Сколько лучших позиций показать")
+    parser.add_argument('--alt-weight', type=float, default=ALT_WEIGHT,
+                        help="Секунд полета на тысячную поправки высоты в оценке")
+    parser.add_argument('--workers', type=int, help="Процессов (по умолчанию по числу ядер)")
+    args = parser.parse_args(argv)
+
+    if args.shell not in TABLES[args.mortar]:
+        parser.error(f"Неизвестный снаряд для {args.mortar}: {args.shell!r}")
+    heightmap = Heightmap.open(args.heightmap) if args.heightmap else None
+
+    target_names, target_east, target_north, target_alts = read_positions(args.targets, 'target_pos', 'target_alt')
+    target_alts = fill_altitudes(target_alts, target_east, target_north, heightmap)
+
+    if args.candidates:
+        names, east, north, alts = read_positions(args.candidates, 'mortar_pos', 'mortar_alt')
+    else:
+        if heightmap is not None:
+            west, south, map_east, map_north = heightmap.extent()
+        else:
+            # Вокруг целей на максимальную дальность снаряда
+            reach = max(table.max_dist for table in TABLES[args.mortar][args.shell].values())
+            # Координаты карты неотрицательные
+            west, south = max(target_east.min() - reach, 0), max(target_north.min() - reach, 0)
+            map_east, map_north = target_east.max() + reach, target_north.max() + reach
+        east, north = grid_candidates(west, south, map_east, map_north, args.step)
+        names = None
+        alts = np.full(east.shape, np.nan)
+    alts = fill_altitudes(alts, east, north, heightmap)
+    # Позиции вне карты высот отбрасываются
+    keep = ~np.isnan(alts)
+    east, north, alts = east[keep], north[keep], alts[keep]
+    if names is not None:
+        names = [name for name, kept in zip(names, keep) if kept]
+
+    started = time.perf_counter()
+    cost, rings = score_candidates(args.mortar, args.shell, (east, north, alts),
+                                   (target_east, target_north, target_alts), args.alt_weight, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"Кандидатов: {east.size}, целей: {target_east.size}, расчет: {elapsed:.2f} с")
+
+    def describe(i):
+        label = f"{names[i]} " if names is not None else ""
+        return f"{label}{format_position(east[i], north[i])} ({east[i]:.0f} {north[i]:.0f}м, высота {alts[i]:.0f}м)"
+
+    order, counts, totals = rank(cost)
+    print(f"\nЛучшие позиции ({args.mortar} - {args.shell}):")
+    for place, i in enumerate(order[:args.top], 1):
+        reached = np.isfinite(cost[i])
+        mean_cost = cost[i][reached].mean() if counts[i] else 0
+        print(f"{place:3d}. {describe(i)}: целей {counts[i]} из {target_east.size}, средняя оценка {mean_cost:.1f}")
+
+    if args.guns > 1:
+        print(f"\nПозиции для {args.guns} орудий:")
+        covered = np.zeros(target_east.size, dtype=bool)
+        for gun, (i, gain) in enumerate(choose_positions(cost, args.guns), 1):
+            covered |= np.isfinite(cost[i])
+            print(f"{gun:3d}. {describe(i)}: +{gain} целей")
+        print(f"Накрыто целей: {covered.sum()} из {target_east.size}")
+        missed = [name for name, hit in zip(target_names, covered) if not hit]
+        if missed:
+            print("Не достать: " + ", ".join(missed))
+
+    if order.size:
+        best = order[0]
+        print("\nКольца с лучшей позиции:")
+        for name, ring, value in zip(target_names, rings[best], cost[best]):
+            if ring >= 0:
+                print(f"   {name}: {ring} колец (оценка {value:.1f})")
+        if counts[best] < target_east.size:
+            print(f"   Не достает: {target_east.size - counts[best]} целей")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Буферизованный вывод экранов в консоль.
+
+Экран собирается в один буфер и выводится одной записью в stdout.
+Очистка делается escape-последовательностью вместо запуска cls/clear,
+а без цвета строки пишутся как есть, без кодов colorama.
+"""
+import sys
+
+import colorama
+from colorama import Style
+
+CLEAR_SCREEN = '\033[H\033[2J\033[3J'
+
+
+def enable_ansi():
+    """Включает поддержку escape-последовательностей в консоли Windows"""
+    if hasattr(colorama, 'just_fix_windows_console'):
+        colorama.just_fix_windows_console()
+    else:
+        # Старые версии colorama умеют это только через обертку потока
+        colorama.init()
+
+
+class Screen:
+    """Буфер одного экрана"""
+
+    def __init__(self, color=True, stream=None):
+        # На старых colorama enable_ansi подменяет sys.stdout оберткой - поток берется после
+        enable_ansi()
+        self.color = color
+        self.stream = stream if stream is not None else sys.stdout
+        self.buffer = []
+
+    def clear(self):
+        """Начинает новый экран: невыведенный текст отбрасывается"""
+        self.buffer = [CLEAR_SCREEN]
+
+    def write(self, color, text):
+        """Добавляет текст без перевода строки"""
+        if self.color and color:
+            self.buffer.append(color + text + Style.RESET_ALL)
+        else:
+            self.buffer.append(text)
+
+    def line(self, color='', text=''):
+        """Добавляет строку"""
+        self.write(color, text)
+        self.buffer.append('\n')
+
+    def flush(self):
+        """Выводит накопленный экран одной записью"""
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.buffer = []
+        self.stream.flush()
+
+    def prompt(self, color='', text=''):
+        """Выводит экран с приглашением и читает ввод пользователя"""
+        self.write(color, text)
+        self.flush()
+        return input()
@@ -0,0 +1,128 @@
+"""Огонь по площади: точки прицеливания для линейного, кругового и
+прямоугольного веера и их решение одним векторным проходом.
+
+Точки строятся на местности в метрах относительно центра цели (восток,
+север), затем переводятся в дальность и азимут от огневой позиции и
+решаются сразу все через batch_solver.solve_batch. Все орудия считаются
+стоящими в одной точке.
+
+Азимуты и направление оси веера - в тысячных (по умолчанию 6400 в круге).
+"""
+import math
+
+import numpy as np
+
+from batch_solver import solve_batch
+
+MILS_IN_CIRCLE = 6400
+
+SHEAF_TYPES = ('linear', 'circular', 'rectangular')
+
+# Угол между соседними точками кругового веера (золотой угол)
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+
+def linear_sheaf(count, length, attitude=0, circle=MILS_IN_CIRCLE):
+    """count точек, равномерно на отрезке длины length вдоль оси attitude"""
+    along = (np.arange(count) + 0.5) / count * length - length / 2
+    angle = attitude / circle * 2 * math.pi
+    return along * math.sin(angle), along * math.cos(angle)
+
+
+def circular_sheaf(count, radius):
+    """count точек, равномерно заполняющих круг радиуса radius (спираль Фогеля)"""
+    index = np.arange(count)
+    distance = radius * np.sqrt((index + 0.5) / count)
+    angle = index * GOLDEN_ANGLE
+    return distance * np.sin(angle), distance * np.cos(angle)
+
+
+def rectangular_sheaf(count, length, width, attitude=0, circle=MILS_IN_CIRCLE):
+    """Сетка из не менее чем count точек в прямоугольнике length x width.
+
+    Число рядов и колонок подбирается по соотношению сторон, лишние
+    клетки последнего ряда отбрасываются. length - вдоль оси attitude.
+    """
+    columns = max(1, min(count, round(math.sqrt(count * length / width)) if width > 0 else count))
+    rows = math.ceil(count / columns)
+    index = np.arange(count)
+    along = ((index % columns) + 0.5) / columns * length - length / 2
+    across = ((index // columns) + 0.5) / rows * width - width / 2
+    angle = attitude / circle * 2 * math.pi
+    east = along * math.sin(angle) + across * math.cos(angle)
+    north = along * math.cos(angle) - across * math.sin(angle)
+    return east, north
+
+
+def aim_points(sheaf_type, count, length=0, width=0, attitude=0, circle=MILS_IN_CIRCLE):
+    """Смещения точек прицеливания (восток, север) от центра цели.
+
+    Для кругового веера length - диаметр круга, width не используется.
+    """
+    if count < 1:
+        raise ValueError("Нужна хотя бы одна точка прицеливания")
+    if sheaf_type == 'linear':
+        return linear_sheaf(count, length, attitude, circle)
+    if sheaf_type == 'circular':
+        return circular_sheaf(count, length / 2)
+    if sheaf_type == 'rectangular':
+        return rectangular_sheaf(count, length, width, attitude, circle)
+    raise ValueError(f"Неизвестный тип веера: {sheaf_type!r}")
+
+
+def choose_ring(solution):
+    """Индекс кольца: с наименьшим разбросом среди достающих до всех точек,
+    иначе - достающее до наибольшего числа точек"""
+    covered = solution['in_range'].sum(axis=1)
+    full = np.nonzero(covered == solution['in_range'].shape[1])[0]
+    if full.size:
+        return int(full[np.argmin(solution['dispersion'][full])])
+    return int(np.argmax(covered))
+
+
+def solve_sheaf(mortar, shell, target_dist, azimuth, east, north, mortar_alt=0, target_alt=0,
+                rings=None, guns=1, circle=MILS_IN_CIRCLE):
+    """Решает все точки веера и возвращает (кольца, разброс, огневой список).
+
+    Огневой список - по одной строке на выстрел: номер выстрела, орудие и
+    залп (точки раздаются орудиям по кругу), смещение точки, дальность,
+    азимут и доворот от азимута на центр, угол возвышения и время полета
+    (None, если кольцо не достает). rings=None - кольцо выбирается
+    автоматически (choose_ring).
+    """
+    angle = azimuth / circle * 2 * math.pi
+    east = np.asarray(east, dtype=np.float64)
+    north = np.asarray(north, dtype=np.float64)
+    point_east = target_dist * math.sin(angle) + east
+    point_north = target_dist * math.cos(angle) + north
+
+    dists = np.hypot(point_east, point_north)
+    bearings = np.arctan2(point_east, point_north) / (2 * math.pi) * circle % circle
+    deflections = (bearings - azimuth + circle / 2) % circle - circle / 2
+
+    solution = solve_batch(mortar, shell, dists, mortar_alt, target_alt)
+    if rings is None:
+        ring_index = choose_ring(solution)
+    else:
+        matches = np.nonzero(solution['rings'] == rings)[0]
+        if not matches.size:
+            raise ValueError(f"Для {shell} нет таблицы на {rings} колец")
+        ring_index = int(matches[0])
+
+    in_range = solution['in_range'][ring_index]
+    # Недостающие точки - None в огневом списке
+    elevation = solution['elevation'][ring_index].astype(object)
+    time = solution['time'][ring_index].astype(object)
+    elevation[~in_range] = None
+    time[~in_range] = None
+
+    # Списки Python вместо поэлементного доступа к массивам - быстро и для больших вееров
+    columns = zip(east.tolist(), north.tolist(), dists.tolist(), bearings.tolist(),
+                  deflections.tolist(), elevation.tolist(), time.tolist())
+    firing_list = [
+        {'round': i + 1, 'gun': i % guns + 1, 'salvo': i // guns + 1,
+         'east': e, 'north': n, 'distance': d, 'azimuth': b, 'deflection': f,
+         'elevation': el, 'time': t}
+        for i, (e, n, d, b, f, el, t) in enumerate(columns)
+    ]
+    return int(solution['rings'][ring_index]), int(solution['dispersion'][ring_index]), firing_list
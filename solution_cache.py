@@ -0,0 +1,65 @@
+"""Ограниченный LRU кэш решений.
+
+Ключ - (миномет, снаряд, дистанция, разница высот): решение зависит только
+от разницы высот, поэтому одна запись обслуживает любые пары высот с той же
+разницей. Кэш привязан к объекту баллистических данных и очищается сам,
+если ему передали другие (перезагруженные) таблицы.
+"""
+from collections import OrderedDict
+
+# Количество решений в кэше по умолчанию
+CACHE_SIZE = 256
+
+
+class SolutionCache:
+    """LRU кэш результатов solve() со статистикой попаданий"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.source = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bind(self, source):
+        """Привязывает кэш к баллистическим данным, при смене данных очищает его"""
+        if source is not self.source:
+            self.entries.clear()
+            self.source = source
+
+    def get(self, key):
+        """Возвращает копию сохраненного решения или None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        results, errors = entry
+        # Копии, чтобы сортировка результатов на экране не меняла кэш
+        return [dict(result) for result in results], list(errors)
+
+    def put(self, key, solution):
+        if self.maxsize <= 0:
+            return
+        results, errors = solution
+        self.entries[key] = ([dict(result) for result in results], list(errors))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
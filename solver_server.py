@@ -0,0 +1,221 @@
+"""Локальный HTTP/JSON сервис расчетов на asyncio.
+
+Таблицы загружаются один раз при запуске, все игроки отряда обращаются
+к одному процессу. Используется только стандартная библиотека.
+
+Запросы:
+    POST /solve   {"mortar", "shell", "distance", "mortar_alt", "target_alt"}
+    POST /batch   {"missions": [{...}, ...]}
+    GET  /tables  минометы, снаряды и диапазоны дистанций по кольцам
+    GET  /stats   количество запросов и задержки p50/p95/p99
+
+Пример:
+    python solver_server.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from ballistics import TABLES
+from batch_mode import parse_mission, solve_mission
+
+# Сколько последних задержек хранится для расчета перцентилей
+LATENCY_WINDOW = 10000
+
+MAX_BODY_SIZE = 1024 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по уже отсортированному списку"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def table_metadata():
+    """Описание таблиц: диапазоны дистанций и разброс по кольцам"""
+    return {
+        mortar: {
+            shell: {
+                str(table.rings): {
+                    'dispersion': table.dispersion,
+                    'min_dist': table.min_dist,
+                    'max_dist': table.max_dist,
+                }
+                for table in shell_tables.values()
+            }
+            for shell, shell_tables in shells.items()
+        }
+        for mortar, shells in TABLES.items()
+    }
+
+
+class SolverServer:
+    """HTTP сервер с keep-alive и статистикой задержек"""
+
+    def __init__(self):
+        self.metadata = json.dumps(table_metadata(), ensure_ascii=False).encode('utf-8')
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.started = time.time()
+        self.routes = {
+            ('POST', '/solve'): self.handle_solve,
+            ('POST', '/batch'): self.handle_batch,
+            ('GET', '/tables'): self.handle_tables,
+            ('GET', '/stats'): self.handle_stats,
+        }
+
+    def solve_one(self, data):
+        if not isinstance(data, dict):
+            return {'error': "Задача должна быть JSON объектом"}
+        try:
+            mission = parse_mission(data)
+        except (KeyError, TypeError, ValueError) as e:
+            return {'error': str(e)}
+        results, errors = solve_mission(mission)
+        return {'results': results, 'errors': errors}
+
+    def handle_solve(self, body):
+        result = self.solve_one(self.parse_json(body))
+        if 'error' in result:
+            raise HttpError(400, result['error'])
+        return result
+
+    def handle_batch(self, body):
+        data = self.parse_json(body)
+        missions = data.get('missions') if isinstance(data, dict) else None
+        if not isinstance(missions, list):
+            raise HttpError(400, "Ожидается поле missions со списком задач")
+        for number, mission in enumerate(missions, 1):
+            if not isinstance(mission, dict):
+                raise HttpError(400, f"Задача {number} должна быть JSON объектом")
+        return {'solutions': [self.solve_one(mission) for mission in missions]}
+
+    def handle_tables(self, body):
+        return self.metadata
+
+    def handle_stats(self, body):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'uptime_s': round(time.time() - self.started, 1),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            },
+        }
+
+    def parse_json(self, body):
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise HttpError(400, "Некорректный JSON") from None
+
+    async def read_request(self, reader):
+        """Читает запрос, возвращает (метод, путь, заголовки, тело) или None при закрытии"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Некорректная строка запроса") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "Некорректный Content-Length") from None
+        if length < 0:
+            raise HttpError(400, "Некорректный Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    def respond(self, writer, status, payload, keep_alive):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HttpError as e:
+                    self.respond(writer, e.status, {'error': str(e)}, False)
+                    break
+                if request is None:
+                    break
+
+                started = time.perf_counter()
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                handler = self.routes.get((method, path))
+                try:
+                    if handler is None:
+                        known_path = any(route_path == path for _, route_path in self.routes)
+                        raise HttpError(405 if known_path else 404, f"{method} {path} не поддерживается")
+                    status, payload = 200, handler(body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    # Ошибка в расчете не должна обрывать соединение без ответа
+                    status, payload = 500, {'error': f"Внутренняя ошибка: {e}"}
+
+                self.respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        print(f"Сервис расчетов запущен на http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный HTTP сервис расчетов миномета")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес (по умолчанию только локальный)")
+    parser.add_argument('--port', type=int, default=8765, help="Порт")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(SolverServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nСервис остановлен")
+
+
+if __name__ == "__main__":
+    main()
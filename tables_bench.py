@@ -0,0 +1,165 @@
+"""Сравнение скомпилированных таблиц (ballistics.py) с исходным расчетом.
+
+Старый расчет: на каждое кольцо ключи дистанций сортируются заново
+(sorted(distances.keys())), а значения достаются шестью обращениями к
+вложенным словарям database.mortars. Новый: колонки RingTable
+отсортированы один раз при запуске, строка ищется bisect по array.
+
+Оба расчета решают один и тот же набор случайных задач по всем снарядам;
+результаты сверяются, выводятся время на задачу, пиковая память одного
+расчета (tracemalloc) и память самих таблиц.
+
+Пример:
+    python tables_bench.py --missions 20000
+"""
+import argparse
+import bisect
+import importlib
+import random
+import sys
+import time
+import tracemalloc
+
+from ballistics import compile_tables, solve
+import database
+from database import mortars
+
+
+def legacy_find_closest_keys(distances, target_dist):
+    """Поиск строк как в исходном калькуляторе: сортировка ключей на каждый вызов"""
+    sorted_dists = sorted(distances.keys())
+    if not sorted_dists:
+        return None, None, "Нет данных для расчета"
+    if target_dist < sorted_dists[0]:
+        min_dist = sorted_dists[0]
+        return None, None, f"Слишком малая дистанция. Минимальная: {min_dist}м (не хватает {min_dist - target_dist}м)"
+    if target_dist > sorted_dists[-1]:
+        max_dist = sorted_dists[-1]
+        return None, None, f"Слишком большая дистанция. Максимальная: {max_dist}м (превышение на {target_dist - max_dist}м)"
+    index = bisect.bisect_left(sorted_dists, target_dist)
+    if index == 0:
+        return sorted_dists[0], sorted_dists[0], None
+    return sorted_dists[index - 1], sorted_dists[index], None
+
+
+def legacy_interpolate(low_dist, high_dist, target_dist, low_value, high_value):
+    if low_dist == high_dist:
+        return low_value
+    ratio = (target_dist - low_dist) / (high_dist - low_dist)
+    return low_value + (high_value - low_value) * ratio
+
+
+def legacy_solve(shell_data, target_dist, mortar_alt, target_alt):
+    """Расчет по вложенным словарям, как в исходном perform_calculation"""
+    results = []
+    errors = []
+    for ring_amount in shell_data:
+        low_dist, high_dist, error_msg = legacy_find_closest_keys(shell_data[ring_amount]['Dists'], target_dist)
+        if error_msg:
+            errors.append(f"{ring_amount} колец: {error_msg}")
+            continue
+
+        dispersion = shell_data[ring_amount]['Dispersion']
+        low_mils = shell_data[ring_amount]['Dists'][low_dist][0]
+        high_mils = shell_data[ring_amount]['Dists'][high_dist][0]
+        low_time = shell_data[ring_amount]['Dists'][low_dist][1]
+        high_time = shell_data[ring_amount]['Dists'][high_dist][1]
+        low_mils_per_100m = shell_data[ring_amount]['Dists'][low_dist][2]
+        high_mils_per_100m = shell_data[ring_amount]['Dists'][high_dist][2]
+
+        mils = legacy_interpolate(low_dist, high_dist, target_dist, low_mils, high_mils)
+        flight_time = legacy_interpolate(low_dist, high_dist, target_dist, low_time, high_time)
+        mils_per_100m = legacy_interpolate(low_dist, high_dist, target_dist, low_mils_per_100m, high_mils_per_100m)
+        altitude_compensation = (mortar_alt - target_alt) * (mils_per_100m / 100)
+
+        results.append({
+            'rings': ring_amount,
+            'elevation': mils + altitude_compensation,
+            'time': flight_time,
+            'dispersion': dispersion,
+            'altitude_comp': altitude_compensation
+        })
+    return results, errors
+
+
+def sample_missions(count, seed):
+    rng = random.Random(seed)
+    pairs = [(mortar, shell) for mortar, shells in mortars.items() for shell in shells]
+    return [(*rng.choice(pairs), rng.randint(50, 3000), rng.randint(0, 300), rng.randint(0, 300))
+            for _ in range(count)]
+
+
+def table_memory(build):
+    """Байт памяти, выделенных при построении таблиц"""
+    tracemalloc.start()
+    tables = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tables
+    return memory
+
+
+def dict_memory():
+    """Память словарей database.mortars вместе со строками и числами таблиц.
+
+    copy.deepcopy(mortars) разделяет числа с оригиналом и недосчитывает,
+    поэтому модуль database выполняется заново - словари строятся так же,
+    как при запуске калькулятора.
+    """
+    return table_memory(lambda: importlib.reload(database).mortars)
+
+
+def peak_solve_memory(run, missions):
+    """Наибольшая пиковая память одного расчета, байт"""
+    peak = 0
+    tracemalloc.start()
+    for mission in missions:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        run(*mission)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скомпилированные таблицы против расчета по словарям")
+    parser.add_argument('--missions', type=int, default=20000, help="Задач в замере")
+    parser.add_argument('--repeat', type=int, default=3, help="Повторов (берется лучший)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    tables = compile_tables(mortars)
+    missions = sample_missions(args.missions, args.seed)
+
+    def run_legacy(mortar, shell, dist, mortar_alt, target_alt):
+        return legacy_solve(mortars[mortar][shell], dist, mortar_alt, target_alt)
+
+    def run_compiled(mortar, shell, dist, mortar_alt, target_alt):
+        return solve(tables[mortar][shell], dist, mortar_alt, target_alt)
+
+    mismatches = sum(run_legacy(*mission) != run_compiled(*mission) for mission in missions)
+
+    print(f"Задач: {len(missions)}, расхождений в результатах: {mismatches}")
+    print(f"{'Расчет':>10} {'мкс/задача':>11} {'Пик на задачу, Б':>17} {'Таблицы, КБ':>12}")
+    timings = {}
+    memory = {
+        'словари': dict_memory(),
+        'array': table_memory(lambda: compile_tables(mortars)),
+    }
+    for name, run in (('словари', run_legacy), ('array', run_compiled)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for mission in missions:
+                run(*mission)
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best / len(missions)
+        peak = peak_solve_memory(run, missions[:1000])
+        print(f"{name:>10} {timings[name] * 1e6:>11.2f} {peak:>17} {memory[name] / 1024:>12.1f}")
+    print(f"Ускорение: {timings['словари'] / timings['array']:.2f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
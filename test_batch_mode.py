@@ -0,0 +1,156 @@
+"""Проверка пакетного режима на некорректных задачах.
+
+Строки JSONL, которые не являются объектами, и числа NaN/бесконечность
+(строкой или литералом JSON) должны давать ошибку своей задачи в stderr,
+а не останавливать весь пакет; остальные задачи решаются, и в stdout
+попадает только корректный JSON. Задачи с координатами пересчитываются
+векторно для всей порции - результат сверяется с расчетом по одной точке,
+в том числе когда в той же порции есть ошибки и позиции вне карты высот.
+
+Пример:
+    python test_batch_mode.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from batch_mode import main, parse_mission, parse_missions, to_number
+from heightmap import Heightmap
+from map_grid import format_azimuth, parse_position, range_azimuth
+
+VALID = '{"mortar": "M252", "shell": "HE M821", "distance": 1200, "name": "Годная"}'
+
+# (строка JSONL, ожидаемый текст ошибки)
+BAD_LINES = (
+    ('[1, 2]', "должна быть объектом"),
+    ('5', "должна быть объектом"),
+    ('"x"', "должна быть объектом"),
+    ('null', "должна быть объектом"),
+    ('{"mortar": "M252", "shell": "HE M821", "distance": "nan"}', "Некорректное число"),
+    ('{"mortar": "M252", "shell": "HE M821", "distance": NaN}', "Некорректное число"),
+    ('{"mortar": "M252", "shell": "HE M821", "distance": "inf"}', "Некорректное число"),
+    ('{"mortar": "M252", "shell": "HE M821", "distance": 500, "mortar_alt": Infinity}', "Некорректное число"),
+    ('{"mortar": "M252", "shell": "HE M821", "distance": 500, "target_alt": "-inf"}', "Некорректное число"),
+)
+
+
+def strict_json(line):
+    """json.loads, который не принимает NaN и Infinity"""
+    def reject(constant):
+        raise ValueError(f"недопустимое значение JSON: {constant}")
+    return json.loads(line, parse_constant=reject)
+
+
+def check_functions(errors):
+    for value in ('nan', 'inf', '-Infinity', float('nan'), float('inf')):
+        try:
+            to_number(value)
+        except ValueError:
+            continue
+        errors.append(f"to_number({value!r}) не отклонил значение")
+    for value, expected in (('12', 12), ('12.5', 12.5), (7, 7), (2.5, 2.5)):
+        if to_number(value) != expected:
+            errors.append(f"to_number({value!r}) = {to_number(value)!r}, ожидалось {expected!r}")
+    for row in ([1, 2], 5, 'x', None):
+        try:
+            parse_mission(row)
+        except ValueError:
+            continue
+        errors.append(f"parse_mission({row!r}) не отклонил строку")
+
+
+# Задачи с координатами на карте высот 1 км x 1 км: (строка, ожидаемая ошибка или None)
+COORDINATE_ROWS = (
+    ({'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '100 100м', 'target_pos': '700 900м'}, None),
+    ({'mortar': '2B14', 'shell': 'HE O-832DU', 'mortar_pos': '0050 0050', 'target_pos': '0090 0010'}, None),
+    ({'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '12x', 'target_pos': '700 900м'}, "Координаты сетки"),
+    ({'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '100 100м', 'target_pos': '5000 900м'}, "вне карты высот"),
+    ({'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '100 100м', 'target_pos': '5000 900м',
+      'target_alt': 20}, None),
+    ({'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '100 100м', 'target_pos': '700 900м',
+      'distance': 640}, None),
+    ({'mortar': 'M252', 'shell': 'HE M821', 'distance': 'nan'}, "Некорректное число"),
+)
+
+
+def check_coordinates(errors, directory):
+    """Векторный пересчет координат порции сверяется с расчетом по одной точке"""
+    path = os.path.join(directory, 'slope.npy')
+    # Склон: высота растет на 1 м каждые 10 м на восток
+    np.save(path, np.tile(np.arange(101, dtype=np.uint16), (101, 1)))
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'cell_size': 10, 'north_up': False}, f)
+    heightmap = Heightmap.open(path)
+    rows = [row for row, _ in COORDINATE_ROWS]
+    for (row, expected), (mission, error) in zip(COORDINATE_ROWS, parse_missions(rows, heightmap)):
+        if expected is not None:
+            if error is None or expected not in str(error):
+                errors.append(f"{row}: ошибка {error!r}, ожидалась {expected!r}")
+            continue
+        if error is not None:
+            errors.append(f"{row}: неожиданная ошибка {error!r}")
+            continue
+        mortar_east, mortar_north = parse_position(row['mortar_pos'])
+        target_east, target_north = parse_position(row['target_pos'])
+        circle = 6000 if row['mortar'] == '2B14' else 6400
+        dist, bearing = range_azimuth(mortar_east, mortar_north, target_east, target_north, circle)
+        expected_mission = {
+            'distance': row.get('distance', round(float(dist))),
+            'azimuth': '0' if 'distance' in row else format_azimuth(float(bearing), circle),
+            'mortar_alt': heightmap.altitude_at(mortar_east, mortar_north),
+            'target_alt': row.get('target_alt', heightmap.altitude_at(target_east, target_north)),
+        }
+        for field, value in expected_mission.items():
+            if mission[field] != value:
+                errors.append(f"{row}: {field} = {mission[field]!r}, ожидалось {value!r}")
+        if parse_mission(row, heightmap) != mission:
+            errors.append(f"{row}: parse_mission и parse_missions расходятся")
+    heightmap.close()
+
+
+def check_batch(errors):
+    lines = [line for line, _ in BAD_LINES] + [VALID]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'missions.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = main([path, '--input-format', 'jsonl'])
+
+    if code != 1:
+        errors.append(f"код возврата {code}, ожидался 1")
+    reported = stderr.getvalue().splitlines()
+    for number, (line, expected) in enumerate(BAD_LINES, 1):
+        if not any(report.startswith(f"Задача {number}:") and expected in report for report in reported):
+            errors.append(f"задача {number} ({line}): нет ошибки {expected!r}")
+
+    records = []
+    for line in stdout.getvalue().splitlines():
+        try:
+            records.append(strict_json(line))
+        except ValueError as e:
+            errors.append(f"некорректный JSON в выводе: {e}: {line}")
+    if not records or any(record['name'] != "Годная" for record in records):
+        errors.append(f"решения корректной задачи: {len(records)} строк, ожидались только решения 'Годная'")
+
+
+def main_test():
+    errors = []
+    check_functions(errors)
+    check_batch(errors)
+    with tempfile.TemporaryDirectory() as directory:
+        check_coordinates(errors, directory)
+    print(f"Пакетный режим: ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_test())
@@ -0,0 +1,120 @@
+"""Проверка рельефа на линии стрельбы, в том числе вне карты высот.
+
+На временной карте высот (ровное поле с высоким хребтом посередине) проверяются:
+линия целиком на карте (хребет закрывает пологие траектории), линия,
+частично уходящая за край карты (проверяются только точки на карте), и
+линия целиком вне карты (кольца помечаются как непроверенные). Для
+последних двух случаев дополнительно выводится экран результатов
+калькулятора - он не должен падать, а расчет должен попасть в историю.
+
+Пример:
+    python test_clearance.py
+"""
+import builtins
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from ballistics import TABLES, solve
+from clearance import check_clearance
+from heightmap import Heightmap
+from menu_soak import load_calculator
+
+MORTAR, SHELL = 'M252', 'HE M821'
+CELL = 10
+SIDE = 201  # 2 км x 2 км
+
+
+def make_heightmap(directory):
+    """Поле на высоте 100 м с хребтом 2000 м вдоль линии север-юг на востоке 1000 м"""
+    grid = np.full((SIDE, SIDE), 100, dtype=np.uint16)
+    grid[:, 98:103] = 2000
+    path = os.path.join(directory, 'ridge.npy')
+    np.save(path, grid)
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'cell_size': CELL}, f)
+    return path
+
+
+def check(errors, condition, message):
+    if not condition:
+        errors.append(message)
+
+
+def check_lines(heightmap):
+    errors = []
+    results, _ = solve(TABLES[MORTAR][SHELL], 800, 100, 100)
+
+    # Целиком на карте, поперек хребта
+    on_map = check_clearance(heightmap, (600, 1000), (1400, 1000), 100, 100, results)
+    check(errors, all(c['off_map'] == 0 and c['clearance'] is not None for c in on_map),
+          "линия на карте: есть непроверенные точки")
+    check(errors, any(c['masked'] for c in on_map), "линия на карте: хребет ничего не закрыл")
+
+    # Цель за восточным краем карты: часть точек вне карты
+    partly = check_clearance(heightmap, (1600, 1000), (2400, 1000), 100, 100, results)
+    check(errors, all(0 < c['off_map'] < 1 for c in partly), "частично вне карты: неверная доля off_map")
+    check(errors, all(c['clearance'] is not None and np.isfinite(c['clearance'])
+                      and np.isfinite(c['obstacle']) and c['obstacle'] <= 400 for c in partly),
+          "частично вне карты: запас или место препятствия не на карте")
+
+    # Вся линия вне карты
+    outside = check_clearance(heightmap, (3000, 3000), (3800, 3000), 100, 100, results)
+    check(errors, all(c['off_map'] == 1 and c['clearance'] is None and c['obstacle'] is None
+                      and not c['masked'] for c in outside),
+          "целиком вне карты: кольца должны быть непроверенными")
+    return errors
+
+
+def check_screen(heightmap_path, directory):
+    """Экран результатов с линией, уходящей за карту, и сохранение в историю"""
+    calculator_module = load_calculator()
+    script = iter(['1', 'За краем', '0', '1', '1', '2', '1600 1000м', '2400 1000м', '100', '100',
+                   '2', '1', 'Вне карты', '0', '1', '1', '2', '3000 3000м', '3800 3000м', '100', '100',
+                   '0'])
+    original_cwd, original_input, original_stdout = os.getcwd(), builtins.input, sys.stdout
+    screen_text = []
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        try:
+            os.chdir(directory)
+            builtins.input = lambda prompt='': next(script)
+            sys.stdout = devnull
+            calculator = calculator_module.MortarCalculator(color=False, heightmap=heightmap_path)
+            calculator.screen.stream = type('Capture', (), {'write': lambda self, text: screen_text.append(text),
+                                                              'flush': lambda self: None})()
+            calculator.main()
+        finally:
+            sys.stdout = original_stdout
+            builtins.input = original_input
+            os.chdir(original_cwd)
+
+    errors = []
+    text = ''.join(screen_text)
+    with open(os.path.join(directory, 'mortar_history.jsonl'), 'rb') as f:
+        saved = sum(1 for _ in f)
+    check(errors, "Ошибка" not in text, "экран результатов: ошибка расчета")
+    check(errors, "часть линии вне карты высот" in text, "экран результатов: нет пометки о части линии вне карты")
+    check(errors, "линия стрельбы вне карты высот" in text, "экран результатов: нет пометки о линии вне карты")
+    check(errors, saved == 2, f"в историю сохранено {saved} расчетов из 2")
+    return errors
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_heightmap(directory)
+        heightmap = Heightmap.open(path)
+        errors = check_lines(heightmap)
+        heightmap.close()
+        errors += check_screen(path, directory)
+
+    print(f"Проверка рельефа: ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
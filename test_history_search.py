@@ -0,0 +1,120 @@
+"""Проверка поиска по названию цели в истории SQLite.
+
+Поиск подстроки без учета регистра (в том числе кириллицы) должен идти
+через индекс триграмм history_names, а не перебором таблицы: это
+проверяется по EXPLAIN QUERY PLAN и по времени на большой истории.
+Результаты сверяются с поиском по журналу (history_store.matches), в том
+числе для коротких запросов, кавычек и базы старой версии без колонки
+target_name_lower.
+
+Пример:
+    python test_history_search.py --records 150000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from history_bench import sample_record
+from history_records import dump_record
+from history_store import SqliteHistory, matches
+
+QUERIES = ('цель 42', 'ЦЕЛЬ 4', 'Ль 49', 'л', '', 'нет такой', 'цель "1', '*', 'OR')
+
+
+def named_record(i):
+    record = sample_record(i, 2)
+    if i % 1000 == 7:
+        record['target_name'] = f'Высота "Цель {i}"'
+    return record
+
+
+def open_store(directory, name):
+    store = SqliteHistory(os.path.join(directory, name), os.path.join(directory, 'none.jsonl'),
+                          os.path.join(directory, 'none.json'))
+    store.load()
+    return store
+
+
+def check_results(store, records, errors, label):
+    for query in QUERIES:
+        found = [record['timestamp'] + record['target_name'] for record in store.search(limit=10 ** 9, name=query)]
+        expected = [record['timestamp'] + record['target_name'] for record in reversed(records)
+                    if matches(record, name=query)]
+        if found != expected:
+            errors.append(f"{label}: поиск {query!r} нашел {len(found)} записей, ожидалось {len(expected)}")
+
+
+def make_old_database(path, records):
+    """База в схеме до колонки target_name_lower и индекса названий"""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("""CREATE TABLE history (id INTEGER PRIMARY KEY, timestamp TEXT, target_name TEXT,
+                        mortar TEXT, shell TEXT, distance INTEGER, mortar_alt INTEGER, target_alt INTEGER,
+                        azimuth TEXT, data TEXT NOT NULL)""")
+        conn.executemany(
+            "INSERT INTO history VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (tuple(record.get(column) for column in SqliteHistory.COLUMNS) + (dump_record(record).rstrip('\n'),)
+             for record in records))
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка поиска по названию в истории SQLite")
+    parser.add_argument('--records', type=int, default=150000, help="Записей в большой истории")
+    parser.add_argument('--max-ms', type=float, default=20, help="Допустимое время поиска по названию, мс")
+    args = parser.parse_args(argv)
+
+    errors = []
+    small = [named_record(i) for i in range(3000)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(directory, 'small.db')
+        if not store.names_index:
+            print("SQLite без FTS5/trigram: поиск по названию перебором, проверяются только результаты")
+        store.import_records(small)
+        check_results(store, small, errors, "новая база")
+        store.clear()
+        if store.search(name='цель'):
+            errors.append("после очистки поиск по названию что-то находит")
+        store.close()
+
+        make_old_database(os.path.join(directory, 'old.db'), small)
+        store = open_store(directory, 'old.db')
+        check_results(store, small, errors, "база старой версии")
+        store.close()
+
+        store = open_store(directory, 'large.db')
+        started = time.perf_counter()
+        store.import_records(named_record(i) for i in range(args.records))
+        print(f"Импорт {args.records} записей: {time.perf_counter() - started:.1f} с")
+        if store.names_index:
+            plan = ' | '.join(row[-1] for row in store.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT data FROM history WHERE id IN "
+                "(SELECT rowid FROM history_names WHERE history_names MATCH ?) ORDER BY id DESC LIMIT 50",
+                ('"высота"',)))
+            print(f"План запроса: {plan}")
+            if 'history_names VIRTUAL TABLE INDEX 0:M' not in plan or 'SCAN history ' in plan + ' ':
+                errors.append(f"поиск по названию не использует индекс: {plan}")
+
+            best = float('inf')
+            for _ in range(5):
+                started = time.perf_counter()
+                found = store.search(name='ВЫСОТА')
+                best = min(best, time.perf_counter() - started)
+            print(f"Поиск 'ВЫСОТА': {len(found)} записей за {best * 1000:.2f} мс")
+            if best * 1000 > args.max_ms:
+                errors.append(f"поиск по названию {best * 1000:.1f} мс, допустимо {args.max_ms} мс")
+            if len(found) != min(50, len(range(7, args.records, 1000))):
+                errors.append(f"поиск 'ВЫСОТА' нашел {len(found)} записей")
+        store.close()
+
+    print(f"Поиск по названию: ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
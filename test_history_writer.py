@@ -0,0 +1,94 @@
+"""Проверка фоновой записи журнала истории при ошибках.
+
+В очередь фоновой записи подается строка, на которой запись падает не с
+OSError (строка не bytes), и отдельно - ошибка ротации после записи.
+flush() должен пробросить ошибку, а не зависнуть; после нее поток записи
+продолжает работать: новые записи сохраняются, count() и close() не
+зависают. Каждый вызов выполняется в отдельном потоке с таймаутом.
+
+Пример:
+    python test_history_writer.py
+"""
+import os
+import sys
+import tempfile
+import threading
+
+from history_bench import sample_record
+from history_store import HistoryJournal
+
+TIMEOUT = 5
+
+
+def call(function):
+    """(результат, ошибка) вызова, ошибка 'завис' - если не завершился за TIMEOUT"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = function()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    if thread.is_alive():
+        return None, 'завис'
+    return outcome.get('result'), outcome.get('error')
+
+
+def failing_rotate(journal):
+    """Ротация, которая один раз падает с ValueError"""
+    rotate = journal.maybe_rotate
+
+    def run():
+        journal.maybe_rotate = rotate
+        raise ValueError("сбой ротации")
+    return run
+
+
+def check(errors, label, journal, inject, expected_error, expected_count):
+    journal.append(sample_record(1, 2))
+    call(journal.flush)
+    inject()
+    _, error = call(journal.flush)
+    if not isinstance(error, expected_error):
+        errors.append(f"{label}: flush() вернул {error!r}, ожидалась {expected_error.__name__}")
+
+    journal.append(sample_record(2, 2))
+    count, error = call(journal.count)
+    if error is not None:
+        errors.append(f"{label}: count() после ошибки: {error!r}")
+    elif count != expected_count:
+        errors.append(f"{label}: сохранено {count} записей, ожидалось {expected_count}")
+    return count or 0
+
+
+def main():
+    errors = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.jsonl')
+        journal = HistoryJournal(path, os.path.join(directory, 'none.json'))
+        journal.load()
+
+        saved = check(errors, "строка не bytes", journal, lambda: journal._submit(object()), TypeError, 2)
+
+        def inject_rotate():
+            journal.maybe_rotate = failing_rotate(journal)
+            journal.append(sample_record(3, 2))
+        # Запись с упавшей ротацией уже на диске - она тоже учитывается
+        check(errors, "ошибка ротации", journal, inject_rotate, ValueError, saved + 3)
+
+        _, error = call(journal.close)
+        if error is not None:
+            errors.append(f"close(): {error!r}")
+
+    print(f"Фоновая запись при ошибках: ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""Проверка вероятности попадания у края таблицы и при большой разнице высот.
+
+Для каждой выборки систематической ошибки точка падения находится перебором
+по плотной сетке прямого расчета (batch_solver.solve_batch): если угол не
+встречается ни на одной дистанции кольца, выборка - промах; если на
+нескольких - выборка не учитывается. Попадания выстрелов считаются прямо
+по расстоянию до центра цели. Результат hit_probabilities должен совпасть
+с этим перебором, а доли out_of_table и ambiguous - с его подсчетом.
+
+Пример:
+    python test_hit_probability.py
+"""
+import sys
+
+import numpy as np
+
+from ballistics import TABLES
+from batch_solver import solve_batch
+from hit_probability import BIAS_SAMPLES, ROUND_SAMPLES, SEED, dispersion_sigma, hit_probabilities
+
+GRID_STEP = 0.25
+TOLERANCE = 1e-3
+
+# (миномет, снаряд, дистанция, высота миномета, высота цели, радиус, ошибка дистанции, ошибка высоты)
+CASES = (
+    ('M252', 'HE M821', 895, 100, 100, 25, 0, 100),   # у дальнего края кольца 1
+    ('M252', 'HE M821', 895, 100, 100, 25, 10, 50),
+    ('M252', 'HE M821', 200, 300, 0, 25, 10, 50),     # угол неоднозначен на части колец
+    ('M252', 'HE M821', 1200, 0, 0, 25, 10, 20),
+)
+
+
+def impacts(mortar, shell, rings, elevation, altitude_difference):
+    """Все дистанции кольца, на которых угол равен elevation"""
+    table = TABLES[mortar][shell][rings]
+    grid = np.arange(table.min_dist, table.max_dist + GRID_STEP, GRID_STEP)
+    values = solve_batch(mortar, shell, grid, altitude_difference, 0)
+    row = list(values['rings']).index(rings)
+    delta = values['elevation'][row] - elevation
+    crossing = np.nonzero(np.sign(delta[:-1]) * np.sign(delta[1:]) <= 0)[0]
+    span = delta[crossing] - delta[crossing + 1]
+    ratio = np.divide(delta[crossing], span, out=np.zeros(crossing.size), where=span != 0)
+    positions = np.sort(grid[crossing] + GRID_STEP * ratio)
+    # Угол в узле сетки дает пересечение на двух соседних отрезках
+    return positions[np.r_[True, np.diff(positions) > 1e-6]] if positions.size else positions
+
+
+def reference(mortar, shell, target_dist, mortar_alt, target_alt, radius, dist_error, alt_error):
+    """Вероятности перебором: {кольца: (hit, out_of_table, ambiguous)}"""
+    rng = np.random.default_rng(SEED)
+    dist_offsets = rng.standard_normal(BIAS_SAMPLES) * dist_error
+    alt_offsets = rng.standard_normal(BIAS_SAMPLES) * alt_error
+    rounds_x, rounds_y = rng.standard_normal((2, ROUND_SAMPLES))
+
+    solution = solve_batch(mortar, shell, target_dist, mortar_alt, target_alt)
+    expected = {}
+    for i, rings in enumerate(solution['rings']):
+        if not solution['in_range'][i, 0]:
+            continue
+        rings = int(rings)
+        sigma = dispersion_sigma(solution['dispersion'][i])
+        singles, outside, unclear = [], 0, 0
+        for dist_offset, alt_offset in zip(dist_offsets, alt_offsets):
+            found = impacts(mortar, shell, rings, solution['elevation'][i, 0],
+                            mortar_alt + alt_offset - target_alt)
+            if found.size == 0:
+                outside += 1
+                singles.append(0.0)
+            elif found.size > 1:
+                unclear += 1
+            else:
+                miss = found[0] - (target_dist + dist_offset)
+                singles.append(np.mean(np.hypot(miss + rounds_x * sigma, rounds_y * sigma) <= radius))
+        hit = float(np.mean(singles)) if singles else None
+        expected[rings] = (hit, outside / BIAS_SAMPLES, unclear / BIAS_SAMPLES)
+    return expected
+
+
+def main():
+    errors = []
+    for mortar, shell, dist, mortar_alt, target_alt, radius, dist_error, alt_error in CASES:
+        case = f"{mortar} {shell} {dist}м, высоты {mortar_alt}/{target_alt}, ±{dist_error}м/±{alt_error}м"
+        estimates = hit_probabilities(mortar, shell, dist, mortar_alt, target_alt, radius,
+                                      dist_error=dist_error, alt_error=alt_error)
+        expected = reference(mortar, shell, dist, mortar_alt, target_alt, radius, dist_error, alt_error)
+        if sorted(expected) != [e['rings'] for e in estimates]:
+            errors.append(f"{case}: кольца {[e['rings'] for e in estimates]}, ожидались {sorted(expected)}")
+            continue
+        for estimate in estimates:
+            hit, outside, unclear = expected[estimate['rings']]
+            label = f"{case}, кольца {estimate['rings']}"
+            print(f"{label}: попадание {estimate['hit']:.3f}, вне таблицы {estimate['out_of_table']:.3f}, "
+                  f"неоднозначно {estimate['ambiguous']:.3f}")
+            if abs(estimate['out_of_table'] - outside) > 1e-9 or abs(estimate['ambiguous'] - unclear) > 1e-9:
+                errors.append(f"{label}: доли {estimate['out_of_table']:.4f}/{estimate['ambiguous']:.4f}, "
+                              f"перебором {outside:.4f}/{unclear:.4f}")
+            if hit is not None and abs(estimate['hit'] - hit) > TOLERANCE:
+                errors.append(f"{label}: попадание {estimate['hit']:.4f}, перебором {hit:.4f}")
+            if estimate['hit'] > 1 - estimate['out_of_table'] + 1e-9:
+                errors.append(f"{label}: выстрелы за таблицу не посчитаны промахом")
+
+    print(f"Вероятность попадания: случаев {len(CASES)}, ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
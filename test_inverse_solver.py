@@ -0,0 +1,141 @@
+"""Проверка обратного расчета: прямой расчет -> угол -> дистанция.
+
+Для каждого миномета, снаряда и кольца угол возвышения считается прямым
+расчетом (batch_solver.solve_batch) на сетке дистанций и разниц высот,
+затем range_from_elevation должен вернуть исходную дистанцию. NaN
+допускается только там, где угол действительно встречается в таблице еще
+на одной дистанции (проверяется перебором по плотной сетке дистанций).
+Отдельно проверяются известные случаи с разницей высот. Также проверяется
+range_from_time: NaN допускается только для времени на горизонтальном
+участке таблицы (время округлено до 0.1 с).
+
+Пример:
+    python test_inverse_solver.py --points 200 --altitudes -300 -150 0 150 300
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from ballistics import TABLES
+from batch_solver import solve_batch, table_columns
+from inverse_solver import range_from_elevation, range_from_time
+
+TOLERANCE = 1e-6
+
+# (миномет, снаряд, кольца, дистанция, высота миномета, высота цели)
+CASES = (
+    ('M252', 'HE M821', 1, 500, 150, 0),
+)
+
+
+def ambiguous(mortar, shell, rings, elevation, dist, altitude_difference, column='elevation'):
+    """Встречается ли угол (или время полета, column='time') еще на одной дистанции кольца.
+
+    Узлы таблиц - на целых метрах, поэтому на сетке с шагом 0.25 м угол
+    линеен между соседними точками и пересечения находятся точно.
+    """
+    table = TABLES[mortar][shell][rings]
+    grid = np.arange(table.min_dist, table.max_dist + 0.25, 0.25)
+    values = solve_batch(mortar, shell, grid, altitude_difference, 0)
+    row = list(values['rings']).index(rings)
+    delta = values[column][row] - elevation
+    crossing = np.nonzero(np.sign(delta[:-1]) * np.sign(delta[1:]) <= 0)[0]
+    span = delta[crossing] - delta[crossing + 1]
+    ratio = np.divide(delta[crossing], span, out=np.zeros(crossing.size), where=span != 0)
+    positions = grid[crossing] + 0.25 * ratio
+    return np.any(np.abs(positions - dist) > 1e-3)
+
+
+def check_ring(mortar, shell, rings, points, altitudes):
+    """Возвращает (проверено, неоднозначных, ошибки) для одного кольца"""
+    table = TABLES[mortar][shell][rings]
+    dists = np.linspace(table.min_dist, table.max_dist, points)
+    checked = skipped = 0
+    errors = []
+    for altitude_difference in altitudes:
+        solution = solve_batch(mortar, shell, dists, altitude_difference, 0)
+        row = list(solution['rings']).index(rings)
+        elevations = solution['elevation'][row]
+        ranges = range_from_elevation(mortar, shell, rings, elevations, altitude_difference, 0)
+        for dist, elevation, found in zip(dists, elevations, ranges):
+            checked += 1
+            if np.isnan(found):
+                if ambiguous(mortar, shell, rings, elevation, dist, altitude_difference):
+                    skipped += 1
+                    continue
+                errors.append(f"{mortar} {shell} {rings} колец, {dist:.1f}м, dh={altitude_difference}: "
+                              f"угол {elevation:.2f} -> NaN")
+            elif abs(found - dist) > TOLERANCE:
+                errors.append(f"{mortar} {shell} {rings} колец, {dist:.1f}м, dh={altitude_difference}: "
+                              f"угол {elevation:.2f} -> {found:.3f}м")
+    return checked, skipped, errors
+
+
+def check_times(mortar, shell, rings, points):
+    """Время полета -> дистанция: (проверено, на горизонтальных участках, ошибки)"""
+    table = TABLES[mortar][shell][rings]
+    dists = np.linspace(table.min_dist, table.max_dist, points)
+    # Узлы таблицы попадают на горизонтальные участки времени, если они есть
+    dists = np.union1d(dists, table_columns(table)[0])
+    solution = solve_batch(mortar, shell, dists)
+    times = solution['time'][list(solution['rings']).index(rings)]
+    ranges = range_from_time(mortar, shell, rings, times)
+    skipped = 0
+    errors = []
+    for dist, time, found in zip(dists, times, ranges):
+        plateau = ambiguous(mortar, shell, rings, time, dist, 0, column='time')
+        if np.isnan(found) and plateau:
+            skipped += 1
+        elif np.isnan(found) or plateau or abs(found - dist) > TOLERANCE:
+            errors.append(f"{mortar} {shell} {rings} колец, {dist:.1f}м: время {time:.2f} -> {found:.3f}м")
+    return dists.size, skipped, errors
+
+
+def check_cases():
+    errors = []
+    for mortar, shell, rings, dist, mortar_alt, target_alt in CASES:
+        solution = solve_batch(mortar, shell, dist, mortar_alt, target_alt)
+        row = list(solution['rings']).index(rings)
+        elevation = solution['elevation'][row, 0]
+        found = float(range_from_elevation(mortar, shell, rings, elevation, mortar_alt, target_alt))
+        if not abs(found - dist) <= TOLERANCE:
+            errors.append(f"{mortar} {shell} {rings} колец, {dist}м, высоты {mortar_alt}/{target_alt}: "
+                          f"угол {elevation:.2f} -> {found}")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка обратного расчета по всем таблицам")
+    parser.add_argument('--points', type=int, default=200, help="Дистанций на кольцо")
+    parser.add_argument('--altitudes', type=float, nargs='+', default=[-300, -150, 0, 150, 300],
+                        help="Разницы высот миномет - цель, м")
+    args = parser.parse_args(argv)
+
+    checked = skipped = 0
+    time_checked = time_skipped = 0
+    errors = check_cases()
+    for mortar, shells in TABLES.items():
+        for shell, tables in shells.items():
+            for rings in tables:
+                ring_checked, ring_skipped, ring_errors = check_ring(mortar, shell, rings, args.points, args.altitudes)
+                checked += ring_checked
+                skipped += ring_skipped
+                errors += ring_errors
+                ring_checked, ring_skipped, ring_errors = check_times(mortar, shell, rings, args.points)
+                time_checked += ring_checked
+                time_skipped += ring_skipped
+                errors += ring_errors
+
+    print(f"Проверено углов: {checked}, неоднозначных (NaN по делу): {skipped}")
+    print(f"Проверено времен полета: {time_checked}, на горизонтальных участках (NaN по делу): {time_skipped}")
+    print(f"Ошибок: {len(errors)}")
+    for error in errors[:20]:
+        print("   " + error)
+    if len(errors) > 20:
+        print(f"   ... и еще {len(errors) - 20}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
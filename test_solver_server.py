@@ -0,0 +1,124 @@
+"""Проверка сервиса расчетов на некорректных запросах.
+
+Запускает SolverServer на свободном порту в фоновом потоке и отправляет
+задачи с полями неверных типов и с NaN/бесконечностью: /solve должен
+отвечать 400 с описанием ошибки, /batch - ошибкой в записи этой задачи,
+соединение не должно обрываться, ответы - корректный JSON, а все запросы
+должны попасть в /stats.
+
+Пример:
+    python test_solver_server.py
+"""
+import asyncio
+import http.client
+import json
+import socket
+import sys
+import threading
+import time
+
+from solver_server import SolverServer
+
+BASE = {'mortar': 'M252', 'shell': 'HE M821', 'distance': 1200}
+
+BAD_MISSIONS = (
+    {**BASE, 'mortar': 123},
+    {**BASE, 'shell': ['HE M821']},
+    {**BASE, 'name': {'x': 1}},
+    {'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': 1234, 'target_pos': '064064'},
+    {'mortar': 'M252', 'shell': 'HE M821', 'mortar_pos': '064064', 'target_pos': [1, 2]},
+    {**BASE, 'distance': [1200]},
+    {**BASE, 'distance': True},
+    {**BASE, 'mortar_alt': {'m': 1}},
+    {**BASE, 'azimuth': [1]},
+    {**BASE, 'distance': float('nan')},
+    {**BASE, 'distance': float('inf')},
+    {**BASE, 'target_alt': float('-inf')},
+    {**BASE, 'distance': 'nan'},
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port):
+    loop = asyncio.new_event_loop()
+    server = SolverServer()
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(server.serve('127.0.0.1', port),), daemon=True)
+    thread.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Сервис не запустился")
+
+
+def strict_json(body):
+    def reject(constant):
+        raise ValueError(f"недопустимое значение JSON: {constant}")
+    return json.loads(body, parse_constant=reject)
+
+
+def post(connection, path, payload):
+    # json.dumps пишет NaN и Infinity литералами - как их пришлет клиент на Python или JS
+    body = json.dumps(payload)
+    connection.request('POST', path, body, {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response.status, strict_json(response.read())
+
+
+def main():
+    port = free_port()
+    start_server(port)
+    errors = []
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    sent = 0
+
+    for mission in BAD_MISSIONS:
+        try:
+            status, payload = post(connection, '/solve', mission)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            errors.append(f"/solve {mission}: {type(e).__name__}: {e}")
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            continue
+        finally:
+            sent += 1
+        if status != 400 or 'error' not in payload:
+            errors.append(f"/solve {mission}: {status} {payload}")
+
+    status, payload = post(connection, '/batch', {'missions': list(BAD_MISSIONS) + [BASE]})
+    sent += 1
+    solutions = payload.get('solutions', [])
+    if status != 200 or len(solutions) != len(BAD_MISSIONS) + 1:
+        errors.append(f"/batch: {status}, решений {len(solutions)}")
+    else:
+        for mission, solution in zip(BAD_MISSIONS, solutions):
+            if 'error' not in solution:
+                errors.append(f"/batch {mission}: нет ошибки в {solution}")
+        if not solutions[-1].get('results'):
+            errors.append(f"/batch: корректная задача не решена: {solutions[-1]}")
+
+    status, payload = post(connection, '/solve', BASE)
+    sent += 1
+    if status != 200 or not payload.get('results'):
+        errors.append(f"/solve корректной задачи: {status} {payload}")
+
+    connection.request('GET', '/stats')
+    stats = strict_json(connection.getresponse().read())
+    if stats['requests'] != sent:
+        errors.append(f"/stats: учтено запросов {stats['requests']}, отправлено {sent}")
+
+    print(f"Сервис расчетов: запросов {sent}, ошибок {len(errors)}")
+    for error in errors:
+        print("   " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())